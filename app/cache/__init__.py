@@ -0,0 +1,5 @@
+from .base_cache import CacheBackend
+from .memory_cache import MemoryCacheBackend
+from .redis_cache import RedisCacheBackend
+from .read_through_cache import ReadThroughCache
+from .cache_backend import cache_backend, make_cache_backend
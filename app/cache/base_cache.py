@@ -0,0 +1,25 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class CacheBackend(ABC):
+    """Key-value store of serialized cache entries with per-entry time to live"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """Returns the entry value, or None if there is no entry or it is expired"""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float):
+        pass
+
+    @abstractmethod
+    async def delete(self, *keys: str):
+        pass
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        """Backend specific stats, e.g. size and evictions of an in-process backend"""
+        return {}
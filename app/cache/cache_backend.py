@@ -0,0 +1,18 @@
+from settings import Settings
+from .base_cache import CacheBackend
+from .memory_cache import MemoryCacheBackend
+from .redis_cache import RedisCacheBackend
+
+
+settings = Settings()
+
+
+def make_cache_backend(settings: Settings) -> CacheBackend:
+    if settings.CACHE_BACKEND == 'redis':
+        return RedisCacheBackend(url=settings.CACHE_REDIS_URL,
+                                 pool_size=settings.CACHE_REDIS_POOL_SIZE,
+                                 timeout=settings.CACHE_REDIS_TIMEOUT)
+    return MemoryCacheBackend(settings.CACHE_MEMORY_SIZE)
+
+
+cache_backend = make_cache_backend(settings)
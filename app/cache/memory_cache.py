@@ -0,0 +1,41 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+from .base_cache import CacheBackend
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Bounded in-process LRU store with per-entry time to live;
+    entries are not shared by worker processes, so invalidations made by one worker do not reach the others.
+    Not thread-safe, meant to be used from the event loop only"""
+
+    def __init__(self, maxsize: int):
+        self._maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data),
+                "evictions": self.evictions}
@@ -0,0 +1,97 @@
+import asyncio
+import random
+from typing import Any, Awaitable, Callable, Hashable, Optional, Set
+import orjson
+from db.unit_of_work import after_commit, current_unit_of_work
+from utils.serializers import dumps
+from utils.singleflight import SingleFlight
+from .base_cache import CacheBackend
+from loguru import logger
+
+
+class ReadThroughCache:
+    """Read-through cache of JSON payloads by id, kept in the backend under '<name>:<id>' keys.
+    Missing entries are cached as well (negative caching) with a shorter time to live;
+    concurrent misses of the same key share one load, and times to live are jittered,
+    so entries cached together do not expire together.
+    Backend errors are logged and the backend is bypassed, the cache never fails a request"""
+
+    def __init__(self, name: str, backend: CacheBackend, ttl: float, negative_ttl: float, jitter: float = 0.1):
+        self.name = name
+        self._backend = backend
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._jitter = jitter
+        self._flight = SingleFlight(f"{name}_cache")
+        # bumped on every invalidation, so payloads loaded before it are not stored
+        self._generation = 0
+        self._deletes: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.errors = 0
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.name}:{str(key).lower()}"
+
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        """Returns the cached payload of the key, or loads it with 'load' and caches it;
+        'load' returns None if there is no entry with the key, None is cached too.
+        Every caller gets its own copy of the payload, decoded from JSON"""
+        cache_key = self._key(key)
+        try:
+            raw = await self._backend.get(cache_key)
+        except Exception as e:
+            self._failed("get", e)
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return orjson.loads(await self._flight.do(cache_key, self._load, cache_key, load))
+        self.hits += 1
+        value = orjson.loads(raw)
+        if value is None:
+            self.negative_hits += 1
+        return value
+
+    async def _load(self, cache_key: str, load: Callable[[], Awaitable[Optional[Any]]]) -> bytes:
+        generation = self._generation
+        value = await load()
+        raw = dumps(value)
+        if generation == self._generation:
+            ttl = self._ttl if value is not None else self._negative_ttl
+            try:
+                await self._backend.set(cache_key, raw, ttl * random.uniform(1 - self._jitter, 1 + self._jitter))
+            except Exception as e:
+                self._failed("set", e)
+        return raw
+
+    async def invalidate(self, *keys: Hashable):
+        """Removes the entries right away and, inside a unit of work, once more after it is committed:
+        a load made in between could read the data before the commit and cache it again"""
+        cache_keys = [self._key(key) for key in keys]
+        await self._delete(cache_keys)
+        if current_unit_of_work() is not None:
+            after_commit(lambda: self._spawn_delete(cache_keys))
+
+    async def _delete(self, cache_keys: list):
+        self._generation += 1
+        try:
+            await self._backend.delete(*cache_keys)
+        except Exception as e:
+            self._failed("delete", e)
+
+    def _spawn_delete(self, cache_keys: list):
+        task = asyncio.create_task(self._delete(cache_keys))
+        # tasks are referenced until done, so they are not garbage collected
+        self._deletes.add(task)
+        task.add_done_callback(self._deletes.discard)
+
+    def _failed(self, operation: str, error: Exception):
+        self.errors += 1
+        logger.warning("ReadThroughCache: {} cache {} failed: {!r}", self.name, operation, error)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "negative_hits": self.negative_hits,
+                "errors": self.errors}
@@ -0,0 +1,35 @@
+from typing import Optional
+from .base_cache import CacheBackend
+
+try:
+    from redis import asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+
+class RedisCacheBackend(CacheBackend):
+    """Keeps entries in a server speaking the Redis protocol (Redis, Valkey, KeyDB or a local stand-in),
+    shared by all worker processes; requires redis package to be installed.
+    A ready client with the redis.asyncio.Redis interface can be passed instead of the url,
+    e.g. an in-memory stand-in server client"""
+
+    def __init__(self, url: str = None, pool_size: int = 20, timeout: float = 0.5, client=None):
+        if client is None:
+            if aioredis is None:
+                raise RuntimeError("RedisCacheBackend requires redis package to be installed")
+            client = aioredis.Redis.from_url(url, max_connections=pool_size,
+                                             socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._client = client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self._client.set(key, value, px=max(1, int(ttl * 1000)))
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self._client.delete(*keys)
+
+    async def close(self):
+        await self._client.close()
@@ -0,0 +1,214 @@
+"""Benchmark of the API endpoints; drives the application in-process through ASGI transport
+against the database configured in settings (use a local one, the benchmark writes users and posts);
+hunter.io is stubbed, so registrations don't leave the process;
+for every scenario reports throughput, p50/p95/p99 latency and database queries per request,
+saves results as JSON and flags regressions against a previous run;
+usage (from the app directory):
+    python -m cli.benchmark --requests 200 --concurrency 10 --output results.json
+    python -m cli.benchmark --compare results.json --threshold 0.1"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime
+from itertools import count
+from typing import Awaitable, Callable, Dict, List, Optional
+from uuid import uuid4
+import httpx
+from main import app
+from db.database import create_schema
+from db.query_stats import query_stats
+from db.enums import EmailStatusesEnum
+from routers.api_spec import ApiSpec
+from services.external_api_service import external_api_service
+from loguru import logger
+
+
+PASSWORD = "benchmark-password"
+# image content is not validated by the API, 16 KiB of arbitrary bytes
+IMAGE = bytes(range(256)) * 64
+
+
+async def _stub_verify_email_hunter(email: str) -> EmailStatusesEnum:
+    return EmailStatusesEnum.VALID
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+class Benchmark:
+    """Seeds two users and their posts through the API, then runs every scenario
+    'requests' times with 'concurrency' requests in flight"""
+
+    def __init__(self, client: httpx.AsyncClient, requests: int, concurrency: int):
+        self._client = client
+        self._requests = requests
+        self._concurrency = concurrency
+        self._run_id = uuid4().hex[:8]
+        self._registrations = count()
+        self._author: Dict = {}
+        self._reader: Dict = {}
+        self._posts: List[str] = []
+        self._image_post: Optional[str] = None
+        self._cursor: Optional[str] = None
+
+    def _user_data(self, name: str) -> Dict:
+        login = f"bench_{self._run_id}_{name}"
+        return {"login": login, "email": f"{login}@example.com", "password": PASSWORD, "role": "user",
+                "first_name": "Bench", "last_name": name, "birth_date": "01-01-1990"}
+
+    async def _register(self, name: str) -> Dict:
+        resp = await self._client.post(ApiSpec.REGISTRATION, json=self._user_data(name))
+        resp.raise_for_status()
+        return resp.json()
+
+    async def _login(self, name: str) -> Dict:
+        login = self._user_data(name)["login"]
+        resp = await self._client.post(ApiSpec.AUTH, data={"username": login, "password": PASSWORD})
+        resp.raise_for_status()
+        return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+    async def seed(self):
+        logger.info("Benchmark: Seed users and posts")
+        author, reader = await self._register("author"), await self._register("reader")
+        self._author = {"id": author["id"], "headers": await self._login("author")}
+        self._reader = {"id": reader["id"], "headers": await self._login("reader")}
+        # a post for every like request, so each like changes the counter
+        for i in range(self._requests):
+            resp = await self._client.post(ApiSpec.POSTS, headers=self._author["headers"],
+                                           data={"text": f"Benchmark post {i}"})
+            resp.raise_for_status()
+            self._posts.append(resp.json()["id"])
+        resp = await self._client.post(ApiSpec.POSTS, headers=self._author["headers"],
+                                       data={"text": "Benchmark image"},
+                                       files={"image": ("image.jpg", IMAGE, "image/jpeg")})
+        resp.raise_for_status()
+        self._image_post = resp.json()["id"]
+        resp = await self._client.get(ApiSpec.POSTS, headers=self._reader["headers"],
+                                       params={"paging": "cursor", "limit": 20})
+        resp.raise_for_status()
+        self._cursor = resp.json()["next_cursor"]
+
+    def scenarios(self) -> Dict[str, Callable[[int], Awaitable[httpx.Response]]]:
+        headers = self._reader["headers"]
+        post = ApiSpec.POSTS_DETAILS.replace("{post_id}", "{}")
+        image = ApiSpec.POSTS_IMAGES.replace("{post_id}", "{}")
+        likes = ApiSpec.POSTS_LIKES.replace("{post_id}", "{}")
+        profile = ApiSpec.USERS_PROFILES.replace("{user_id}", "{}")
+        return {
+            "login": lambda i: self._client.post(
+                ApiSpec.AUTH, data={"username": self._user_data("reader")["login"], "password": PASSWORD}),
+            "registration": lambda i: self._client.post(
+                ApiSpec.REGISTRATION, json=self._user_data(f"user{next(self._registrations)}")),
+            "feed_first_page": lambda i: self._client.get(
+                ApiSpec.POSTS, headers=headers, params={"paging": "cursor", "limit": 20}),
+            "feed_next_page": lambda i: self._client.get(
+                ApiSpec.POSTS, headers=headers, params={"paging": "cursor", "limit": 20, "cursor": self._cursor}),
+            "feed_offset": lambda i: self._client.get(
+                ApiSpec.POSTS, headers=headers, params={"limit": 20, "offset": 20}),
+            "post": lambda i: self._client.get(
+                post.format(self._posts[i % len(self._posts)]), headers=headers),
+            "image": lambda i: self._client.get(image.format(self._image_post), headers=headers),
+            "profile": lambda i: self._client.get(profile.format(self._author["id"]), headers=headers),
+            "like": lambda i: self._client.post(likes.format(self._posts[i % len(self._posts)]), headers=headers),
+            "unlike": lambda i: self._client.delete(likes.format(self._posts[i % len(self._posts)]), headers=headers),
+        }
+
+    async def run_scenario(self, name: str, request: Callable[[int], Awaitable[httpx.Response]]) -> Dict:
+        logger.info("Benchmark: Run scenario {}", name)
+        latencies, queries, errors = [], [], 0
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def timed(i: int):
+            nonlocal errors
+            async with semaphore:
+                with query_stats() as stats:
+                    start = time.perf_counter()
+                    resp = await request(i)
+                    latencies.append(time.perf_counter() - start)
+                queries.append(stats.statements)
+                if resp.status_code >= 400:
+                    errors += 1
+                    logger.debug("Benchmark: {}: {} {}", name, resp.status_code, resp.text)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(timed(i) for i in range(self._requests)))
+        elapsed = time.perf_counter() - start
+        return {"requests": self._requests,
+                "errors": errors,
+                "throughput": round(self._requests / elapsed, 2),
+                "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+                "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+                "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+                "queries_per_request": round(sum(queries) / len(queries), 2)}
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Returns descriptions of scenarios which p95 latency grew or throughput dropped
+    by more than 'threshold' fraction of the baseline, or which make more database queries"""
+    regressions = []
+    for name, result in results["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            continue
+        if result["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {base['p95_ms']}ms -> {result['p95_ms']}ms")
+        if result["throughput"] < base["throughput"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {base['throughput']}/s -> {result['throughput']}/s")
+        if result["queries_per_request"] > base["queries_per_request"]:
+            regressions.append(f"{name}: queries per request "
+                               f"{base['queries_per_request']} -> {result['queries_per_request']}")
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> Dict:
+    external_api_service.verify_email_hunter = _stub_verify_email_hunter
+    # the application does not create the schema, the benchmark database may be a fresh one
+    await create_schema()
+    await app.router.startup()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+            benchmark = Benchmark(client, args.requests, args.concurrency)
+            await benchmark.seed()
+            scenarios = benchmark.scenarios()
+            selected = args.scenarios or list(scenarios)
+            results = {"started_at": datetime.utcnow().isoformat(),
+                       "requests": args.requests,
+                       "concurrency": args.concurrency,
+                       "scenarios": {}}
+            for name in selected:
+                results["scenarios"][name] = await benchmark.run_scenario(name, scenarios[name])
+    finally:
+        await app.router.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process benchmark of the API endpoints")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--scenarios", nargs="*", default=None,
+                        help="scenarios to run, all by default; 'unlike' expects 'like' to run first")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", default=None, help="results of a previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+    results = asyncio.run(run(args))
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(json.dumps(results["scenarios"], indent=2))
+    if args.compare is not None:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
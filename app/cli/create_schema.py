@@ -0,0 +1,27 @@
+"""Creates missing database tables; run it once before starting the application workers,
+the application does not create the schema on startup;
+usage (from the app directory): python -m cli.create_schema"""
+import asyncio
+from db.database import create_schema, wait_for_db, engine
+# models are registered in the metadata when imported, the DAOs import all of them
+import db.dao  # noqa: F401
+from utils.logger import setup_logger
+from settings import Settings
+from loguru import logger
+
+
+async def run(settings: Settings):
+    await wait_for_db(settings.DB_CONNECT_RETRIES, settings.DB_CONNECT_BACKOFF, settings.DB_CONNECT_MAX_BACKOFF)
+    await create_schema()
+    await engine.dispose()
+
+
+def main():
+    settings = Settings()
+    setup_logger(settings)
+    asyncio.run(run(settings))
+    logger.info("CreateSchema: done")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Microbenchmark of DAO calls overhead with statements cache on and off,
+and of the Core rows fast path against ORM models for the same queries;
+runs against the database configured in settings, reads existing users and posts;
+usage (from the app directory):
+    python -m cli.dao_benchmark --calls 2000"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Awaitable, Callable, Dict
+from loguru import logger
+from db.dao import post_dao, user_dao
+from db.database import engine
+from db.models.PostModel import PostModel
+
+
+async def _measure(call: Callable[[], Awaitable], calls: int) -> float:
+    await call()
+    start = time.perf_counter()
+    for _ in range(calls):
+        await call()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def run(calls: int) -> Dict[str, Dict[str, float]]:
+    user = (await user_dao.get_all_by(1, 0))[0]
+    order_by = (PostModel.created_at.desc(), PostModel.id.desc())
+    cases = {
+        "user_dao.get_by(login)": lambda: user_dao.get_by(login=user.login),
+        "user_dao.get_all_by(limit=20)": lambda: user_dao.get_all_by(20, 0),
+        "user_dao.patch(email_status)": lambda: user_dao.patch({"email_status": user.email_status}, user.id),
+        "user_dao.get_principal(login) [core]": lambda: user_dao.get_principal(user.login),
+        "post_dao.get_all_by(limit=20) [orm]": lambda: post_dao.get_all_by(20, 0, order_by=order_by),
+        "post_dao.get_feed_rows(limit=20) [core]": lambda: post_dao.get_feed_rows(20, 0, order_by),
+    }
+    results = {}
+    for name, call in cases.items():
+        results[name] = {}
+        for cached in (False, True):
+            user_dao.cache_statements = post_dao.cache_statements = cached
+            results[name]["cached" if cached else "uncached"] = await _measure(call, calls)
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DAO calls overhead with and without statements cache")
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+    logger.remove()
+    results = asyncio.run(run(args.calls))
+    print(f"{'call':<42} {'uncached us':>12} {'cached us':>10}")
+    for name, result in results.items():
+        print(f"{name:<42} {result['uncached']:>12.1f} {result['cached']:>10.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""Bulk import/export of users, profiles, posts, likes and follows with PostgreSQL COPY
+and generation of synthetic datasets for benchmarks and capacity planning;
+usage (from the app directory):
+    python -m cli.dataset import --table users --file users.jsonl
+    python -m cli.dataset export --table posts --file posts.csv
+    python -m cli.dataset generate --users 1000000 --posts 10000000"""
+import argparse
+import asyncio
+import csv
+import json
+import random
+import sys
+from datetime import datetime, date, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List
+from uuid import UUID, uuid4
+import asyncpg
+from sqlalchemy import Enum, Table
+from db.models.FollowModel import FollowModel
+from db.models.LikeModel import LikeModel
+from db.models.PostModel import PostModel
+from db.models.ProfileModel import ProfileModel
+from db.models.UserModel import UserModel
+from db.enums import EmailStatusesEnum, UserRolesSignupEnum
+from utils.auth_utils import hash_password
+from utils.logger import setup_logger
+from settings import Settings
+from loguru import logger
+
+
+settings = Settings()
+
+# in the order of foreign keys dependencies
+TABLES: Dict[str, Table] = {"users": UserModel.__table__,
+                            "profiles": ProfileModel.__table__,
+                            "posts": PostModel.__table__,
+                            "likes": LikeModel.__table__,
+                            "follows": FollowModel.__table__}
+
+FORMATS = ("jsonl", "csv")
+
+
+def dsn(settings: Settings) -> str:
+    return f"postgresql://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}/{settings.DB_NAME}"
+
+
+def batches(records: Iterable, batch_size: int) -> Iterator[List]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _converter(column) -> Callable:
+    """Makes a function converting a JSON value to the type expected by binary COPY for the column"""
+    if isinstance(column.type, Enum) and column.type.enum_class is not None:
+        # enum columns store member names
+        enum_class = column.type.enum_class
+        return lambda value: value if value in enum_class.__members__ else enum_class(value).name
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat
+    if python_type is date:
+        return date.fromisoformat
+    if python_type is UUID:
+        return UUID
+    if python_type is bytes:
+        return bytes.fromhex
+    return lambda value: value
+
+
+async def import_table(conn: asyncpg.Connection, table: Table, file_path: str, file_format: str,
+                       batch_size: int) -> int:
+    if file_format == "csv":
+        with open(file_path, newline="") as file:
+            columns = next(csv.reader(file))
+            file.seek(0)
+            status = await conn.copy_to_table(table.name, source=file, columns=columns, format="csv", header=True)
+        return int(status.split()[-1])
+    imported = 0
+    with open(file_path) as file:
+        lines = (json.loads(line) for line in file if line.strip())
+        first = next(lines, None)
+        if first is None:
+            return 0
+        columns = list(first)
+        converters = [_converter(table.c[name]) for name in columns]
+
+        def to_record(item: dict) -> tuple:
+            return tuple(None if item.get(name) is None else convert(item[name])
+                         for name, convert in zip(columns, converters))
+
+        records = (to_record(item) for item in _chain(first, lines))
+        for batch in batches(records, batch_size):
+            await conn.copy_records_to_table(table.name, records=batch, columns=columns)
+            imported += len(batch)
+            logger.info("Dataset: imported {} rows into {}", imported, table.name)
+    return imported
+
+
+def _chain(first, rest: Iterator) -> Iterator:
+    yield first
+    yield from rest
+
+
+async def export_table(conn: asyncpg.Connection, table: Table, file_path: str, file_format: str) -> int:
+    columns = [column.name for column in table.columns]
+    if file_format == "csv":
+        status = await conn.copy_from_table(table.name, output=file_path, columns=columns, format="csv", header=True)
+        return int(status.split()[-1])
+    exported = 0
+    with open(file_path, "w") as file:
+        async with conn.transaction():
+            query = f"SELECT {', '.join(columns)} FROM {table.name}"
+            async for record in conn.cursor(query, prefetch=10000):
+                file.write(json.dumps(dict(record), default=_to_json) + "\n")
+                exported += 1
+    return exported
+
+
+def _to_json(value):
+    if isinstance(value, bytes):
+        return value.hex()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+async def generate(conn: asyncpg.Connection, users: int, posts: int, likes_alpha: float,
+                   password: str, batch_size: int, seed: int):
+    """Generates users with profiles, posts of users chosen with power-law activity,
+    and power-law distributed likes of posts; all users share one pre-hashed password"""
+    rnd = random.Random(seed)
+    now = datetime.utcnow()
+    password_hash = hash_password(password)
+    user_ids = [uuid4() for _ in range(users)]
+
+    def user_records() -> Iterator[tuple]:
+        for i, user_id in enumerate(user_ids):
+            created_at = now - timedelta(seconds=rnd.randrange(365 * 24 * 3600))
+            yield (user_id, f"user{i}", f"user{i}@example.com", EmailStatusesEnum.VALID.value, password_hash,
+                   UserRolesSignupEnum.USER.name,
+                   False, True, created_at, created_at, None)
+
+    def profile_records() -> Iterator[tuple]:
+        for i, user_id in enumerate(user_ids):
+            birth_date = date(1950, 1, 1) + timedelta(days=rnd.randrange(50 * 365))
+            yield (user_id, f"First{i}", None, f"Last{i}", birth_date, None, now, now)
+
+    user_columns = ["id", "login", "email", "email_status", "password", "role",
+                    "blocked", "is_active", "created_at", "updated_at", "deleted_at"]
+    profile_columns = ["id", "first_name", "second_name", "last_name", "birth_date", "about",
+                       "created_at", "updated_at"]
+    for table, columns, records in (("tbl_users", user_columns, user_records()),
+                                    ("tbl_profiles", profile_columns, profile_records())):
+        copied = 0
+        for batch in batches(records, batch_size):
+            await conn.copy_records_to_table(table, records=batch, columns=columns)
+            copied += len(batch)
+            logger.info("Dataset: generated {} rows of {}", copied, table)
+
+    post_columns = ["id", "user_id", "text", "likes", "created_at", "updated_at"]
+    like_columns = ["id", "user_id", "post_id", "created_at"]
+    generated_posts = generated_likes = 0
+    while generated_posts < posts:
+        post_batch, like_batch = [], []
+        for _ in range(min(batch_size, posts - generated_posts)):
+            post_id = uuid4()
+            # few users write most of the posts
+            author = min(int(rnd.paretovariate(1.16)) - 1, users - 1)
+            created_at = now - timedelta(seconds=rnd.randrange(365 * 24 * 3600))
+            likes_count = min(int(rnd.paretovariate(likes_alpha)) - 1, users - 1)
+            likers = [liker for liker in rnd.sample(range(users), likes_count) if liker != author]
+            post_batch.append((post_id, user_ids[author], f"Post {generated_posts}", len(likers),
+                               created_at, created_at))
+            like_batch.extend((uuid4(), user_ids[liker], post_id, created_at) for liker in likers)
+            generated_posts += 1
+        await conn.copy_records_to_table("tbl_posts", records=post_batch, columns=post_columns)
+        for batch in batches(like_batch, batch_size):
+            await conn.copy_records_to_table("tbl_likes", records=batch, columns=like_columns)
+        generated_likes += len(like_batch)
+        logger.info("Dataset: generated {} posts and {} likes", generated_posts, generated_likes)
+
+
+async def run(args: argparse.Namespace):
+    conn = await asyncpg.connect(dsn(settings))
+    try:
+        if args.command == "import":
+            count = await import_table(conn, TABLES[args.table], args.file, args.format, args.batch_size)
+            logger.info("Dataset: {} rows imported into {}", count, args.table)
+        elif args.command == "export":
+            count = await export_table(conn, TABLES[args.table], args.file, args.format)
+            logger.info("Dataset: {} rows exported from {}", count, args.table)
+        else:
+            await generate(conn, args.users, args.posts, args.likes_alpha, args.password,
+                           args.batch_size, args.seed)
+    finally:
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export and synthetic dataset generation")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("import", "export"):
+        command = commands.add_parser(name)
+        command.add_argument("--table", choices=TABLES, required=True)
+        command.add_argument("--file", required=True)
+        command.add_argument("--format", choices=FORMATS, default=None,
+                             help="file format, taken from the file extension by default")
+        command.add_argument("--batch-size", type=int, default=50000)
+    command = commands.add_parser("generate")
+    command.add_argument("--users", type=int, default=1000)
+    command.add_argument("--posts", type=int, default=10000)
+    command.add_argument("--likes-alpha", type=float, default=1.2,
+                         help="shape of the power-law likes distribution, lower means more likes")
+    command.add_argument("--password", default="password")
+    command.add_argument("--batch-size", type=int, default=50000)
+    command.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    if args.command in ("import", "export") and args.format is None:
+        args.format = args.file.rsplit(".", 1)[-1]
+        if args.format not in FORMATS:
+            parser.error(f"cannot take file format from its extension, use --format {{{','.join(FORMATS)}}}")
+    setup_logger(settings)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
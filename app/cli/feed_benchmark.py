@@ -0,0 +1,154 @@
+"""Benchmark of home feed latency of a user following many users: the fan-out-on-write timeline
+merged with pulled posts of accounts above FEED_FANOUT_MAX_FOLLOWERS, against the fan-out-on-read query
+over all followed users; seeds its own users, follows and posts into the database configured in settings
+and removes them when finished; usage (from the app directory):
+    python -m cli.feed_benchmark --followees 10000 --posts-per-followee 5 --celebrities 10"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List
+from uuid import uuid4
+from loguru import logger
+from sqlalchemy import select, tuple_
+from db.dao import follow_dao, post_dao, timeline_dao, user_dao
+from db.database import create_schema, engine
+from db.dto import AuthHeadersDTO
+from db.enums import EmailStatusesEnum, UserRolesSignupEnum
+from db.models.FollowModel import FollowModel
+from db.models.PostModel import PostModel
+from db.models.TimelineModel import TimelineModel
+from db.models.UserModel import UserModel
+from services.follow_service import follow_service
+from services.post_service import post_service
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+class FeedBenchmark:
+
+    def __init__(self, followees: int, posts_per_followee: int, celebrities: int, limit: int):
+        self._followees = followees
+        self._posts_per_followee = posts_per_followee
+        self._celebrities = celebrities
+        self._limit = limit
+        self._user_ids: List = []
+        self._reader = None
+
+    def _user(self, name: str) -> Dict:
+        return {"login": name, "email": f"{name}@example.com", "password": "-",
+                "role": UserRolesSignupEnum.USER, "email_status": EmailStatusesEnum.VALID.value}
+
+    async def seed(self, fan_out_sample: int) -> Dict:
+        run_id = uuid4().hex[:8]
+        reader = await user_dao.create(self._user(f"feed_{run_id}_reader"), columns=(UserModel.id, UserModel.login))
+        self._user_ids.append(reader.id)
+        self._reader = AuthHeadersDTO(user_id=reader.id, login=reader.login, role=UserRolesSignupEnum.USER)
+        followees = await user_dao.create_many([self._user(f"feed_{run_id}_{i}") for i in range(self._followees)],
+                                               columns=(UserModel.id,))
+        followee_ids = [followee.id for followee in followees]
+        self._user_ids.extend(followee_ids)
+        await follow_dao.create_many([{"follower_id": reader.id, "followee_id": followee_id}
+                                      for followee_id in followee_ids], columns=(FollowModel.id,))
+        # the first followees are accounts which posts are not fanned out
+        celebrities = set(followee_ids[:self._celebrities])
+        await user_dao.patch_many({followee_id: {"followers_count": follow_service.max_followers + 1,
+                                                 "has_pulled_posts": True}
+                                   for followee_id in celebrities})
+        now = datetime.utcnow()
+        posts = await post_dao.create_many(
+            [{"user_id": followee_id, "text": "x" * 100, "fanned_out": followee_id not in celebrities,
+              "created_at": now - timedelta(seconds=random.randrange(30 * 24 * 3600))}
+             for followee_id in followee_ids for _ in range(self._posts_per_followee)],
+            columns=(PostModel.id, PostModel.user_id, PostModel.created_at))
+        fanned_out = [post for post in posts if post.user_id not in celebrities]
+        # a sample is fanned out post by post to time it, the rest is inserted in bulk with the same result
+        latencies = []
+        for post in fanned_out[:fan_out_sample]:
+            start = time.perf_counter()
+            await timeline_dao.fan_out(post.id, post.user_id, post.created_at, follow_service.max_followers)
+            latencies.append(time.perf_counter() - start)
+        await timeline_dao.create_many([{"user_id": reader.id, "post_id": post.id, "author_id": post.user_id,
+                                         "created_at": post.created_at} for post in fanned_out[fan_out_sample:]],
+                                       columns=(TimelineModel.post_id,))
+        return {"posts": len(posts),
+                "fanned_out_posts": len(fanned_out),
+                "fan_out_avg_ms": round(sum(latencies) / max(len(latencies), 1) * 1000, 2)}
+
+    async def _pull_all(self, after=None) -> List:
+        """Fan-out-on-read: the page is selected from posts of all followed users"""
+        followed = select(FollowModel.followee_id).where(FollowModel.follower_id == self._reader.user_id)
+        query = select(*post_dao.feed_columns).where(PostModel.user_id.in_(followed))
+        if after is not None:
+            query = query.where(tuple_(PostModel.created_at, PostModel.id) < tuple_(*after))
+        query = query.order_by(PostModel.created_at.desc(), PostModel.id.desc()).limit(self._limit)
+        async with engine.connect() as connection:
+            return (await connection.execute(query)).all()
+
+    async def scenarios(self, depth: int) -> Dict[str, Callable[[], Awaitable]]:
+        cursor = None
+        for _ in range(depth):
+            cursor = (await post_service.get_home_feed(self._reader, self._limit, cursor))["next_cursor"]
+        last = (await self._pull_all())[-1]
+        return {
+            "home_feed_first_page": lambda: post_service.get_home_feed(self._reader, self._limit),
+            f"home_feed_page_{depth + 1}": lambda: post_service.get_home_feed(self._reader, self._limit, cursor),
+            "pull_all_first_page": lambda: self._pull_all(),
+            "pull_all_next_page": lambda: self._pull_all((last.created_at, last.id)),
+        }
+
+    async def measure(self, call: Callable[[], Awaitable], requests: int) -> Dict:
+        await call()
+        latencies = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+        return {"p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+                "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+                "p99_ms": round(_percentile(latencies, 99) * 1000, 2)}
+
+    async def cleanup(self):
+        # posts, follows and timelines are removed with the users (cascade)
+        await user_dao.delete_many(self._user_ids)
+
+
+async def run(args: argparse.Namespace):
+    await create_schema()
+    benchmark = FeedBenchmark(args.followees, args.posts_per_followee, args.celebrities, args.limit)
+    try:
+        seeded = await benchmark.seed(args.fan_out_sample)
+        print(f"followees: {args.followees}, posts: {seeded['posts']}, fanned out: {seeded['fanned_out_posts']}, "
+              f"fan-out avg: {seeded['fan_out_avg_ms']} ms")
+        print(f"{'scenario':<24} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for name, call in (await benchmark.scenarios(args.depth)).items():
+            result = await benchmark.measure(call, args.requests)
+            print(f"{name:<24} {result['p50_ms']:>8} {result['p95_ms']:>8} {result['p99_ms']:>8}")
+    finally:
+        await benchmark.cleanup()
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Home feed latency of a user following many users")
+    parser.add_argument("--followees", type=int, default=10000)
+    parser.add_argument("--posts-per-followee", type=int, default=5)
+    parser.add_argument("--celebrities", type=int, default=10,
+                        help="followees above the fan-out threshold, their posts are pulled")
+    parser.add_argument("--limit", type=int, default=20, help="posts per page")
+    parser.add_argument("--depth", type=int, default=5, help="pages to skip for the next page scenario")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--fan-out-sample", type=int, default=1000, help="posts fanned out one by one and timed")
+    args = parser.parse_args()
+    logger.remove()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
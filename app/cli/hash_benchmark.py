@@ -0,0 +1,132 @@
+"""Benchmark of the latency of unrelated endpoints during a login flood: bcrypt verification run
+on the event loop, as before utils.password_hasher, against the bounded pool of the hasher;
+drives the application in-process through ASGI transport against the database configured in settings
+(use a local one, the benchmark registers users and writes posts); the bcrypt cost is PASSWORD_HASH_ROUNDS;
+usage (from the app directory):
+    python -m cli.hash_benchmark --flood 8 --requests 50"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import timedelta
+from typing import Dict, List
+from uuid import uuid4
+import httpx
+from main import app
+from db.database import create_schema
+from db.enums import EmailStatusesEnum
+from routers.api_spec import ApiSpec
+from services.external_api_service import external_api_service
+from utils.auth_utils import create_access_token
+from utils.password_hasher import password_hasher
+from loguru import logger
+
+
+PASSWORD = "benchmark-password"
+
+
+async def _stub_verify_email_hunter(email: str) -> EmailStatusesEnum:
+    return EmailStatusesEnum.VALID
+
+
+async def _run_on_event_loop(func, *args):
+    """Replaces PasswordHasher._run: the hash is computed by the calling coroutine, blocking the loop"""
+    return func(*args)
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+class HashBenchmark:
+    """Runs 'flood' concurrent logins in a loop while 'requests' requests to the posts listing
+    are sent one after another, and measures the latency of the latter"""
+
+    def __init__(self, client: httpx.AsyncClient, flood: int, requests: int):
+        self._client = client
+        self._flood = flood
+        self._requests = requests
+        self._login = f"hash_{uuid4().hex[:8]}"
+        self._headers: Dict = {}
+
+    async def seed(self):
+        resp = await self._client.post(ApiSpec.REGISTRATION, json={
+            "login": self._login, "email": f"{self._login}@example.com", "password": PASSWORD, "role": "user",
+            "first_name": "Bench", "last_name": "Hash", "birth_date": "01-01-1990"})
+        resp.raise_for_status()
+        # a scenario with hashing on the event loop may outlast an access token issued by the login endpoint
+        token = await create_access_token(self._login, timedelta(hours=1))
+        self._headers = {"Authorization": f"Bearer {token}"}
+        resp = await self._client.post(ApiSpec.POSTS, headers=self._headers, data={"text": "Benchmark post"})
+        resp.raise_for_status()
+
+    async def run(self, flood: bool) -> Dict:
+        stop = asyncio.Event()
+        statuses: List[int] = []
+
+        async def login():
+            while not stop.is_set():
+                resp = await self._client.post(ApiSpec.AUTH, data={"username": self._login, "password": PASSWORD})
+                statuses.append(resp.status_code)
+
+        flooders = [asyncio.create_task(login()) for _ in range(self._flood if flood else 0)]
+        latencies = []
+        start = time.perf_counter()
+        try:
+            for _ in range(self._requests):
+                request_start = time.perf_counter()
+                resp = await self._client.get(ApiSpec.POSTS, headers=self._headers,
+                                              params={"paging": "cursor", "limit": 20})
+                latencies.append(time.perf_counter() - request_start)
+                resp.raise_for_status()
+        finally:
+            elapsed = time.perf_counter() - start
+            stop.set()
+            await asyncio.gather(*flooders)
+        return {"logins_per_sec": round(statuses.count(200) / elapsed, 2),
+                "rejected": sum(status == 503 for status in statuses),
+                "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+                "p99_ms": round(_percentile(latencies, 99) * 1000, 2)}
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict]:
+    external_api_service.verify_email_hunter = _stub_verify_email_hunter
+    await create_schema()
+    await app.router.startup()
+    # the startup installs the log sinks of the settings, the tables are the only output
+    logger.remove()
+    results = {}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+            benchmark = HashBenchmark(client, args.flood, args.requests)
+            await benchmark.seed()
+            results["idle"] = await benchmark.run(flood=False)
+            pool_run = password_hasher._run
+            password_hasher._run = _run_on_event_loop
+            try:
+                results["flood, event loop"] = await benchmark.run(flood=True)
+            finally:
+                password_hasher._run = pool_run
+            results["flood, hasher pool"] = await benchmark.run(flood=True)
+    finally:
+        await app.router.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of unrelated endpoints during a login flood")
+    parser.add_argument("--flood", type=int, default=8, help="concurrent logins in flight")
+    parser.add_argument("--requests", type=int, default=50, help="requests to the posts listing per scenario")
+    args = parser.parse_args()
+    logger.remove()
+    results = asyncio.run(run(args))
+    print(f"{'scenario':<20} {'logins/s':>9} {'rejected':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, result in results.items():
+        print(f"{name:<20} {result['logins_per_sec']:>9} {result['rejected']:>9} "
+              f"{result['p50_ms']:>8} {result['p99_ms']:>8}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Benchmark of requests to external APIs through the shared keep-alive HTTPClient, against a new
+aiohttp session, and so a new connection, for every request as before clients.http_client was shared;
+requests are sent to a local stub server started by the benchmark, answering like hunter.io email verifier;
+usage (from the app directory):
+    python -m cli.http_client_benchmark --requests 2000 --concurrency 10"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Awaitable, Callable, Dict, Set
+import aiohttp
+from aiohttp import web
+from loguru import logger
+from clients.http_client import HTTPClient
+from settings import Settings
+
+
+class StubServer:
+    """Local stand-in of the external API; counts connections by the client ports of the requests"""
+
+    def __init__(self):
+        self.peers: Set = set()
+        self._runner = None
+        self.url = None
+
+    async def _verify(self, request: web.Request) -> web.Response:
+        self.peers.add(request.transport.get_extra_info("peername"))
+        return web.json_response({"data": {"status": "valid", "email": request.query.get("email")}})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/verify", self._verify)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}/verify?email=user@example.com"
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+async def _new_session_request(url: str):
+    async with aiohttp.ClientSession() as session:
+        async with session.request("GET", url) as response:
+            return response.status, await response.json()
+
+
+async def _measure(server: StubServer, request: Callable[[], Awaitable], requests: int, concurrency: int) -> Dict:
+    server.peers.clear()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send():
+        async with semaphore:
+            status, _ = await request()
+            assert status == 200
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {"requests_per_sec": round(requests / elapsed, 2), "connections": len(server.peers)}
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict]:
+    settings = Settings()
+    server = StubServer()
+    await server.start()
+    client = HTTPClient(pool_size=settings.HTTP_CLIENT_POOL_SIZE,
+                        pool_size_per_host=settings.HTTP_CLIENT_POOL_SIZE_PER_HOST,
+                        connect_timeout=settings.HTTP_CLIENT_CONNECT_TIMEOUT,
+                        read_timeout=settings.HTTP_CLIENT_READ_TIMEOUT,
+                        dns_cache_ttl=settings.HTTP_CLIENT_DNS_CACHE_TTL)
+    try:
+        await client.start()
+        return {
+            "new session per request": await _measure(server, lambda: _new_session_request(server.url),
+                                                      args.requests, args.concurrency),
+            "shared client": await _measure(server, lambda: client.request("GET", server.url),
+                                            args.requests, args.concurrency),
+        }
+    finally:
+        await client.close()
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="External API requests with and without connection reuse")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10, help="requests in flight")
+    args = parser.parse_args()
+    logger.remove()
+    results = asyncio.run(run(args))
+    print(f"{'client':<24} {'requests/s':>11} {'connections':>12}")
+    for name, result in results.items():
+        print(f"{name:<24} {result['requests_per_sec']:>11} {result['connections']:>12}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""Microbenchmark of per-request logging overhead: emits the log lines of a typical request
+(auth, service and DAO lines) with the application logger setup at INFO and at TRACE
+and reports the time spent in logging calls per request;
+usage (from the app directory):
+    python -m cli.log_benchmark --requests 10000"""
+import argparse
+import sys
+import tempfile
+import time
+from uuid import uuid4
+from loguru import logger
+from settings import Settings
+from utils.logger import setup_logger
+
+
+def request_logs(post_id, user_id, payload: dict):
+    """Log lines of GET /posts/{post_id}: auth mixin, rights check, service, singleflight and DAO"""
+    logger.info("AuthMixin: get auth headers from request")
+    logger.info("AuthUtils: Decode token")
+    logger.info("RightsRestrictions: Check available roles")
+    logger.trace("RightsRestrictions: min role to perform action: {}, user role: {}", 1, "user")
+    logger.info("PostService: Get post")
+    logger.trace("PostService: Get post by post_id: {}", post_id)
+    logger.info("{} DAO: Get db entry by parameters", "PostModel")
+    logger.trace("{} DAO: Data passed to filter: params: {}", "PostModel", payload)
+    logger.debug("{} DAO: received a response from the database", "PostModel")
+    logger.info("Like DAO: Get users who liked a post")
+    logger.debug("Like DAO: received a response from the database")
+    logger.debug("UnitOfWork: request checked out {} database connections", 1)
+    logger.debug("QueryBudget: {}: {} queries, {:.2f}ms, {} rows", f"GET /posts/{post_id}", 2, 1.5, 3)
+    logger.trace("PostService: post is sent to user with id: {}", user_id)
+
+
+def measure(level: str, requests: int, log_file: str) -> float:
+    # only the file sink logs, the terminal speed is not measured
+    settings = Settings(LOG_LEVEL="CRITICAL", LOG_FILE_LEVEL=level, LOG_FILEPATH=log_file)
+    setup_logger(settings)
+    post_id, user_id = uuid4(), uuid4()
+    payload = {"id": post_id, "text": "x" * 255, "likes": 10, "liked_by": [uuid4() for _ in range(10)]}
+    start = time.perf_counter()
+    for _ in range(requests):
+        request_logs(post_id, user_id, payload)
+    elapsed = time.perf_counter() - start
+    logger.complete()
+    logger.remove()
+    return elapsed / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request logging overhead at INFO vs TRACE")
+    parser.add_argument("--requests", type=int, default=10000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        for level in ("INFO", "TRACE"):
+            overhead = measure(level, args.requests, f"{directory}/{level.lower()}.log")
+            print(f"{level}: {overhead:.1f} us of logging per request")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
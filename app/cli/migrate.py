@@ -0,0 +1,121 @@
+"""Brings the schema of a database created by an earlier version up to date with the models:
+creates missing tables, then runs the steps below, which change existing tables the way create_all does not
+(columns, indexes, constraints); every step is idempotent and runs in its own transaction
+under an advisory lock, so it is safe to run again or from several hosts at once;
+run it before starting the application workers of a new version, new databases need only cli.create_schema;
+usage (from the app directory): python -m cli.migrate"""
+import asyncio
+from typing import Awaitable, Callable, List, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from db.database import create_schema, wait_for_db, engine
+# models are registered in the metadata when imported, the DAOs import all of them
+import db.dao  # noqa: F401
+from utils.logger import setup_logger
+from settings import Settings
+from loguru import logger
+
+
+# key of the transaction level advisory lock serializing concurrent runs
+MIGRATION_LOCK_KEY = 0x6d696772617465
+
+
+async def _constraint_exists(connection: AsyncConnection, name: str) -> bool:
+    query = text("SELECT 1 FROM pg_constraint WHERE conname = :name")
+    return (await connection.execute(query, {"name": name})).first() is not None
+
+
+async def add_likes_unique_constraint(connection: AsyncConnection):
+    """Duplicate likes let in before uq_likes_user_id_post_id existed are removed, keeping the first like
+    of every user and post, likes counters of their posts are corrected, then the constraint is added"""
+    if await _constraint_exists(connection, "uq_likes_user_id_post_id"):
+        return
+    # no duplicates can be added between the cleanup and the constraint
+    await connection.execute(text("LOCK TABLE tbl_likes IN SHARE ROW EXCLUSIVE MODE"))
+    # all parts of the statement see the likes before the delete, so the deleted ones are subtracted
+    resp = await connection.execute(text("""
+        WITH ranked AS (
+            SELECT id, row_number() OVER (PARTITION BY user_id, post_id ORDER BY created_at, id) AS position
+            FROM tbl_likes
+        ), deleted AS (
+            DELETE FROM tbl_likes USING ranked
+            WHERE tbl_likes.id = ranked.id AND ranked.position > 1
+            RETURNING tbl_likes.post_id
+        ), counted AS (
+            SELECT post_id, (SELECT count(*) FROM tbl_likes WHERE tbl_likes.post_id = deleted.post_id) - count(*)
+                AS likes
+            FROM deleted GROUP BY post_id
+        )
+        UPDATE tbl_posts SET likes = counted.likes FROM counted WHERE tbl_posts.id = counted.post_id
+    """))
+    logger.info("Migrate: duplicate likes are removed from {} posts", resp.rowcount)
+    await connection.execute(text("ALTER TABLE tbl_likes "
+                                  "ADD CONSTRAINT uq_likes_user_id_post_id UNIQUE (user_id, post_id)"))
+
+
+async def add_posts_image_key(connection: AsyncConnection):
+    """Key of the post image in the blob storage, images kept in tbl_posts.image are moved by cli.migrate_images"""
+    await connection.execute(text("ALTER TABLE tbl_posts ADD COLUMN IF NOT EXISTS image_key varchar(64)"))
+
+
+async def add_posts_pagination_indexes(connection: AsyncConnection):
+    """Keyset pagination indexes of the global and per-user posts listings, pulled posts of an author
+    in home feeds are read backwards from the per-user one"""
+    await connection.execute(text("CREATE INDEX IF NOT EXISTS ix_posts_created_at_id ON tbl_posts (created_at, id)"))
+    await connection.execute(text("CREATE INDEX IF NOT EXISTS ix_posts_user_id_created_at_id "
+                                  "ON tbl_posts (user_id, created_at, id)"))
+
+
+async def add_follows_columns(connection: AsyncConnection):
+    """Columns of the follow graph and of home feeds; posts left unmarked by the fan-out of an earlier version
+    of authors above FEED_FANOUT_MAX_FOLLOWERS were never fanned out, they are marked to be pulled"""
+    for statement in ("ALTER TABLE tbl_users ADD COLUMN IF NOT EXISTS followers_count integer NOT NULL DEFAULT 0",
+                      "ALTER TABLE tbl_users ADD COLUMN IF NOT EXISTS has_pulled_posts boolean NOT NULL DEFAULT false",
+                      "ALTER TABLE tbl_posts ADD COLUMN IF NOT EXISTS fanned_out boolean",
+                      "DROP INDEX IF EXISTS ix_users_followers_count",
+                      "CREATE INDEX IF NOT EXISTS ix_users_has_pulled_posts ON tbl_users (id) WHERE has_pulled_posts"):
+        await connection.execute(text(statement))
+    resp = await connection.execute(text("""
+        WITH authors AS (
+            UPDATE tbl_users SET has_pulled_posts = true
+            WHERE followers_count > :max_followers AND NOT has_pulled_posts
+            RETURNING id
+        )
+        UPDATE tbl_posts SET fanned_out = false
+        FROM authors WHERE tbl_posts.user_id = authors.id AND tbl_posts.fanned_out IS NULL
+    """), {"max_followers": Settings().FEED_FANOUT_MAX_FOLLOWERS})
+    logger.info("Migrate: {} posts of authors above the fan-out threshold are marked to be pulled", resp.rowcount)
+
+
+STEPS: List[Tuple[str, Callable[[AsyncConnection], Awaitable]]] = [
+    ("likes unique constraint", add_likes_unique_constraint),
+    ("posts image key", add_posts_image_key),
+    ("posts pagination indexes", add_posts_pagination_indexes),
+    ("follows and home feed columns", add_follows_columns),
+]
+
+
+async def migrate():
+    await create_schema()
+    for name, step in STEPS:
+        async with engine.begin() as connection:
+            await connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            logger.info("Migrate: {}", name)
+            await step(connection)
+
+
+async def run(settings: Settings):
+    await wait_for_db(settings.DB_CONNECT_RETRIES, settings.DB_CONNECT_BACKOFF, settings.DB_CONNECT_MAX_BACKOFF)
+    await migrate()
+    await engine.dispose()
+
+
+def main():
+    settings = Settings()
+    setup_logger(settings)
+    asyncio.run(run(settings))
+    logger.info("Migrate: done")
+
+
+if __name__ == "__main__":
+    main()
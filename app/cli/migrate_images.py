@@ -0,0 +1,38 @@
+"""Moves posts images kept in tbl_posts.image to the blob storage by batches;
+usage (from the app directory): python -m cli.migrate_images --batch-size 100"""
+import argparse
+import asyncio
+from db.dao import post_dao
+from storage import blob_storage
+from utils.logger import setup_logger
+from settings import Settings
+from loguru import logger
+
+
+async def migrate_images(batch_size: int) -> int:
+    moved = 0
+    last_id = None
+    while True:
+        rows = await post_dao.get_legacy_images(batch_size, last_id)
+        if not rows:
+            break
+        image_keys = {}
+        for post_id, image in rows:
+            image_keys[post_id] = await blob_storage.save_bytes(image)
+        moved += await post_dao.set_image_keys_many(image_keys)
+        last_id = rows[-1][0]
+        logger.info("MigrateImages: moved {} images to the blob storage", moved)
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move posts images from the database to the blob storage")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    setup_logger(Settings())
+    moved = asyncio.run(migrate_images(args.batch_size))
+    logger.info("MigrateImages: done, {} images moved", moved)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark of posts listing latency at deep pages: offset pagination (GET /posts?offset=...) against
+cursor pagination (GET /posts?paging=cursor) ordered by (created_at, id); seeds its own user and posts
+into the database configured in settings and removes them when finished; usage (from the app directory):
+    python -m cli.pagination_benchmark --posts 1000000 --pages 1 10 100 1000"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List
+from uuid import uuid4
+from loguru import logger
+from sqlalchemy import text
+from db.dao import post_dao, user_dao
+from db.database import create_schema, engine
+from db.enums import EmailStatusesEnum, UserRolesSignupEnum
+from db.models.UserModel import UserModel
+from services.post_service import post_service
+from utils.pagination import encode_cursor
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+class PaginationBenchmark:
+
+    def __init__(self, posts: int, limit: int, chunk_size: int):
+        self._posts = posts
+        self._limit = limit
+        self._chunk_size = chunk_size
+        self._user_id = None
+
+    async def seed(self):
+        name = f"pages_{uuid4().hex[:8]}"
+        author = await user_dao.create({"login": name, "email": f"{name}@example.com", "password": "-",
+                                        "role": UserRolesSignupEnum.USER,
+                                        "email_status": EmailStatusesEnum.VALID.value}, columns=(UserModel.id,))
+        self._user_id = author.id
+        # generated by the database, a million rows would take long to send as parameters
+        insert = text("INSERT INTO tbl_posts (id, user_id, text, likes, fanned_out, created_at, updated_at) "
+                      "SELECT gen_random_uuid(), :user_id, 'benchmark', 0, true, "
+                      "timezone('utc', now()) - make_interval(secs => i), timezone('utc', now()) "
+                      "FROM generate_series(CAST(:start AS integer), CAST(:stop AS integer)) AS i")
+        for start in range(1, self._posts + 1, self._chunk_size):
+            async with engine.begin() as connection:
+                await connection.execute(insert, {"user_id": self._user_id, "start": start,
+                                                  "stop": min(start + self._chunk_size - 1, self._posts)})
+        async with engine.begin() as connection:
+            await connection.execute(text("ANALYZE tbl_posts"))
+
+    async def scenarios(self, page: int) -> Dict[str, Callable[[], Awaitable]]:
+        offset = (page - 1) * self._limit
+        cursor = None
+        if offset:
+            # the cursor a client holds after reading the previous pages
+            last = (await post_dao.get_feed_rows(1, offset - 1, post_service._feed_order))[0]
+            cursor = encode_cursor(last.created_at, last.id)
+        by_offset = [post["id"] for post in await post_service.get_all_posts(self._limit, offset)]
+        by_cursor = [post["id"] for post in (await post_service.get_posts_page(self._limit, cursor))["items"]]
+        assert by_offset == by_cursor, f"page {page} differs between offset and cursor pagination"
+        return {"offset": lambda: post_service.get_all_posts(self._limit, offset),
+                "cursor": lambda: post_service.get_posts_page(self._limit, cursor)}
+
+    async def measure(self, call: Callable[[], Awaitable], requests: int) -> Dict:
+        await call()
+        latencies = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+        return {"p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+                "p99_ms": round(_percentile(latencies, 99) * 1000, 2)}
+
+    async def cleanup(self):
+        # posts are removed with the user (cascade)
+        if self._user_id is not None:
+            await user_dao.delete_many([self._user_id])
+
+
+async def run(args: argparse.Namespace):
+    await create_schema()
+    benchmark = PaginationBenchmark(args.posts, args.limit, args.chunk_size)
+    try:
+        start = time.perf_counter()
+        await benchmark.seed()
+        print(f"posts: {args.posts}, limit: {args.limit}, seeded in {time.perf_counter() - start:.1f} s")
+        print(f"{'page':>6} {'offset p50 ms':>14} {'offset p99 ms':>14} {'cursor p50 ms':>14} {'cursor p99 ms':>14}")
+        for page in args.pages:
+            scenarios = await benchmark.scenarios(page)
+            by_offset = await benchmark.measure(scenarios["offset"], args.requests)
+            by_cursor = await benchmark.measure(scenarios["cursor"], args.requests)
+            print(f"{page:>6} {by_offset['p50_ms']:>14} {by_offset['p99_ms']:>14} "
+                  f"{by_cursor['p50_ms']:>14} {by_cursor['p99_ms']:>14}")
+    finally:
+        await benchmark.cleanup()
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Posts listing latency of offset and cursor pagination")
+    parser.add_argument("--posts", type=int, default=1000000)
+    parser.add_argument("--limit", type=int, default=20, help="posts per page")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100, 1000], help="pages to read")
+    parser.add_argument("--requests", type=int, default=50, help="requests per page and pagination mode")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="posts inserted per transaction")
+    args = parser.parse_args()
+    logger.remove()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Benchmark matrix of database throughput versus connection pool size and worker processes count;
+every worker process has its own pool, as application workers do, and runs feed page queries
+with 'concurrency' coroutines for 'duration' seconds; compare workers * pool size with max_connections
+to size pools per node; usage (from the app directory):
+    python -m cli.pool_benchmark --pool-sizes 2 5 10 20 --workers 1 2 4 --output pool.json"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List
+from loguru import logger
+
+
+def _worker(pool_size: int, concurrency: int, duration: float, start_at: float) -> Dict:
+    # pool settings are read by db.database on import, the worker process imports it after setting them
+    os.environ["DB_POOL_SIZE"] = str(pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = "0"
+    logger.remove()
+    from db.dao import post_dao
+    from db.database import engine, warm_up_pool
+
+    async def run() -> Dict:
+        await warm_up_pool(pool_size)
+        await asyncio.sleep(max(0.0, start_at - time.time()))
+        deadline = time.monotonic() + duration
+        latencies: List[float] = []
+
+        async def client():
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                await post_dao.get_all_by(limit=20, offset=0)
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        await engine.dispose()
+        return {"queries": len(latencies), "latency": sum(latencies)}
+
+    return asyncio.run(run())
+
+
+def measure(pool_size: int, workers: int, concurrency: int, duration: float) -> Dict:
+    start_at = time.time() + 2 + workers * 0.5
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as executor:
+        futures = [executor.submit(_worker, pool_size, concurrency, duration, start_at) for _ in range(workers)]
+        results = [future.result() for future in futures]
+    queries = sum(result["queries"] for result in results)
+    return {"pool_size": pool_size,
+            "workers": workers,
+            "connections": pool_size * workers,
+            "throughput": round(queries / duration, 2),
+            "avg_latency_ms": round(sum(result["latency"] for result in results) / max(queries, 1) * 1000, 2)}
+
+
+async def max_connections() -> int:
+    from sqlalchemy import text
+    from db.database import engine
+    async with engine.connect() as connection:
+        value = (await connection.execute(text("SHOW max_connections"))).scalar()
+    await engine.dispose()
+    return int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Database throughput versus pool size and workers count")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[2, 5, 10, 20])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent queries per worker")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per matrix cell")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+    logger.remove()
+    limit = asyncio.run(max_connections())
+    results = []
+    print(f"max_connections: {limit}")
+    print(f"{'pool size':>10} {'workers':>8} {'connections':>12} {'queries/s':>10} {'avg ms':>8}")
+    for workers in args.workers:
+        for pool_size in args.pool_sizes:
+            if pool_size * workers > limit:
+                print(f"{pool_size:>10} {workers:>8} {pool_size * workers:>12} exceeds max_connections, skipped")
+                continue
+            result = measure(pool_size, workers, args.concurrency, args.duration)
+            results.append(result)
+            print(f"{pool_size:>10} {workers:>8} {result['connections']:>12} "
+                  f"{result['throughput']:>10} {result['avg_latency_ms']:>8}")
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump({"max_connections": limit, "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Benchmark of posts page serialization: the former pipeline (model.dict() -> PostDTO -> PostRespDTO,
+response_model revalidation, jsonable_encoder and json) against the single pass RowSerializer and orjson;
+works in memory, no database is needed; usage (from the app directory):
+    python -m cli.serialization_benchmark --pages 100 1000"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from typing import Callable, List
+from uuid import uuid4
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import parse_obj_as
+from db.models.PostModel import PostModel
+from db.dto import PostDTO, PostRespDTO
+from utils.serializers import RowSerializer
+
+
+IMAGE_URL = "http://127.0.0.1:6000/posts/{post_id}/images"
+IMAGE_URL_PREFIX, IMAGE_URL_SUFFIX = IMAGE_URL.split("{post_id}")
+
+
+def make_posts(count: int) -> List[PostModel]:
+    now = datetime.utcnow()
+    return [PostModel(id=uuid4(), user_id=uuid4(), text="x" * 200, image_key=None, likes=10,
+                      created_at=now, updated_at=now)
+            for _ in range(count)]
+
+
+def former_pipeline(posts: List[PostModel], liked_by: list) -> bytes:
+    response = []
+    for post_db in posts:
+        post = PostDTO(**post_db.dict())
+        post = PostRespDTO(**post.dict())
+        post.image = IMAGE_URL.format(post_id=post.id)
+        post.liked_by = liked_by
+        response.append(post)
+    # what FastAPI does with the returned objects and response_model
+    validated = parse_obj_as(List[PostRespDTO], response)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+post_serializer = RowSerializer.for_dto(PostRespDTO, exclude=("liked_by", "image"))
+
+
+def single_pass(posts: List[PostModel], liked_by: list) -> bytes:
+    response = []
+    for post_db in posts:
+        post = post_serializer(post_db)
+        post["image"] = f"{IMAGE_URL_PREFIX}{post['id']}{IMAGE_URL_SUFFIX}"
+        post["liked_by"] = liked_by
+        response.append(post)
+    return orjson.dumps(response)
+
+
+def measure(pipeline: Callable, posts: List[PostModel], liked_by: list, repeat: int) -> float:
+    pipeline(posts, liked_by)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        pipeline(posts, liked_by)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Posts page serialization cost")
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 1000], help="posts per page")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    liked_by = [uuid4() for _ in range(5)]
+    print(f"{'posts':>6} {'former ms':>10} {'single pass ms':>15} {'speedup':>8}")
+    for size in args.pages:
+        posts = make_posts(size)
+        former = measure(former_pipeline, posts, liked_by, args.repeat)
+        single = measure(single_pass, posts, liked_by, args.repeat)
+        print(f"{size:>6} {former:>10.2f} {single:>15.2f} {former / single:>7.1f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
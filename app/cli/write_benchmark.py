@@ -0,0 +1,162 @@
+"""Benchmark of write endpoints throughput with BaseDAO.create and BaseDAO.patch as single
+INSERT/UPDATE ... RETURNING statements, against their former implementations: add, commit and refresh
+for create, UPDATE, commit and a lookup of the entry for patch; drives the application in-process
+through ASGI transport against the database configured in settings (use a local one, the benchmark
+registers users and writes posts); hunter.io is stubbed; registrations hash passwords with
+PASSWORD_HASH_ROUNDS, lower it to measure the database part; usage (from the app directory):
+    PASSWORD_HASH_ROUNDS=4 python -m cli.write_benchmark --requests 500 --concurrency 10"""
+import argparse
+import asyncio
+import sys
+import time
+from itertools import count
+from types import MethodType
+from typing import Awaitable, Callable, Dict
+from uuid import uuid4
+import httpx
+from sqlalchemy import update
+from main import app
+from db.dao import post_dao, profile_dao, user_dao
+from db.dao.base_dao import BaseDAO
+from db.database import create_schema
+from db.enums import EmailStatusesEnum
+from db.query_stats import query_stats
+from routers.api_spec import ApiSpec
+from services.external_api_service import external_api_service
+from loguru import logger
+
+
+PASSWORD = "benchmark-password"
+
+
+async def _stub_verify_email_hunter(email: str) -> EmailStatusesEnum:
+    return EmailStatusesEnum.VALID
+
+
+# BaseDAO.create and BaseDAO.patch as they were, each call commits its own session
+async def _legacy_create(self: BaseDAO, input_data, columns=None):
+    new_line = input_data if isinstance(input_data, dict) else input_data.dict()
+    db_model = self._model(**new_line)
+    async with self._session_generator() as session:
+        session.add(db_model)
+        await session.commit()
+        await session.refresh(db_model)
+    return db_model
+
+
+async def _legacy_patch(self: BaseDAO, patch_data, item_id, columns=None):
+    pushed_data = patch_data if isinstance(patch_data, dict) else patch_data.dict(exclude_unset=True)
+    async with self._session_generator() as session:
+        await session.execute(update(self._model).where(self._model.id == item_id).values(pushed_data))
+        await session.commit()
+        return await session.get(self._model, item_id)
+
+
+class WriteBenchmark:
+    """Registers an author with a post to update, then sends 'requests' requests of every scenario
+    with 'concurrency' requests in flight"""
+
+    def __init__(self, client: httpx.AsyncClient, requests: int, concurrency: int):
+        self._client = client
+        self._requests = requests
+        self._concurrency = concurrency
+        self._run_id = uuid4().hex[:8]
+        self._registrations = count()
+        self._author: Dict = {}
+        self._post_id = None
+
+    def _user_data(self, name: str) -> Dict:
+        login = f"write_{self._run_id}_{name}"
+        return {"login": login, "email": f"{login}@example.com", "password": PASSWORD, "role": "user",
+                "first_name": "Bench", "last_name": name, "birth_date": "01-01-1990"}
+
+    async def seed(self):
+        data = self._user_data("author")
+        resp = await self._client.post(ApiSpec.REGISTRATION, json=data)
+        resp.raise_for_status()
+        user_id = resp.json()["id"]
+        resp = await self._client.post(ApiSpec.AUTH, data={"username": data["login"], "password": PASSWORD})
+        resp.raise_for_status()
+        self._author = {"id": user_id, "headers": {"Authorization": f"Bearer {resp.json()['access_token']}"}}
+        resp = await self._client.post(ApiSpec.POSTS, headers=self._author["headers"], data={"text": "Benchmark"})
+        resp.raise_for_status()
+        self._post_id = resp.json()["id"]
+
+    def scenarios(self) -> Dict[str, Callable[[int], Awaitable[httpx.Response]]]:
+        headers = self._author["headers"]
+        return {
+            "registration": lambda i: self._client.post(
+                ApiSpec.REGISTRATION, json=self._user_data(f"user{next(self._registrations)}")),
+            "create_post": lambda i: self._client.post(ApiSpec.POSTS, headers=headers, data={"text": f"Post {i}"}),
+            "update_post": lambda i: self._client.patch(ApiSpec.POSTS_DETAILS.format(post_id=self._post_id),
+                                                        headers=headers, data={"text": f"Updated {i}"}),
+            "update_profile": lambda i: self._client.patch(ApiSpec.USERS_PROFILES.format(user_id=self._author["id"]),
+                                                           headers=headers, json={"about": f"About {i}"}),
+        }
+
+    async def run_scenario(self, request: Callable[[int], Awaitable[httpx.Response]]) -> Dict:
+        semaphore = asyncio.Semaphore(self._concurrency)
+        queries, errors = [], 0
+
+        async def send(i: int):
+            nonlocal errors
+            async with semaphore:
+                with query_stats() as stats:
+                    resp = await request(i)
+                queries.append(stats.statements)
+                if resp.status_code >= 400:
+                    errors += 1
+                    logger.debug("WriteBenchmark: {} {}", resp.status_code, resp.text)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send(i) for i in range(self._requests)))
+        elapsed = time.perf_counter() - start
+        return {"writes_per_sec": round(self._requests / elapsed, 2),
+                "queries_per_request": round(sum(queries) / len(queries), 2),
+                "errors": errors}
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, Dict]]:
+    external_api_service.verify_email_hunter = _stub_verify_email_hunter
+    await create_schema()
+    await app.router.startup()
+    # the startup installs the log sinks of the settings, the tables are the only output
+    logger.remove()
+    results: Dict[str, Dict[str, Dict]] = {}
+    # methods are replaced on the instances, they are wrapped there by the metrics instrumentation
+    daos = (post_dao, profile_dao, user_dao)
+    current = {dao: (dao.create, dao.patch) for dao in daos}
+    legacy = {dao: (MethodType(_legacy_create, dao), MethodType(_legacy_patch, dao)) for dao in daos}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+            benchmark = WriteBenchmark(client, args.requests, args.concurrency)
+            await benchmark.seed()
+            for mode, methods in (("before", legacy), ("returning", current)):
+                for dao, (create, patch) in methods.items():
+                    dao.create, dao.patch = create, patch
+                for name, request in benchmark.scenarios().items():
+                    results.setdefault(name, {})[mode] = await benchmark.run_scenario(request)
+    finally:
+        for dao, (create, patch) in current.items():
+            dao.create, dao.patch = create, patch
+        await app.router.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write endpoints throughput before and after RETURNING")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario and mode")
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    logger.remove()
+    results = asyncio.run(run(args))
+    print(f"{'endpoint':<16} {'before w/s':>11} {'queries':>8} {'returning w/s':>14} {'queries':>8} {'errors':>7}")
+    for name, result in results.items():
+        before, after = result["before"], result["returning"]
+        print(f"{name:<16} {before['writes_per_sec']:>11} {before['queries_per_request']:>8} "
+              f"{after['writes_per_sec']:>14} {after['queries_per_request']:>8} "
+              f"{before['errors'] + after['errors']:>7}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
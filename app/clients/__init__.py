@@ -0,0 +1 @@
+from .http_client import http_client, HTTPClient, HTTPClientError, HTTPClientTimeoutError, HTTPClientConnectionError
@@ -1,25 +1,79 @@
-from typing import Optional
+from typing import Optional, Tuple, Any
 import aiohttp
 import asyncio
+from settings import Settings
+from loguru import logger
 
 
-async def request(method: str, url: str, payload: Optional[dict], headers: Optional[dict]) -> aiohttp.ClientResponse:
-    session = aiohttp.ClientSession()
-    try:
-        async with session:
-            response = await session.request(method, url, json=payload, headers=headers)
-            # await session.close()
-            resp = await response.json()
-            return response.status, resp
-    except TypeError:
+settings = Settings()
+
+
+class HTTPClientError(Exception):
+    """Request to external server failed before a response was received"""
+
+
+class HTTPClientTimeoutError(HTTPClientError):
+    pass
+
+
+class HTTPClientConnectionError(HTTPClientError):
+    pass
+
+
+class HTTPClient:
+    """Long-lived HTTP client with a keep-alive connection pool shared by all external API calls;
+    started and closed with the application"""
+
+    def __init__(self, pool_size: int, pool_size_per_host: int, connect_timeout: float,
+                 read_timeout: float, dns_cache_ttl: int):
+        self._pool_size = pool_size
+        self._pool_size_per_host = pool_size_per_host
+        self._timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self._dns_cache_ttl = dns_cache_ttl
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self._pool_size,
+                                             limit_per_host=self._pool_size_per_host,
+                                             use_dns_cache=True,
+                                             ttl_dns_cache=self._dns_cache_ttl)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self._timeout)
+        return self._session
+
+    async def start(self):
+        self._get_session()
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def request(self, method: str, url: str, payload: Optional[dict] = None,
+                      headers: Optional[dict] = None) -> Tuple[int, Any]:
+        session = self._get_session()
         try:
-            async with session:
-                response = await session.request(method, url, data=payload, headers=headers)
-                # await session.close()
-                resp = await response.json()
-                return response.status, resp
+            try:
+                async with session.request(method, url, json=payload or None, headers=headers) as response:
+                    return response.status, await response.json()
+            except TypeError:
+                # payload is not JSON serializable, send it as form data
+                async with session.request(method, url, data=payload, headers=headers) as response:
+                    return response.status, await response.json()
         except asyncio.TimeoutError as e:
-            return e
-    except asyncio.TimeoutError as e:
-        return e
-# TODO: change the exceptions system
+            logger.warning("HTTPClient: {} request to external server timed out", method)
+            raise HTTPClientTimeoutError(f"{method} request timed out") from e
+        except aiohttp.ClientError as e:
+            logger.warning("HTTPClient: {} request to external server failed: {!r}", method, e)
+            raise HTTPClientConnectionError(f"{method} request failed: {e!r}") from e
+
+
+http_client = HTTPClient(pool_size=settings.HTTP_CLIENT_POOL_SIZE,
+                         pool_size_per_host=settings.HTTP_CLIENT_POOL_SIZE_PER_HOST,
+                         connect_timeout=settings.HTTP_CLIENT_CONNECT_TIMEOUT,
+                         read_timeout=settings.HTTP_CLIENT_READ_TIMEOUT,
+                         dns_cache_ttl=settings.HTTP_CLIENT_DNS_CACHE_TTL)
+
+
+async def request(method: str, url: str, payload: Optional[dict], headers: Optional[dict]) -> Tuple[int, Any]:
+    return await http_client.request(method, url, payload, headers)
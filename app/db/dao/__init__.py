@@ -1,4 +1,6 @@
+from .follow_dao import follow_dao, FollowDAO
 from .like_dao import like_dao, LikeDAO
 from .post_dao import post_dao, PostDAO
 from .profile_dao import profile_dao, ProfileDAO
+from .timeline_dao import timeline_dao, TimelineDAO
 from .user_dao import user_dao, UserDAO
@@ -1,9 +1,16 @@
-from typing import TypeVar, Generic, Type, NoReturn, List
+from contextlib import asynccontextmanager
+from typing import TypeVar, Generic, Type, NoReturn, List, Sequence, Optional, AsyncIterator, Iterator, Dict, \
+    Callable, Hashable
 from pydantic import BaseModel as BaseSchema
-from sqlalchemy import select, update, delete
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, update, delete, tuple_, literal, inspect, any_, bindparam, and_, func, \
+    BigInteger, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncConnection
+from sqlalchemy.sql import Executable
 from db.models import BaseModel
 from db.database import SessionLocal, engine
+from db.unit_of_work import current_unit_of_work
 from loguru import logger
 
 
@@ -14,73 +21,319 @@ DeleteDTOType = TypeVar("DeleteDTOType", bound=BaseSchema)
 
 
 class BaseDAO(Generic[DBModelType, CreateDTOType, UpdateDTOType, DeleteDTOType]):
+    # default number of rows per statement of bulk operations
+    chunk_size = 1000
+    # statements are built once per shape (filter fields, options, returned columns) and reused,
+    # parameters are passed as bind parameters; set to False to build statements on every call
+    cache_statements = True
+    statements_cache_size = 256
+
     def __init__(self, model: Type[DBModelType],
                  session_generator: Type[AsyncSession] = SessionLocal):
         self._model = model
         self._session_generator = session_generator
+        self._default_columns = [prop.columns[0].label(prop.key)
+                                 for prop in inspect(model).column_attrs if not prop.deferred]
+        self._statements: Dict[Hashable, Executable] = {}
+
+    def _statement(self, key: Hashable, build: Callable[[], Executable]) -> Executable:
+        if not self.cache_statements:
+            return build()
+        stmt = self._statements.get(key)
+        if stmt is None:
+            stmt = build()
+            # shapes are few, options created on every call would make keys unbounded
+            if len(self._statements) < self.statements_cache_size:
+                self._statements[key] = stmt
+        return stmt
+
+    def _where(self, keys: Sequence[str]):
+        """Equality filters of the model fields with bind parameters named '_<field>'"""
+        return and_(True, *[getattr(self._model, key) == bindparam(f"_{key}", type_=getattr(self._model, key).type)
+                            for key in keys])
+
+    @staticmethod
+    def _params(filters: Dict, **params) -> Dict:
+        params.update({f"_{key}": value for key, value in filters.items()})
+        return params
+
+    def _keyset_where(self, keyset: Sequence):
+        return tuple_(*keyset) < tuple_(*[bindparam(f"_after_{i}", type_=column.type)
+                                          for i, column in enumerate(keyset)])
+
+    @staticmethod
+    def _after_params(after: Optional[Sequence]) -> Dict:
+        return {f"_after_{i}": value for i, value in enumerate(after or ())}
+
+    def _returning(self, columns: Optional[Sequence]) -> Sequence:
+        if columns is None:
+            return self._default_columns
+        return [column.label(column.key) for column in columns]
+
+    @asynccontextmanager
+    async def _session(self) -> AsyncIterator[AsyncSession]:
+        """Joins the session of the current unit of work if there is one,
+        otherwise opens a new session for the call"""
+        uow = current_unit_of_work()
+        if uow is not None:
+            yield uow.session
+        else:
+            async with self._session_generator() as session:
+                yield session
 
-    async def create(self, input_data: CreateDTOType) -> DBModelType:
-        logger.info(f"{self._model.__name__} DAO: Create db entry")
-        logger.trace(f"{self._model.__name__} DAO: Data passed for creation: {input_data}")
+    @asynccontextmanager
+    async def _connection(self) -> AsyncIterator[AsyncConnection]:
+        """Connection for Core statements returning plain rows, without ORM loading and identity map;
+        the connection of the current unit of work if there is one, otherwise a pooled connection"""
+        uow = current_unit_of_work()
+        if uow is not None:
+            yield await uow.session.connection()
+        else:
+            async with engine.connect() as connection:
+                yield connection
+
+    @staticmethod
+    async def _commit(session: AsyncSession):
+        """Commits own session of the call; inside a unit of work only flushes,
+        the unit of work commits once when finished"""
+        uow = current_unit_of_work()
+        if uow is not None and uow.session is session:
+            uow.has_writes = True
+            await session.flush()
+        else:
+            await session.commit()
+
+    async def create(self, input_data: CreateDTOType, columns: Sequence = None) -> DBModelType:
+        """Inserts the entry with a single INSERT ... RETURNING statement;
+        returns a model instance filled with 'columns' (all not deferred columns by default)"""
+        logger.info("{} DAO: Create db entry", self._model.__name__)
         if isinstance(input_data, dict):
             new_line = input_data
         else:
             new_line = input_data.dict()
-        db_model = self._model(**new_line)
-        async with self._session_generator() as session:
-            session.add(db_model)
-            await session.commit()
-            await session.refresh(db_model)
-        logger.debug(f"{self._model.__name__} DAO: Create entry in database: {db_model}")
+        # values are not logged, they may be password hashes or images
+        logger.trace("{} DAO: Fields passed for creation: {}", self._model.__name__, sorted(new_line))
+        stmt = insert(self._model).values(new_line).returning(*self._returning(columns))
+        async with self._session() as session:
+            row = (await session.execute(stmt)).first()
+            await self._commit(session)
+        db_model = self._model(**row._mapping)
+        logger.debug("{} DAO: Created entry in database", self._model.__name__)
         return db_model
 
-    async def get_by(self, **kwargs) -> DBModelType:
-        logger.info(f"{self._model.__name__} DAO: Get db entry by parameters")
+    async def get_by(self, options: Sequence = (), **kwargs) -> DBModelType:
+        """'options' are loader options of the query, e.g. load_only() or undefer() of columns"""
+        logger.info("{} DAO: Get db entry by parameters", self._model.__name__)
         logger.trace(
-            f"{self._model.__name__} DAO: Data passed to filter: params: {kwargs}")
-        async with self._session_generator() as session:
-            resp = await session.execute(select(self._model).filter_by(**kwargs))
+            "{} DAO: Data passed to filter: params: {}", self._model.__name__, kwargs)
+        keys = tuple(sorted(kwargs))
+        stmt = self._statement(("get_by", keys, tuple(options)),
+                               lambda: select(self._model).options(*options).where(self._where(keys)))
+        async with self._session() as session:
+            resp = await session.execute(stmt, self._params(kwargs))
             resp = resp.scalar()
-            logger.debug(f"{self._model.__name__} DAO: received a response from the database")
+            logger.debug("{} DAO: received a response from the database", self._model.__name__)
             return resp
 
-    async def get_all_by(self, limit: int, offset: int, **kwargs) -> List[DBModelType]:
-        logger.info(f"{self._model.__name__} DAO: Get all db entries by parameters")
-        logger.info(
-            f"{self._model.__name__} DAO: Data passed to filter: limit: {limit}, offset: {offset}, parameters: {kwargs}")
-        async with self._session_generator() as session:
-            result = await session.execute(select(self._model).filter_by(**kwargs).offset(offset).limit(limit))
+    async def get_all_by(self, limit: int, offset: int, order_by: Sequence = (), options: Sequence = (),
+                         **kwargs) -> List[DBModelType]:
+        logger.info("{} DAO: Get all db entries by parameters", self._model.__name__)
+        logger.trace(
+            "{} DAO: Data passed to filter: limit: {}, offset: {}, parameters: {}",
+            self._model.__name__, limit, offset, kwargs)
+        stmt = self._all_statement(self._model, options, order_by, tuple(sorted(kwargs)))
+        async with self._session() as session:
+            result = await session.execute(stmt, self._params(kwargs, _limit=int(limit), _offset=int(offset)))
             resp = [raw[0] for raw in result]
-            logger.debug(f"{self._model.__name__} DAO: received a response from the database")
+            logger.debug("{} DAO: received a response from the database", self._model.__name__)
             return resp
 
-    async def get_by_id(self, item_id) -> DBModelType:
-        logger.info(f"{self._model.__name__} DAO: Get db entry by id: {item_id}")
-        async with self._session_generator() as session:
-            resp = await session.get(self._model, item_id)
-            logger.debug(f"{self._model.__name__} DAO: received a response from the database")
+    async def get_page_by(self, limit: int, keyset: Sequence, after: Optional[Sequence] = None,
+                          options: Sequence = (), **kwargs) -> List[DBModelType]:
+        """Keyset pagination: returns up to 'limit' entries ordered by 'keyset' columns descending,
+        starting right after the entry with 'after' values of the keyset columns"""
+        logger.info("{} DAO: Get page of db entries by parameters", self._model.__name__)
+        logger.trace(
+            "{} DAO: Data passed to filter: limit: {}, after: {}, parameters: {}",
+            self._model.__name__, limit, after, kwargs)
+        stmt = self._page_statement(self._model, options, keyset, after is not None, tuple(sorted(kwargs)))
+        async with self._session() as session:
+            result = await session.execute(stmt, self._params(kwargs, _limit=int(limit), **self._after_params(after)))
+            resp = [raw[0] for raw in result]
+            logger.debug("{} DAO: received a response from the database", self._model.__name__)
             return resp
 
-    async def patch(self, patch_data, item_id) -> DBModelType:
-        logger.info(f"{self._model.__name__} DAO: Update db entry")
-        logger.trace(
-            f"{self._model.__name__} DAO: Data passed for update: item_id: {item_id}, patch_data: {patch_data}")
-        async with self._session_generator() as session:
-            if isinstance(patch_data, dict):
-                pushed_data = patch_data
-            else:
-                pushed_data = patch_data.dict(exclude_unset=True)
-            await session.execute(update(self._model).
-                                  where(self._model.id == item_id).
-                                  values(pushed_data))
-            await session.commit()
-            resp = await session.get(self._model, item_id)
-            logger.debug(f"{self._model.__name__} DAO: Received updated entry from the database")
+    async def get_by_id(self, item_id, options: Sequence = ()) -> DBModelType:
+        logger.info("{} DAO: Get db entry by id: {}", self._model.__name__, item_id)
+        async with self._session() as session:
+            resp = await session.get(self._model, item_id, options=options)
+            logger.debug("{} DAO: received a response from the database", self._model.__name__)
             return resp
 
+    async def patch(self, patch_data, item_id, columns: Sequence = None) -> Optional[DBModelType]:
+        """Updates the entry with a single UPDATE ... RETURNING statement;
+        returns a model instance filled with 'columns' (all not deferred columns by default),
+        or None if there is no entry with such id"""
+        logger.info("{} DAO: Update db entry", self._model.__name__)
+        if isinstance(patch_data, dict):
+            pushed_data = patch_data
+        else:
+            pushed_data = patch_data.dict(exclude_unset=True)
+        keys = tuple(sorted(pushed_data))
+        logger.trace("{} DAO: Fields passed for update: item_id: {}, fields: {}", self._model.__name__, item_id, keys)
+        columns_key = tuple(columns) if columns is not None else None
+        if keys:
+            stmt = self._statement(("patch", keys, columns_key), lambda: update(self._model).
+                                   where(self._where(["id"])).
+                                   values({key: bindparam(f"_set_{key}") for key in keys}).
+                                   returning(*self._returning(columns)))
+        else:
+            stmt = self._statement(("patch", keys, columns_key),
+                                   lambda: select(*self._returning(columns)).where(self._where(["id"])))
+        params = {f"_set_{key}": value for key, value in pushed_data.items()}
+        async with self._session() as session:
+            row = (await session.execute(stmt, self._params({"id": item_id}, **params))).first()
+            await self._commit(session)
+        logger.debug("{} DAO: Received updated entry from the database", self._model.__name__)
+        if row is None:
+            return None
+        return self._model(**row._mapping)
+
     async def delete(self, item_id: str) -> NoReturn:
-        async with self._session_generator() as session:
-            await session.execute(delete(self._model).
-                                  where(self._model.id == item_id))
-            await session.commit()
+        stmt = self._statement(("delete",), lambda: delete(self._model).where(self._where(["id"])))
+        async with self._session() as session:
+            await session.execute(stmt, self._params({"id": item_id}))
+            await self._commit(session)
+
+    def _all_statement(self, selected, options: Sequence, order_by: Sequence, keys: Sequence) -> Executable:
+        return self._statement(
+            ("all", selected if isinstance(selected, tuple) else None, tuple(options), tuple(order_by), keys),
+            lambda: self._select(selected).options(*options).where(self._where(keys)).order_by(*order_by).
+            offset(bindparam("_offset", type_=Integer)).limit(bindparam("_limit", type_=Integer)))
+
+    def _page_statement(self, selected, options: Sequence, keyset: Sequence, has_after: bool,
+                        keys: Sequence) -> Executable:
+        def build():
+            query = self._select(selected).options(*options).where(self._where(keys))
+            if has_after:
+                query = query.where(self._keyset_where(keyset))
+            return query.order_by(*[column.desc() for column in keyset]).limit(bindparam("_limit", type_=Integer))
+        return self._statement(
+            ("page", selected if isinstance(selected, tuple) else None, tuple(options), tuple(keyset), has_after, keys),
+            build)
+
+    def _select(self, selected):
+        return select(*selected) if isinstance(selected, tuple) else select(selected)
+
+    async def get_all_rows_by(self, columns: Sequence, limit: int, offset: int, order_by: Sequence = (),
+                              **kwargs) -> List[Row]:
+        """Core fast path of get_all_by for read-only queries: returns plain rows of 'columns'
+        instead of model instances"""
+        logger.info("{} DAO: Get all db rows by parameters", self._model.__name__)
+        stmt = self._all_statement(tuple(columns), (), order_by, tuple(sorted(kwargs)))
+        async with self._connection() as connection:
+            result = await connection.execute(stmt, self._params(kwargs, _limit=int(limit), _offset=int(offset)))
+            resp = result.all()
+        logger.debug("{} DAO: received {} rows from the database", self._model.__name__, len(resp))
+        return resp
+
+    async def get_page_rows_by(self, columns: Sequence, limit: int, keyset: Sequence,
+                               after: Optional[Sequence] = None, **kwargs) -> List[Row]:
+        """Core fast path of get_page_by for read-only queries: returns plain rows of 'columns'
+        instead of model instances"""
+        logger.info("{} DAO: Get page of db rows by parameters", self._model.__name__)
+        stmt = self._page_statement(tuple(columns), (), keyset, after is not None, tuple(sorted(kwargs)))
+        async with self._connection() as connection:
+            result = await connection.execute(stmt, self._params(kwargs, _limit=int(limit),
+                                                                 **self._after_params(after)))
+            resp = result.all()
+        logger.debug("{} DAO: received {} rows from the database", self._model.__name__, len(resp))
+        return resp
+
+    async def try_advisory_lock(self, key: int) -> bool:
+        """Takes the transaction level advisory lock 'key' unless another transaction holds it;
+        the lock is released when the transaction ends, so it is taken in a unit of work to be held by it"""
+        logger.info("{} DAO: Try advisory lock {}", self._model.__name__, key)
+        stmt = self._statement(("advisory_lock",),
+                               lambda: select(func.pg_try_advisory_xact_lock(bindparam("_key", type_=BigInteger))))
+        async with self._connection() as connection:
+            return (await connection.execute(stmt, {"_key": key})).scalar()
+
+    def _chunks(self, items: Sequence, chunk_size: Optional[int]) -> Iterator[Sequence]:
+        chunk_size = chunk_size or self.chunk_size
+        for start in range(0, len(items), chunk_size):
+            yield items[start:start + chunk_size]
+
+    def _ids_array(self, ids: Sequence):
+        return any_(literal(list(ids), ARRAY(self._model.id.type)))
+
+    async def create_many(self, input_data: Sequence, columns: Sequence = None,
+                          chunk_size: int = None) -> List[DBModelType]:
+        """Inserts entries with multi-row INSERT ... RETURNING statements, 'chunk_size' rows per statement;
+        all entries must have the same set of fields; returns model instances in the input order"""
+        logger.info("{} DAO: Create {} db entries", self._model.__name__, len(input_data))
+        new_lines = [item if isinstance(item, dict) else item.dict() for item in input_data]
+        resp = []
+        async with self._session() as session:
+            for chunk in self._chunks(new_lines, chunk_size):
+                stmt = insert(self._model).values(list(chunk)).returning(*self._returning(columns))
+                rows = (await session.execute(stmt)).all()
+                resp.extend(self._model(**row._mapping) for row in rows)
+            await self._commit(session)
+        logger.debug("{} DAO: Created {} entries in database", self._model.__name__, len(resp))
+        return resp
+
+    async def get_many_by_ids(self, item_ids: Sequence, options: Sequence = (),
+                              chunk_size: int = None) -> List[Optional[DBModelType]]:
+        """Fetches entries with WHERE id = ANY(...) statements, 'chunk_size' ids per statement;
+        returns entries in the order of 'item_ids', None for ids with no entry"""
+        logger.info("{} DAO: Get {} db entries by ids", self._model.__name__, len(item_ids))
+        found = {}
+        async with self._session() as session:
+            for chunk in self._chunks(item_ids, chunk_size):
+                query = select(self._model).options(*options).where(self._model.id == self._ids_array(chunk))
+                for item in (await session.execute(query)).scalars():
+                    found[str(item.id)] = item
+        logger.debug("{} DAO: received {} entries from the database", self._model.__name__, len(found))
+        return [found.get(str(item_id)) for item_id in item_ids]
+
+    async def patch_many(self, patch_data: Dict, chunk_size: int = None) -> NoReturn:
+        """Applies {item_id: patch_data} updates with executemany UPDATE statements,
+        one statement per set of updated fields, 'chunk_size' entries per batch"""
+        logger.info("{} DAO: Update {} db entries", self._model.__name__, len(patch_data))
+        # entries updating the same fields share one statement
+        batches = {}
+        for item_id, data in patch_data.items():
+            pushed_data = data if isinstance(data, dict) else data.dict(exclude_unset=True)
+            if pushed_data:
+                params = {f"_{key}": value for key, value in pushed_data.items()}
+                params["_item_id"] = item_id
+                batches.setdefault(tuple(sorted(pushed_data)), []).append(params)
+        table = self._model.__table__
+        async with self._session() as session:
+            # Core executemany: ORM update with a list of parameters would be a bulk update by primary key,
+            # which ignores the WHERE clause and expects parameters named after the model attributes
+            connection = await session.connection()
+            for keys, params in batches.items():
+                stmt = update(table).\
+                    where(table.c.id == bindparam("_item_id")).\
+                    values({key: bindparam(f"_{key}") for key in keys})
+                for chunk in self._chunks(params, chunk_size):
+                    await connection.execute(stmt, list(chunk))
+            await self._commit(session)
+        logger.debug("{} DAO: Updated entries in database", self._model.__name__)
 
+    async def delete_many(self, item_ids: Sequence, chunk_size: int = None) -> int:
+        """Deletes entries with WHERE id = ANY(...) statements, 'chunk_size' ids per statement;
+        returns the number of deleted entries"""
+        logger.info("{} DAO: Delete {} db entries", self._model.__name__, len(item_ids))
+        deleted = 0
+        async with self._session() as session:
+            for chunk in self._chunks(item_ids, chunk_size):
+                resp = await session.execute(delete(self._model).
+                                             where(self._model.id == self._ids_array(chunk)).
+                                             execution_options(synchronize_session=False))
+                deleted += resp.rowcount
+            await self._commit(session)
+        logger.debug("{} DAO: Deleted {} entries from database", self._model.__name__, deleted)
+        return deleted
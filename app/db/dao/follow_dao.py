@@ -0,0 +1,76 @@
+from typing import Optional, List
+from uuid import uuid4
+from datetime import datetime
+from sqlalchemy import select, update, delete, literal
+from sqlalchemy.dialects.postgresql import insert, UUID
+from sqlalchemy.engine import Row
+from db.models.FollowModel import FollowModel
+from db.models.UserModel import UserModel
+from .base_dao import BaseDAO
+from loguru import logger
+
+
+class FollowDAO(BaseDAO[FollowModel, None, None, None]):
+
+    async def follow(self, follower_id, followee_id) -> Optional[Row]:
+        """Atomically adds a follow and increments the followee's followers counter in a single statement;
+        the follow is inserted only if the followee exists and is not the follower;
+        returns (id, followers_count) row of the followee or None if nothing was changed"""
+        logger.info("Follow DAO: Follow a user")
+        logger.trace("Follow DAO: Follow a user: follower_id: {}, followee_id: {}", follower_id, followee_id)
+        followee = select(literal(uuid4(), UUID(as_uuid=True)),
+                          literal(follower_id, UUID(as_uuid=True)),
+                          UserModel.id,
+                          literal(datetime.utcnow())).\
+            where(UserModel.id == followee_id, UserModel.id != follower_id)
+        inserted = insert(FollowModel).\
+            from_select([FollowModel.id, FollowModel.follower_id, FollowModel.followee_id, FollowModel.created_at],
+                        followee).\
+            on_conflict_do_nothing(index_elements=[FollowModel.follower_id, FollowModel.followee_id]).\
+            returning(FollowModel.followee_id).\
+            cte('inserted_follow')
+        stmt = update(UserModel).\
+            where(UserModel.id == inserted.c.followee_id).\
+            values(followers_count=UserModel.followers_count + 1).\
+            returning(UserModel.id, UserModel.followers_count).\
+            execution_options(synchronize_session=False)
+        async with self._session() as session:
+            resp = (await session.execute(stmt)).first()
+            await self._commit(session)
+        logger.debug("Follow DAO: received a response from the database")
+        return resp
+
+    async def unfollow(self, follower_id, followee_id) -> Optional[Row]:
+        """Atomically removes a follow and decrements the followee's followers counter in a single statement;
+        returns (id, followers_count) row of the followee or None if the user was not followed"""
+        logger.info("Follow DAO: Unfollow a user")
+        logger.trace("Follow DAO: Unfollow a user: follower_id: {}, followee_id: {}", follower_id, followee_id)
+        deleted = delete(FollowModel).\
+            where(FollowModel.follower_id == follower_id, FollowModel.followee_id == followee_id).\
+            returning(FollowModel.followee_id).\
+            cte('deleted_follow')
+        stmt = update(UserModel).\
+            where(UserModel.id == deleted.c.followee_id).\
+            values(followers_count=UserModel.followers_count - 1).\
+            returning(UserModel.id, UserModel.followers_count).\
+            execution_options(synchronize_session=False)
+        async with self._session() as session:
+            resp = (await session.execute(stmt)).first()
+            await self._commit(session)
+        logger.debug("Follow DAO: received a response from the database")
+        return resp
+
+    async def get_follower_ids(self, user_id, limit: int, offset: int) -> List:
+        """Returns ids of users following the user, ordered by id"""
+        rows = await self.get_all_rows_by((FollowModel.follower_id,), limit, offset,
+                                          order_by=(FollowModel.follower_id,), followee_id=user_id)
+        return [row.follower_id for row in rows]
+
+    async def get_followee_ids(self, user_id, limit: int, offset: int) -> List:
+        """Returns ids of users followed by the user, ordered by id"""
+        rows = await self.get_all_rows_by((FollowModel.followee_id,), limit, offset,
+                                          order_by=(FollowModel.followee_id,), follower_id=user_id)
+        return [row.followee_id for row in rows]
+
+
+follow_dao = FollowDAO(FollowModel)
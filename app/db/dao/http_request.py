@@ -8,8 +8,8 @@ from loguru import logger
 async def make_request(method: str, url: str, payload: Type[BaseModel] = None,
                        headers: dict = None, query_params: dict = None) -> Tuple[int, str]:
     logger.info("MakeHTTPRequest: Make HTTP request to external server")
-    logger.trace(f"MakeHTTPRequest: Make {method} request to: {url} with payload: {payload},\
-    query params: {query_params} and headers: {headers}")
+    # query params and headers are not logged, they carry API keys
+    logger.trace("MakeHTTPRequest: Make {} request to: {}", method, url)
     if query_params is not None:
         url = url.format(**query_params)
     payload = dict(payload) if payload is not None else {}
@@ -1,10 +1,81 @@
+from typing import Optional, Tuple, List
+from uuid import uuid4
+from datetime import datetime
+from sqlalchemy import select, update, delete, literal
+from sqlalchemy.dialects.postgresql import insert, UUID
 from db.models.LikeModel import LikeModel
+from db.models.PostModel import PostModel
 from db.dto import LikesReqDTO
 from .base_dao import BaseDAO
+from loguru import logger
 
 
 class LikeDAO(BaseDAO[LikeModel, LikesReqDTO, None, None]):
-    pass
+
+    async def like(self, user_id, post_id, update_counter: bool = True) -> Optional[Tuple]:
+        """Atomically adds a like and increments the post likes counter in a single statement;
+        the like is inserted only if the post exists and does not belong to the liking user;
+        if 'update_counter' is set to False, the counter is left for the caller to update;
+        returns (post_id, likes) row or None if nothing was changed"""
+        logger.info("Like DAO: Like a post")
+        logger.trace("Like DAO: Like a post: post_id: {}, user_id: {}", post_id, user_id)
+        liker = select(literal(uuid4(), UUID(as_uuid=True)),
+                       literal(user_id, UUID(as_uuid=True)),
+                       PostModel.id,
+                       literal(datetime.utcnow())).\
+            where(PostModel.id == post_id, PostModel.user_id != user_id)
+        inserted = insert(LikeModel).\
+            from_select([LikeModel.id, LikeModel.user_id, LikeModel.post_id, LikeModel.created_at], liker).\
+            on_conflict_do_nothing(index_elements=[LikeModel.user_id, LikeModel.post_id]).\
+            returning(LikeModel.post_id).\
+            cte('inserted_like')
+        if update_counter:
+            stmt = update(PostModel).\
+                where(PostModel.id == inserted.c.post_id).\
+                values(likes=PostModel.likes + 1).\
+                returning(PostModel.id, PostModel.likes).\
+                execution_options(synchronize_session=False)
+        else:
+            stmt = select(PostModel.id, PostModel.likes).where(PostModel.id == inserted.c.post_id)
+        # posts of the session are not synchronized, the criteria of the CTE cannot be evaluated in Python
+        async with self._session() as session:
+            resp = (await session.execute(stmt)).first()
+            await self._commit(session)
+        logger.debug("Like DAO: received a response from the database")
+        return resp
+
+    async def unlike(self, user_id, post_id, update_counter: bool = True) -> Optional[Tuple]:
+        """Atomically removes a like and decrements the post likes counter in a single statement;
+        if 'update_counter' is set to False, the counter is left for the caller to update;
+        returns (post_id, likes) row or None if the post was not liked by the user"""
+        logger.info("Like DAO: Unlike a post")
+        logger.trace("Like DAO: Unlike a post: post_id: {}, user_id: {}", post_id, user_id)
+        deleted = delete(LikeModel).\
+            where(LikeModel.user_id == user_id, LikeModel.post_id == post_id).\
+            returning(LikeModel.post_id).\
+            cte('deleted_like')
+        if update_counter:
+            stmt = update(PostModel).\
+                where(PostModel.id == deleted.c.post_id).\
+                values(likes=PostModel.likes - 1).\
+                returning(PostModel.id, PostModel.likes).\
+                execution_options(synchronize_session=False)
+        else:
+            stmt = select(PostModel.id, PostModel.likes).where(PostModel.id == deleted.c.post_id)
+        async with self._session() as session:
+            resp = (await session.execute(stmt)).first()
+            await self._commit(session)
+        logger.debug("Like DAO: received a response from the database")
+        return resp
+
+    async def get_likers(self, post_id) -> List:
+        """Returns ids of users who liked the post"""
+        logger.info("Like DAO: Get users who liked a post")
+        query = select(LikeModel.user_id).where(LikeModel.post_id == post_id)
+        async with self._session() as session:
+            resp = (await session.execute(query)).scalars().all()
+        logger.debug("Like DAO: received a response from the database")
+        return resp
 
 
 like_dao = LikeDAO(LikeModel)
@@ -1,13 +1,83 @@
+from typing import Dict, List, Tuple, Optional, Sequence
+from sqlalchemy import select, update, values, column, func, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.engine import Row
+from db.models.LikeModel import LikeModel
 from db.models.PostModel import PostModel
 from .base_dao import BaseDAO
 from loguru import logger
 
 
 class PostDAO(BaseDAO[PostModel, None, None, None]):
-    pass
-    # async def patch_post(self, item: dict, post_id: str) -> PostModel:
-    #     logger.info(f"Post DAO: update db entry")
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # feed rows: post columns and ids of users who liked the post, NULL if nobody did;
+        # public, home timelines select the same columns
+        liked_by = select(func.array_agg(LikeModel.user_id)).\
+            where(LikeModel.post_id == PostModel.id).\
+            scalar_subquery().label("liked_by")
+        self.feed_columns = (*self._default_columns, liked_by)
+
+    async def get_feed_rows(self, limit: int, offset: int, order_by: Sequence, **kwargs) -> List[Row]:
+        """Feed page by offset as plain rows, likers are aggregated in the same statement"""
+        return await self.get_all_rows_by(self.feed_columns, limit, offset, order_by, **kwargs)
+
+    async def get_feed_page_rows(self, limit: int, keyset: Sequence, after: Optional[Sequence] = None,
+                                 **kwargs) -> List[Row]:
+        """Feed page by keyset as plain rows, likers are aggregated in the same statement"""
+        return await self.get_page_rows_by(self.feed_columns, limit, keyset, after, **kwargs)
+
+    async def update_likes_many(self, deltas: Dict) -> int:
+        """Applies likes counter deltas {post_id: delta} to many posts
+        with a single UPDATE ... FROM (VALUES ...) statement;
+        returns the number of updated posts"""
+        logger.info("Post DAO: Update likes counters")
+        logger.trace("Post DAO: Likes counters deltas: {}", deltas)
+        deltas_table = values(column('id', UUID(as_uuid=True)),
+                              column('delta', Integer),
+                              name='deltas').data(list(deltas.items()))
+        stmt = update(PostModel).\
+            where(PostModel.id == deltas_table.c.id).\
+            values(likes=PostModel.likes + deltas_table.c.delta).\
+            execution_options(synchronize_session=False)
+        async with self._session() as session:
+            resp = await session.execute(stmt)
+            await self._commit(session)
+        logger.debug("Post DAO: updated likes counters of {} posts", resp.rowcount)
+        return resp.rowcount
+
+    async def get_legacy_images(self, limit: int, after_id=None) -> List[Tuple]:
+        """Returns up to 'limit' (id, image) rows of posts which images are kept in the database
+        and not moved to the blob storage yet, ordered by id, starting after 'after_id'"""
+        logger.info("Post DAO: Get posts images kept in the database")
+        query = select(PostModel.id, PostModel.image).\
+            where(PostModel.image.isnot(None), PostModel.image_key.is_(None))
+        if after_id is not None:
+            query = query.where(PostModel.id > after_id)
+        query = query.order_by(PostModel.id).limit(limit)
+        async with self._session() as session:
+            resp = (await session.execute(query)).all()
+        logger.debug("Post DAO: received {} posts images from the database", len(resp))
+        return resp
+
+    async def set_image_keys_many(self, image_keys: Dict) -> int:
+        """Sets blob storage keys {post_id: image_key} of many posts and drops images content
+        kept in the database with a single UPDATE ... FROM (VALUES ...) statement;
+        returns the number of updated posts"""
+        logger.info("Post DAO: Set posts image keys")
+        keys_table = values(column('id', UUID(as_uuid=True)),
+                            column('image_key', String),
+                            name='image_keys').data(list(image_keys.items()))
+        stmt = update(PostModel).\
+            where(PostModel.id == keys_table.c.id).\
+            values(image_key=keys_table.c.image_key, image=None).\
+            execution_options(synchronize_session=False)
+        async with self._session() as session:
+            resp = await session.execute(stmt)
+            await self._commit(session)
+        logger.debug("Post DAO: updated image keys of {} posts", resp.rowcount)
+        return resp.rowcount
 
 
 post_dao = PostDAO(PostModel)
@@ -0,0 +1,198 @@
+from typing import List, Optional, Sequence
+from datetime import datetime
+from sqlalchemy import select, update, delete, exists, cast, bindparam, union_all, func, true, DateTime, Integer
+from sqlalchemy.dialects.postgresql import insert, ARRAY, UUID
+from sqlalchemy.engine import Row
+from db.models.FollowModel import FollowModel
+from db.models.PostModel import PostModel
+from db.models.TimelineModel import TimelineModel
+from db.models.UserModel import UserModel
+from .base_dao import BaseDAO
+from loguru import logger
+
+
+class TimelineDAO(BaseDAO[TimelineModel, None, None, None]):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # timelines are ordered by (created_at, post_id) of the posts, newest first
+        self._timeline_keyset = (TimelineModel.created_at, TimelineModel.post_id)
+        self._posts_keyset = (PostModel.created_at, PostModel.id)
+        self._entry_columns = [TimelineModel.user_id, TimelineModel.post_id,
+                               TimelineModel.author_id, TimelineModel.created_at]
+
+    @staticmethod
+    def _uuid_param(name: str):
+        # typed explicitly, parameters selected in UNION branches have no column to take the type from
+        return cast(bindparam(name), UUID(as_uuid=True))
+
+    def _mark_fanned_out_statement(self):
+        # the author's followers count at the time of the post decides for good how the post reaches feeds
+        followers_count = select(UserModel.followers_count).\
+            where(UserModel.id == bindparam("_author_id", type_=UUID(as_uuid=True))).\
+            scalar_subquery()
+        return update(PostModel).\
+            where(PostModel.id == bindparam("_post_id", type_=UUID(as_uuid=True))).\
+            values(fanned_out=followers_count <= bindparam("_max_followers", type_=Integer)).\
+            returning(PostModel.fanned_out).\
+            execution_options(synchronize_session=False)
+
+    def _flag_author_statement(self):
+        return update(UserModel).\
+            where(UserModel.id == bindparam("_author_id", type_=UUID(as_uuid=True)),
+                  UserModel.has_pulled_posts.is_(False)).\
+            values(has_pulled_posts=True).\
+            execution_options(synchronize_session=False)
+
+    def _fan_out_statement(self, to_followers: bool):
+        post_id = self._uuid_param("_post_id")
+        author_id = self._uuid_param("_author_id")
+        created_at = cast(bindparam("_created_at"), DateTime)
+        # authors always see their own posts in their timelines
+        entries = select(author_id, post_id, author_id, created_at)
+        if to_followers:
+            followers = select(FollowModel.follower_id, post_id, author_id, created_at).\
+                where(FollowModel.followee_id == author_id)
+            entries = union_all(followers, entries)
+        return insert(TimelineModel).\
+            from_select(self._entry_columns, entries).\
+            on_conflict_do_nothing(index_elements=[TimelineModel.user_id, TimelineModel.post_id])
+
+    async def fan_out(self, post_id, author_id, created_at: datetime, max_followers: int) -> int:
+        """Adds the post to the timelines of the author and of all the author's followers
+        with a single INSERT ... SELECT statement and marks the post as fanned out;
+        posts of authors with more than 'max_followers' followers are added to the author's timeline only
+        and marked as not fanned out, home feeds of the followers pull them when read;
+        returns the number of added entries"""
+        logger.info("Timeline DAO: Fan out a post")
+        logger.trace("Timeline DAO: Fan out a post: post_id: {}, author_id: {}", post_id, author_id)
+        params = {"_post_id": post_id, "_author_id": author_id}
+        async with self._session() as session:
+            fanned_out = (await session.execute(self._statement(("mark_fanned_out",),
+                                                                self._mark_fanned_out_statement),
+                                                {**params, "_max_followers": int(max_followers)})).scalar()
+            if fanned_out is None:
+                logger.debug("Timeline DAO: the post is deleted before it is fanned out")
+                return 0
+            if not fanned_out:
+                await session.execute(self._statement(("flag_author",), self._flag_author_statement), params)
+            stmt = self._statement(("fan_out", fanned_out), lambda: self._fan_out_statement(fanned_out))
+            resp = await session.execute(stmt, {**params, "_created_at": created_at})
+            await self._commit(session)
+        logger.debug("Timeline DAO: added the post to {} timelines", resp.rowcount)
+        return resp.rowcount
+
+    def _backfill_statement(self):
+        posts = select(self._uuid_param("_user_id"), PostModel.id, PostModel.user_id, PostModel.created_at).\
+            where(PostModel.user_id == self._uuid_param("_author_id"),
+                  # posts which are not fanned out are pulled by home feeds instead
+                  PostModel.fanned_out.isnot(False)).\
+            order_by(*[column.desc() for column in self._posts_keyset]).\
+            limit(bindparam("_limit", type_=Integer))
+        return insert(TimelineModel).\
+            from_select(self._entry_columns, posts).\
+            on_conflict_do_nothing(index_elements=[TimelineModel.user_id, TimelineModel.post_id])
+
+    async def backfill(self, user_id, author_id, limit: int) -> int:
+        """Adds up to 'limit' latest posts of the author to the user's timeline,
+        so a newly followed author's posts are not only the ones created after the follow;
+        returns the number of added entries"""
+        logger.info("Timeline DAO: Backfill a timeline")
+        logger.trace("Timeline DAO: Backfill a timeline: user_id: {}, author_id: {}", user_id, author_id)
+        stmt = self._statement(("backfill",), self._backfill_statement)
+        async with self._session() as session:
+            resp = await session.execute(stmt, {"_user_id": user_id, "_author_id": author_id, "_limit": int(limit)})
+            await self._commit(session)
+        logger.debug("Timeline DAO: added {} posts to the timeline", resp.rowcount)
+        return resp.rowcount
+
+    async def remove_author(self, user_id, author_id) -> int:
+        """Removes posts of the author from the user's timeline; returns the number of removed entries"""
+        logger.info("Timeline DAO: Remove author's posts from a timeline")
+        logger.trace("Timeline DAO: Remove author's posts from a timeline: user_id: {}, author_id: {}",
+                     user_id, author_id)
+        stmt = self._statement(("remove_author",), lambda: delete(TimelineModel).
+                               where(self._where(["user_id", "author_id"])))
+        async with self._session() as session:
+            resp = await session.execute(stmt, self._params({"user_id": user_id, "author_id": author_id}))
+            await self._commit(session)
+        logger.debug("Timeline DAO: removed {} posts from the timeline", resp.rowcount)
+        return resp.rowcount
+
+    async def get_timeline_rows(self, columns: Sequence, user_id, limit: int,
+                                after: Optional[Sequence] = None) -> List[Row]:
+        """Page of the user's materialized timeline: rows of posts 'columns' ordered by (created_at, id)
+        descending, starting right after the post with 'after' values"""
+        logger.info("Timeline DAO: Get page of a timeline")
+        logger.trace("Timeline DAO: Get page of a timeline: user_id: {}, limit: {}, after: {}", user_id, limit, after)
+        columns = tuple(columns)
+
+        def build():
+            query = select(*columns).\
+                select_from(TimelineModel).\
+                join(PostModel, PostModel.id == TimelineModel.post_id).\
+                where(self._where(["user_id"]))
+            if after is not None:
+                query = query.where(self._keyset_where(self._timeline_keyset))
+            return query.order_by(*[column.desc() for column in self._timeline_keyset]).\
+                limit(bindparam("_limit", type_=Integer))
+        stmt = self._statement(("timeline", columns, after is not None), build)
+        async with self._connection() as connection:
+            result = await connection.execute(stmt, self._params({"user_id": user_id}, _limit=int(limit),
+                                                                 **self._after_params(after)))
+            resp = result.all()
+        logger.debug("Timeline DAO: received {} rows from the database", len(resp))
+        return resp
+
+    async def get_pulled_authors(self, user_id) -> List:
+        """Ids of the authors followed by the user which have posts that are not fanned out"""
+        logger.info("Timeline DAO: Get followed authors with pulled posts")
+        logger.trace("Timeline DAO: Get followed authors with pulled posts: user_id: {}", user_id)
+
+        def build():
+            # such authors are few, they are found by the partial index
+            # and checked against the user's follows by the unique constraint index
+            followed = exists().where(FollowModel.follower_id == bindparam("_user_id", type_=UUID(as_uuid=True)),
+                                      FollowModel.followee_id == UserModel.id)
+            return select(UserModel.id).where(UserModel.has_pulled_posts.is_(True), followed)
+        stmt = self._statement(("pulled_authors",), build)
+        async with self._connection() as connection:
+            resp = (await connection.execute(stmt, {"_user_id": user_id})).scalars().all()
+        logger.debug("Timeline DAO: received {} authors from the database", len(resp))
+        return resp
+
+    async def get_pulled_rows(self, columns: Sequence, author_ids: Sequence, limit: int,
+                              after: Optional[Sequence] = None) -> List[Row]:
+        """Page of the posts of the authors which are not fanned out;
+        the same order and 'after' as of get_timeline_rows"""
+        logger.info("Timeline DAO: Get page of pulled posts")
+        logger.trace("Timeline DAO: Get page of pulled posts: authors: {}, limit: {}, after: {}",
+                     len(author_ids), limit, after)
+        columns = tuple(columns)
+
+        def build():
+            authors = func.unnest(cast(bindparam("_author_ids"), ARRAY(UUID(as_uuid=True)))).\
+                table_valued("author_id").render_derived("authors")
+            # latest posts of every author are read backwards from the (user_id, created_at, id) index,
+            # then the pages of all authors are merged
+            latest = select(*columns).where(PostModel.user_id == authors.c.author_id,
+                                            PostModel.fanned_out.is_(False))
+            if after is not None:
+                latest = latest.where(self._keyset_where(self._posts_keyset))
+            latest = latest.order_by(*[column.desc() for column in self._posts_keyset]).\
+                limit(bindparam("_limit", type_=Integer)).\
+                lateral("latest")
+            return select(latest).\
+                select_from(authors.join(latest, true())).\
+                order_by(latest.c.created_at.desc(), latest.c.id.desc()).\
+                limit(bindparam("_limit", type_=Integer))
+        stmt = self._statement(("pulled", columns, after is not None), build)
+        async with self._connection() as connection:
+            result = await connection.execute(stmt, {"_author_ids": list(author_ids), "_limit": int(limit),
+                                                     **self._after_params(after)})
+            resp = result.all()
+        logger.debug("Timeline DAO: received {} rows from the database", len(resp))
+        return resp
+
+
+timeline_dao = TimelineDAO(TimelineModel)
@@ -1,10 +1,28 @@
+from typing import Optional, Tuple
+from sqlalchemy import select, bindparam
 from db.models.UserModel import UserModel
 from db.dto import UserCreateLineDTO, UserChangeProfileDTO
 from .base_dao import BaseDAO
+from loguru import logger
 
 
 class UserDAO(BaseDAO[UserModel, UserCreateLineDTO, UserChangeProfileDTO, None]):
-    pass
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # executed on every authenticated request
+        self._principal_query = select(UserModel.id, UserModel.login, UserModel.role,
+                                       UserModel.blocked, UserModel.is_active).\
+            where(UserModel.login == bindparam("login", type_=UserModel.login.type))
+
+    async def get_principal(self, login: str) -> Optional[Tuple]:
+        """Returns only the (id, login, role, blocked, is_active) row of the user
+        needed to authenticate a request, without loading the whole model"""
+        logger.info("User DAO: Get principal by login")
+        async with self._connection() as connection:
+            resp = (await connection.execute(self._principal_query, {"login": login})).first()
+        logger.debug("User DAO: received a response from the database")
+        return resp
 
 
 user_dao = UserDAO(UserModel)
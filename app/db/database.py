@@ -1,23 +1,131 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from asyncio import sleep
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from asyncio import gather, sleep
 from db.models import BaseModel
 from settings import Settings
-from httpx import AsyncClient
+from utils.metrics import DB_POOL_CHECKOUT_DURATION, DB_POOL_SATURATIONS, DB_POOL_TIMEOUTS
 from loguru import logger
 
 
 settings = Settings()
 
 db_con_str = f"postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}/{settings.DB_NAME}"
-logger.debug(f"DB Connection string: {db_con_str }")
-engine = create_async_engine(db_con_str, echo=False, pool_pre_ping=True)
+# asyncpg dialect keeps prepared statements of every connection in LRU cache of this size, 0 disables it
+db_con_str += f"?prepared_statement_cache_size={settings.DB_PREPARED_STATEMENT_CACHE_SIZE}"
+logger.debug("DB Connection: {}@{}/{}", settings.DB_USER, settings.DB_HOST, settings.DB_NAME)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Connection pool observing the time spent waiting for a connection
+    and reporting saturation: checkouts which find no idle connection and no overflow left"""
+
+    _saturation_logged_at = 0.0
+
+    def _do_get(self):
+        if self.checkedin() == 0 and 0 <= self._max_overflow <= self.overflow():
+            self._on_saturation()
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            logger.error("Database: no connection was available in {}s, pool status: {}", self._timeout, self.status())
+            raise
+        finally:
+            DB_POOL_CHECKOUT_DURATION.observe(time.perf_counter() - start)
+
+    def _on_saturation(self):
+        DB_POOL_SATURATIONS.inc()
+        now = time.monotonic()
+        # saturated pool is hit by every request, the warning is not repeated more often than the interval
+        if now - self._saturation_logged_at >= settings.DB_POOL_SATURATION_LOG_INTERVAL:
+            TimedQueuePool._saturation_logged_at = now
+            logger.warning("Database: connection pool is saturated, checkouts wait: {}", self.status())
+
+
+# without pre ping, connections broken by database restarts are detected by the first failed statement,
+# which invalidates the pool; recycle bounds the age of idle connections instead
+engine = create_async_engine(db_con_str, echo=False, poolclass=TimedQueuePool,
+                             pool_size=settings.DB_POOL_SIZE,
+                             max_overflow=settings.DB_MAX_OVERFLOW,
+                             pool_timeout=settings.DB_POOL_TIMEOUT,
+                             pool_recycle=settings.DB_POOL_RECYCLE,
+                             pool_pre_ping=settings.DB_POOL_PRE_PING)
 SessionLocal = sessionmaker(engine, autocommit=False, autoflush=False, class_=AsyncSession)
-session = AsyncClient()
+
+_connection_checkouts: ContextVar[Optional[List[int]]] = ContextVar("connection_checkouts", default=None)
+
+
+@event.listens_for(engine.sync_engine.pool, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    checkouts = _connection_checkouts.get()
+    if checkouts is not None:
+        checkouts[0] += 1
+
+
+@contextmanager
+def count_connection_checkouts() -> Iterator[List[int]]:
+    """Counts pool checkouts made in the current context; the count is in the first item of yielded list"""
+    checkouts = [0]
+    token = _connection_checkouts.set(checkouts)
+    try:
+        yield checkouts
+    finally:
+        _connection_checkouts.reset(token)
+
+
+async def ping_db():
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+async def wait_for_db(retries: int, backoff: float, max_backoff: float):
+    """Probes the database with exponential backoff until it accepts connections;
+    raises the last error if it is still unreachable after all retries"""
+    delay = backoff
+    for attempt in range(1, retries + 1):
+        try:
+            await ping_db()
+            logger.info("Database: database is reachable")
+            return
+        except (OSError, SQLAlchemyError) as e:
+            if attempt == retries:
+                raise
+            logger.warning("Database: database is unreachable, attempt {} of {}: {}", attempt, retries, e)
+            await sleep(delay)
+            delay = min(delay * 2, max_backoff)
+
+
+async def warm_up_pool(size: int):
+    """Opens 'size' connections at once so first requests don't pay for connecting;
+    connections are returned to the pool, which keeps up to its pool size of them"""
+    connections = [engine.connect() for _ in range(size)]
+    results = await gather(*(connection.start() for connection in connections), return_exceptions=True)
+    for connection in connections:
+        if connection.sync_connection is not None:
+            await connection.close()
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        # not fatal, missing connections are opened on demand
+        logger.warning("Database: connection pool warm up failed: {}", errors[0])
+        return
+    logger.info("Database: connection pool is warmed up with {} connections", size)
 
 
 async def init_db():
-    await sleep(20)
+    await wait_for_db(settings.DB_CONNECT_RETRIES, settings.DB_CONNECT_BACKOFF, settings.DB_CONNECT_MAX_BACKOFF)
+    await warm_up_pool(min(settings.DB_POOL_WARM_UP_SIZE, engine.sync_engine.pool.size()))
+
+
+async def create_schema():
+    """Creates missing tables, see cli.create_schema"""
     async with engine.begin() as connection:
         # logger.debug("Database: dropping all tables")
         # await connection.run_sync(BaseModel.metadata.drop_all)
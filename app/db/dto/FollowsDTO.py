@@ -0,0 +1,13 @@
+from typing import Union
+from pydantic import BaseModel
+from uuid import UUID
+
+
+class FollowBaseDTO(BaseModel):
+    class Config:
+        orm_mode = True
+
+
+class FollowsRespDTO(FollowBaseDTO):
+    id: Union[str, UUID]
+    followers_count: int
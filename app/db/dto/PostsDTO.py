@@ -23,6 +23,11 @@ class PostRespDTO(PostDTO):
     image: Optional[AnyUrl]
 
 
+class PostsPageRespDTO(PostBaseDTO):
+    items: List[PostRespDTO]
+    next_cursor: Optional[str]
+
+
 class LikesPostReqDTO(PostBaseDTO):
     likes: int
 
@@ -50,6 +50,11 @@ class UserCreateLineDTO(BaseModel):
     email_status: Optional[EmailStatusesEnum]
 
 
+class UserRegistrationRespDTO(UserBaseDTO):
+    id: Union[UUID, str]
+    email_status: EmailStatusesEnum
+
+
 class UserChangeProfileDTO(BaseModel):
     first_name: Optional[str]
     second_name: Optional[str]
@@ -1,4 +1,5 @@
 from .AuthDTO import *
 from .UsersDTO import *
 from .PostsDTO import *
+from .FollowsDTO import *
 from .hunter_io_ext_API import *
@@ -7,7 +7,9 @@ class EmailStatusesEnum(str, Enum):
     due to third party server troubles;
     UNSTATED is a custom status stating that the verification status from the server is unknown
     and update in accordance with changes to hunter io API documentation are needed;
+    PENDING is a custom status of the email which verification is not finished yet;
     hunter io API documentation: https://hunter.io/api-documentation/v2#email-verifier"""
+    PENDING = 'pending'
     FAILED = 'failed'
     UNSTATED = 'unstated'
     VALID = 'valid'
@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class PaginationModesEnum(str, Enum):
+    """OFFSET is a classic limit/offset pagination, kept for compatibility;
+    CURSOR is a keyset pagination: the next page is requested with the opaque next_cursor token
+    received with the previous page"""
+    OFFSET = 'offset'
+    CURSOR = 'cursor'
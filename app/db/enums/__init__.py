@@ -1,3 +1,4 @@
 from .EmailStatusesEnum import EmailStatusesEnum
 from .UserRolesEnum import UserRolesEnum
 from .UserRolesSignupEnum import UserRolesSignupEnum
+from .PaginationModesEnum import PaginationModesEnum
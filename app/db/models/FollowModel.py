@@ -0,0 +1,22 @@
+from sqlalchemy import Column, DateTime, ForeignKey, UniqueConstraint, Index
+from sqlalchemy.dialects.postgresql import UUID
+from uuid import uuid4
+from datetime import datetime
+from db.models import BaseModel, UserModel
+
+
+class FollowModel(BaseModel):
+    __tablename__ = 'tbl_follows'
+    # the unique constraint index serves followees of a user,
+    # the followee index serves followers of a user, which fan-out reads without visiting the table
+    __table_args__ = (UniqueConstraint('follower_id', 'followee_id', name='uq_follows_follower_id_followee_id'),
+                      Index('ix_follows_followee_id_follower_id', 'followee_id', 'follower_id'))
+    id = Column('id', UUID(as_uuid=True), unique=True, primary_key=True, default=uuid4)
+    follower_id = Column('follower_id', UUID(as_uuid=True), ForeignKey('tbl_users.id', ondelete='CASCADE'),
+                         nullable=False)
+    followee_id = Column('followee_id', UUID(as_uuid=True), ForeignKey('tbl_users.id', ondelete='CASCADE'),
+                         nullable=False)
+    created_at = Column('created_at', DateTime, default=datetime.utcnow)
+
+    def dict(self):
+        return {c.name: getattr(self, c.name) for c in self.__table__.columns}
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, func, String, Integer, DateTime, ForeignKey, LargeBinary
+from sqlalchemy import Column, func, String, Integer, DateTime, ForeignKey, LargeBinary, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from uuid import uuid4
 from datetime import datetime
@@ -8,6 +8,7 @@ from db.models import BaseModel, UserModel
 
 class LikeModel(BaseModel):
     __tablename__ = 'tbl_likes'
+    __table_args__ = (UniqueConstraint('user_id', 'post_id', name='uq_likes_user_id_post_id'),)
     id = Column('id', UUID(as_uuid=True), unique=True, primary_key=True, default=uuid4)
     user_id = Column('user_id', UUID(as_uuid=True), ForeignKey('tbl_users.id'))
     post_id = Column('post_id', UUID(as_uuid=True), ForeignKey('tbl_posts.id', ondelete='CASCADE'))
@@ -19,7 +20,7 @@ class LikeModel(BaseModel):
 
     posts = relationship('PostModel',
                          back_populates='liked_by',
-                         lazy='subquery')
+                         lazy='raise')
 
     def dict(self):
         return {c.name: getattr(self, c.name) for c in self.__table__.columns}
\ No newline at end of file
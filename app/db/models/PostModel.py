@@ -1,28 +1,38 @@
-from sqlalchemy import Column, func, String, Integer, DateTime, ForeignKey, LargeBinary
+from sqlalchemy import Column, func, String, Integer, Boolean, DateTime, ForeignKey, LargeBinary, Index, inspect
 from sqlalchemy.dialects.postgresql import UUID
 from uuid import uuid4
 from datetime import datetime
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from db.models import BaseModel, UserModel
 
 
 class PostModel(BaseModel):
     __tablename__ = 'tbl_posts'
+    # keyset pagination indexes for the global and per-user feeds
+    __table_args__ = (Index('ix_posts_created_at_id', 'created_at', 'id'),
+                      Index('ix_posts_user_id_created_at_id', 'user_id', 'created_at', 'id'))
     id = Column('id', UUID(as_uuid=True), unique=True, primary_key=True, default=uuid4)
     user_id = Column('user_id', UUID(as_uuid=True), ForeignKey('tbl_users.id', ondelete="CASCADE"))
     text = Column('text', String(255), nullable=True)
-    image = Column('image', LargeBinary, nullable=True)
+    # legacy image content, new images are kept in the blob storage and referenced by image_key;
+    # never loaded unless explicitly requested with undefer() option
+    image = deferred(Column('image', LargeBinary, nullable=True))
+    image_key = Column('image_key', String(64), nullable=True)
     likes = Column('likes', Integer, nullable=False, default=0)
+    # True once the post is added to the timelines of the author's followers, False if the author had
+    # more followers than FEED_FANOUT_MAX_FOLLOWERS then, so home feeds pull it; NULL until fanned out
+    fanned_out = Column('fanned_out', Boolean, nullable=True)
     created_at = Column('created_at', DateTime, default=datetime.utcnow)
     updated_at = Column('updated_at', DateTime, default=datetime.utcnow, onupdate=func.current_timestamp())
 
     users = relationship('UserModel',
                          back_populates='posts',
-                         lazy='subquery')
+                         lazy='raise')
 
     liked_by = relationship('LikeModel',
                          back_populates='posts',
-                         lazy='subquery')
+                         lazy='raise')
 
     def dict(self):
-        return {c.name: getattr(self, c.name) for c in self.__table__.columns}
\ No newline at end of file
+        unloaded = inspect(self).unloaded
+        return {c.name: getattr(self, c.name) for c in self.__table__.columns if c.name not in unloaded}
\ No newline at end of file
@@ -20,7 +20,7 @@ class ProfileModel(BaseModel):
 
     users = relationship('UserModel',
                          back_populates='profiles',
-                         lazy='subquery')
+                         lazy='raise')
 
     def dict(self):
         return {c.name: getattr(self, c.name) for c in self.__table__.columns}
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from db.models import BaseModel, UserModel, PostModel
+
+
+class TimelineModel(BaseModel):
+    """Materialized home timeline entry: the post is in the timeline of the user;
+    entries are fanned out when posts are created and removed with the posts (cascade) or on unfollow"""
+    __tablename__ = 'tbl_timelines'
+    # keyset pagination index of the timeline and the index of entries of one author, used on unfollow
+    __table_args__ = (Index('ix_timelines_user_id_created_at_post_id', 'user_id', 'created_at', 'post_id'),
+                      Index('ix_timelines_user_id_author_id', 'user_id', 'author_id'))
+    user_id = Column('user_id', UUID(as_uuid=True), ForeignKey('tbl_users.id', ondelete='CASCADE'),
+                     primary_key=True)
+    post_id = Column('post_id', UUID(as_uuid=True), ForeignKey('tbl_posts.id', ondelete='CASCADE'),
+                     primary_key=True)
+    author_id = Column('author_id', UUID(as_uuid=True), ForeignKey('tbl_users.id', ondelete='CASCADE'),
+                       nullable=False)
+    # created_at of the post, timelines are ordered as posts feeds are
+    created_at = Column('created_at', DateTime, nullable=False)
+
+    def dict(self):
+        return {c.name: getattr(self, c.name) for c in self.__table__.columns}
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, func, String, DateTime, Boolean, Enum
+from sqlalchemy import Column, func, String, Integer, DateTime, Boolean, Enum, Index, false, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -9,6 +9,8 @@ from db.enums import UserRolesSignupEnum
 
 class UserModel(BaseModel):
     __tablename__ = 'tbl_users'
+    # authors with posts which are not fanned out are few and found by this partial index
+    __table_args__ = (Index('ix_users_has_pulled_posts', 'id', postgresql_where=text('has_pulled_posts')),)
     id = Column('id', UUID(as_uuid=True), unique=True, primary_key=True, default=uuid4)
     login = Column('login', String(255), unique=True)
     email = Column('email', String(255), unique=True)
@@ -20,14 +22,18 @@ class UserModel(BaseModel):
     created_at = Column('created_at', DateTime, default=datetime.utcnow)
     updated_at = Column('updated_at', DateTime, default=datetime.utcnow, onupdate=func.current_timestamp())
     deleted_at = Column('deleted_at', DateTime, default=None)
+    # denormalized count of tbl_follows entries, updated in the same statement as follows
+    followers_count = Column('followers_count', Integer, nullable=False, default=0, server_default='0')
+    # set once the first post of the user is not fanned out, never reset: such posts are pulled for good
+    has_pulled_posts = Column('has_pulled_posts', Boolean, nullable=False, default=False, server_default=false())
 
     profiles = relationship('ProfileModel',
                             back_populates='users',
-                            lazy='subquery')
+                            lazy='raise')
 
     posts = relationship('PostModel',
                          back_populates='users',
-                         lazy='subquery')
+                         lazy='raise')
     #
     # likes = relationship('LikeModel',
     #                      back_populates='users',
@@ -1 +1,4 @@
-from .BaseModel import BaseModel
\ No newline at end of file
+from .BaseModel import BaseModel
+# every model is registered before any mapper is configured (DAOs inspect their models when created),
+# so relationships naming other models by class name resolve whichever model is imported first
+from . import UserModel, ProfileModel, PostModel, LikeModel, FollowModel, TimelineModel
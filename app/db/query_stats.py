@@ -0,0 +1,74 @@
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+from sqlalchemy import event
+from db.database import engine
+
+
+class QueryStats:
+    """SQL statements executed, time spent in the database and rows returned or changed
+    within a context (a request, a test); nested contexts are counted in the outer ones too"""
+
+    def __init__(self, parent: Optional["QueryStats"] = None):
+        self.parent = parent
+        self.statements = 0
+        self.duration = 0.0
+        self.rows = 0
+        # executions of every statement text, the same statement executed many times hints at N+1 queries
+        self.executions: Counter = Counter()
+
+    @property
+    def max_repeats(self) -> int:
+        return max(self.executions.values(), default=0)
+
+    def add(self, statement: str, duration: float, rows: int):
+        stats = self
+        while stats is not None:
+            stats.statements += 1
+            stats.duration += duration
+            stats.rows += rows
+            stats.executions[statement] += 1
+            stats = stats.parent
+
+
+_current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_query_stats.get() is not None:
+        # statements on a connection are executed one by one
+        conn.info["query_started_at"] = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_query_stats.get()
+    if stats is None:
+        return
+    started_at = conn.info.pop("query_started_at", time.perf_counter())
+    rows = cursor.rowcount
+    if rows < 0:
+        # asyncpg adapter does not report the count of fetched rows, they are already buffered in the cursor
+        rows = len(getattr(cursor, "_rows", None) or ())
+    stats.add(statement, time.perf_counter() - started_at, rows)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_query_stats.get()
+
+
+@contextmanager
+def query_stats() -> Iterator[QueryStats]:
+    """Counts SQL statements executed in the current context, e.g. to assert a query budget in a test:
+        with query_stats() as stats:
+            await client.get(...)
+        assert stats.statements == 2"""
+    stats = QueryStats(parent=_current_query_stats.get())
+    token = _current_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_query_stats.reset(token)
@@ -0,0 +1,112 @@
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.database import SessionLocal, count_connection_checkouts
+from loguru import logger
+
+
+class UnitOfWork:
+    """One session and one transaction shared by all DAO calls made inside it;
+    committed once when the unit of work is finished, rolled back if it fails"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        # set by the DAO writes, the transaction can be ended early only while it has none
+        self.has_writes = False
+        self._after_commit: List[Callable] = []
+
+    def after_commit(self, callback: Callable):
+        self._after_commit.append(callback)
+
+    async def release_connection(self):
+        """Ends the transaction of the reads made so far, so its connection is returned to the pool
+        during work which needs no database; the next statement starts a new transaction"""
+        if self.has_writes:
+            raise RuntimeError("UnitOfWork: connection with uncommitted writes can not be released")
+        # objects loaded so far stay usable, they are not expired on commit
+        await self.session.commit()
+
+    def run_after_commit(self):
+        for callback in self._after_commit:
+            try:
+                callback()
+            except Exception as e:
+                logger.exception(e)
+
+
+_current_unit_of_work: ContextVar[Optional[UnitOfWork]] = ContextVar("current_unit_of_work", default=None)
+
+
+def current_unit_of_work() -> Optional[UnitOfWork]:
+    return _current_unit_of_work.get()
+
+
+@asynccontextmanager
+async def unit_of_work() -> AsyncIterator[UnitOfWork]:
+    """Starts a unit of work, or joins the one already started in the current context"""
+    uow = _current_unit_of_work.get()
+    if uow is not None:
+        yield uow
+        return
+    # objects loaded in the unit of work are used after the commit, so they must not expire
+    async with SessionLocal(expire_on_commit=False) as session:
+        uow = UnitOfWork(session)
+        token = _current_unit_of_work.set(uow)
+        try:
+            yield uow
+            await session.commit()
+        except BaseException:
+            await session.rollback()
+            raise
+        finally:
+            _current_unit_of_work.reset(token)
+    uow.run_after_commit()
+
+
+@contextmanager
+def outside_unit_of_work():
+    """Detaches the current context from the unit of work, for work that can outlive it,
+    e.g. background tasks started while handling a request"""
+    token = _current_unit_of_work.set(None)
+    try:
+        yield
+    finally:
+        _current_unit_of_work.reset(token)
+
+
+def after_commit(callback: Callable):
+    """Runs the callback after the current unit of work is committed,
+    or right away if there is no unit of work"""
+    uow = _current_unit_of_work.get()
+    if uow is None:
+        callback()
+    else:
+        uow.after_commit(callback)
+
+
+async def release_connection():
+    """Returns the connection of the current unit of work to the pool before slow work, e.g. password hashing
+    or blob uploads, which would keep it idle in transaction otherwise; must be called before any write"""
+    uow = _current_unit_of_work.get()
+    if uow is not None:
+        await uow.release_connection()
+
+
+class UnitOfWorkRoute(APIRoute):
+    """Route handling the whole request, dependencies included, in a single unit of work;
+    the unit of work is committed before the response is returned, so clients never get a response
+    for changes which are not committed yet or fail to commit"""
+
+    def get_route_handler(self) -> Callable[[Request], Awaitable[Response]]:
+        handler = super().get_route_handler()
+
+        async def handle_in_unit_of_work(request: Request) -> Response:
+            with count_connection_checkouts() as checkouts:
+                async with unit_of_work():
+                    response = await handler(request)
+            logger.debug("UnitOfWork: request checked out {} database connections", checkouts[0])
+            return response
+        return handle_in_unit_of_work
@@ -1,25 +1,68 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from loguru import logger
 from settings import Settings
-from db.database import init_db, session
+from db.database import init_db, engine
+from db.dao import follow_dao, like_dao, post_dao, profile_dao, timeline_dao, user_dao
+from clients import http_client
+from cache import cache_backend
 from routers.api import api_router
+from routers import metrics, health
+from services.likes_counter_service import likes_counter_service
+from services.follow_service import follow_service
+from services.email_verification_service import email_verification_service
+from services.external_api_service import external_api_service
+from services.health_service import health_service
+from services.post_service import post_service
+from services.user_service import user_service
 from utils.logger import setup_logger
+from utils.password_hasher import password_hasher
+from utils.principals_cache import principals_cache
+from utils.metrics import setup_metrics
+from utils.query_budget import QueryBudgetMiddleware
 
 
 settings = Settings()
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 app.include_router(api_router)
+app.include_router(metrics.router)
+app.include_router(health.router)
+app.add_middleware(QueryBudgetMiddleware, settings=settings)
+setup_metrics(app, engine.sync_engine.pool,
+              caches={"principals": principals_cache,
+                      "email_domains": email_verification_service.domains_cache,
+                      "posts": post_service.posts_cache,
+                      "profiles": user_service.profiles_cache,
+                      "shared_backend": cache_backend},
+              daos=[follow_dao, like_dao, post_dao, profile_dao, timeline_dao, user_dao],
+              external_api_service=external_api_service)
 
 
 @app.on_event("startup")
 async def startup():
     setup_logger(settings)
     await init_db()
+    await http_client.start()
+    likes_counter_service.start()
+    email_verification_service.start()
+    await email_verification_service.requeue_pending()
+    health_service.set_started(True)
 
 
 @app.on_event("shutdown")
 async def shutdown():
-    await session.aclose()
+    health_service.set_started(False)
+    # pending likes counters must reach the database before the worker exits
+    await likes_counter_service.stop()
+    # posts created last are fanned out to the timelines before the worker exits
+    await follow_service.stop()
+    await email_verification_service.stop()
+    await http_client.close()
+    await cache_backend.close()
+    password_hasher.shutdown()
+    # queued log records are written out before the worker exits
+    await logger.complete()
 
 
 def main():
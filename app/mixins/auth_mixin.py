@@ -5,6 +5,7 @@ from loguru import logger
 from db.dto import AuthHeadersDTO
 from utils.auth_utils import decode_token
 from services.user_service import user_service
+from utils.principals_cache import principals_cache
 from settings import Settings
 
 
@@ -21,17 +22,23 @@ async def get_auth_headers(request: Request) -> AuthHeadersDTO:
         elif item == headers_check[-1]:
             raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='Did not get credentials.')
     token_data = await decode_token(token)
-    print(f"Token: {token}")
-    print(f"Token Data: {token_data}")
-    user = await user_service.get_by_login(token_data.sub)
-    if not user.is_active:
+    principal = principals_cache.get(token_data.sub)
+    if principal is not None:
+        return principal
+    generation = principals_cache.generation
+    user = await user_service.get_principal(token_data.sub)
+    if user is None or not user.is_active:
         raise HTTPException(status_code=HTTPStatus.BAD_REQUEST,
                             detail="The user does not exist anymore")
+    if user.blocked:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST,
+                            detail="The user is blocked")
     resp = AuthHeadersDTO(
         user_id=user.id,
         login=user.login,
         role=user.role
     )
+    principals_cache.set(user.login, resp, generation)
     return resp
 
 
@@ -1,10 +1,11 @@
 from fastapi import APIRouter
-from . import authentication, registration, users, posts
+from . import authentication, registration, users, posts, follows
 
 
 api_router = APIRouter()
 
-endpoints = [authentication, registration, users, posts]
+endpoints = [authentication, registration, users, posts, follows]
 
 for endpoint in endpoints:
+    # every request is handled in a single unit of work, see UnitOfWorkRoute of the endpoints' routers
     api_router.include_router(endpoint.router)
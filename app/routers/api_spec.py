@@ -3,6 +3,10 @@ from enum import Enum
 
 class ApiSpec(str, Enum):
 
+    METRICS = '/metrics'
+    HEALTH_LIVE = '/health/live'
+    HEALTH_READY = '/health/ready'
+
     REGISTRATION = '/registration'
 
     AUTH = '/authentication'
@@ -10,10 +14,15 @@ class ApiSpec(str, Enum):
 
     USERS_DETAILS = '/users/{user_id}'
     USERS_PROFILES = '/users/{user_id}/profile'
+    USERS_FOLLOWERS = '/users/{user_id}/followers'
+    USERS_FOLLOWEES = '/users/{user_id}/followees'
+
+    FEED = '/feed'
 
     POSTS = '/posts'
     POSTS_DETAILS = '/posts/{post_id}'
     POSTS_IMAGES = '/posts/{post_id}/images'
     POSTS_USERS = '/posts/users/{user_id}'
-    # TODO: consider likes system with Redis
+    # likes counters are aggregated in memory and written behind (LIKES_AGGREGATION_ENABLED),
+    # posts with likers are cached in the shared cache backend, Redis with CACHE_BACKEND=redis
     POSTS_LIKES = '/posts/{post_id}/likes'
@@ -6,9 +6,10 @@ from services.auth_service import auth_service
 from db.models import *
 from db.dto import LoginRespDTO, RefreshTokenRespDTO, RefreshTokenReqDTO
 from .api_spec import ApiSpec
+from db.unit_of_work import UnitOfWorkRoute
 
 # TODO: reuse if resp is None to common exception
-router = APIRouter(tags=["authentication"])
+router = APIRouter(tags=["authentication"], route_class=UnitOfWorkRoute)
 
 
 @cbv(router)
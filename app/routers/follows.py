@@ -0,0 +1,40 @@
+from http import HTTPStatus
+from typing import List, Union
+from uuid import UUID
+from fastapi import APIRouter
+from fastapi_utils.cbv import cbv
+from mixins import AuthMixin
+from services.follow_service import follow_service
+from db.dto import FollowsRespDTO
+from .api_spec import ApiSpec
+from db.unit_of_work import UnitOfWorkRoute
+from utils.rights_restrictions import available_roles
+from db.enums import UserRolesEnum as Roles
+from utils.serializers import json_response
+
+
+router = APIRouter(tags=["follows"], route_class=UnitOfWorkRoute)
+
+
+@cbv(router)
+class FollowsView(AuthMixin):
+
+    @router.post(ApiSpec.USERS_FOLLOWERS, status_code=HTTPStatus.OK, response_model=FollowsRespDTO)
+    @available_roles(role=Roles.USER)
+    async def follow_user(self, user_id: str):
+        return await follow_service.follow(self.auth_headers, user_id)
+
+    @router.delete(ApiSpec.USERS_FOLLOWERS, status_code=HTTPStatus.OK, response_model=FollowsRespDTO)
+    @available_roles(role=Roles.USER)
+    async def unfollow_user(self, user_id: str):
+        return await follow_service.unfollow(self.auth_headers, user_id)
+
+    @router.get(ApiSpec.USERS_FOLLOWERS, status_code=HTTPStatus.OK, response_model=List[Union[UUID, str]])
+    @available_roles(role=Roles.USER)
+    async def get_followers(self, user_id: str, limit: str = 100, offset: str = 0):
+        return json_response(await follow_service.get_followers(user_id, limit, offset))
+
+    @router.get(ApiSpec.USERS_FOLLOWEES, status_code=HTTPStatus.OK, response_model=List[Union[UUID, str]])
+    @available_roles(role=Roles.USER)
+    async def get_followees(self, user_id: str, limit: str = 100, offset: str = 0):
+        return json_response(await follow_service.get_followees(user_id, limit, offset))
@@ -0,0 +1,23 @@
+from http import HTTPStatus
+from fastapi import APIRouter, Response
+from fastapi_utils.cbv import cbv
+from services.health_service import health_service
+from .api_spec import ApiSpec
+
+
+router = APIRouter(tags=["health"])
+
+
+@cbv(router)
+class HealthView:
+
+    @router.get(ApiSpec.HEALTH_LIVE, status_code=HTTPStatus.OK)
+    async def live(self):
+        return {"status": "live"}
+
+    @router.get(ApiSpec.HEALTH_READY, status_code=HTTPStatus.OK)
+    async def ready(self, response: Response):
+        if not await health_service.is_ready():
+            response.status_code = HTTPStatus.SERVICE_UNAVAILABLE
+            return {"status": "not ready"}
+        return {"status": "ready"}
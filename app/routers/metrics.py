@@ -0,0 +1,16 @@
+from http import HTTPStatus
+from fastapi import APIRouter, Response
+from fastapi_utils.cbv import cbv
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from .api_spec import ApiSpec
+
+
+router = APIRouter(tags=["metrics"])
+
+
+@cbv(router)
+class MetricsView:
+
+    @router.get(ApiSpec.METRICS, status_code=HTTPStatus.OK, include_in_schema=False)
+    async def get_metrics(self):
+        return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
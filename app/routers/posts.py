@@ -1,19 +1,25 @@
 from http import HTTPStatus
-from typing import List
+from typing import List, Union
 from typing_extensions import Annotated
-from fastapi import APIRouter, Response, Form, UploadFile
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Request, Response, Form, UploadFile
 from fastapi_utils.cbv import cbv
 from mixins import AuthMixin
 from services.post_service import post_service
-from db.dto import PostRespDTO, LikesRespDTO
+from db.dto import PostRespDTO, LikesRespDTO, PostsPageRespDTO
 from .api_spec import ApiSpec
+from db.unit_of_work import UnitOfWorkRoute
 from utils.rights_restrictions import available_roles
-from db.enums import UserRolesEnum as Roles
-from io import BytesIO
+from db.enums import UserRolesEnum as Roles, PaginationModesEnum
+from storage import blob_storage
+from utils.blob_responses import make_blob_response
+from utils.serializers import json_response
+from settings import Settings
 
 
-router = APIRouter(tags=["posts"])
+settings = Settings()
+
+
+router = APIRouter(tags=["posts"], route_class=UnitOfWorkRoute)
 
 
 @cbv(router)
@@ -22,33 +28,39 @@ class PostsView(AuthMixin):
     @router.post(ApiSpec.POSTS, status_code=HTTPStatus.OK, response_model=PostRespDTO)
     @available_roles(role=Roles.USER)
     async def make_post(self, text: Annotated[str, Form()] = None, image: UploadFile = None):
-        img = await image.read()
-        return await post_service.create_post(self.auth_headers, text=text, image=img)
+        # uploaded file is streamed to the blob storage by chunks, not read into memory
+        img = image.file if image is not None else None
+        return json_response(await post_service.create_post(self.auth_headers, text=text, image=img))
 
-    @router.get(ApiSpec.POSTS, status_code=HTTPStatus.OK, response_model=List[PostRespDTO])
+    @router.get(ApiSpec.POSTS, status_code=HTTPStatus.OK,
+                response_model=Union[PostsPageRespDTO, List[PostRespDTO]])
     @available_roles(role=Roles.USER)
-    async def get_all_posts(self, limit: str = 100, offset: str = 0):
-        return await post_service.get_all_posts(limit, offset)
+    async def get_all_posts(self, limit: str = 100, offset: str = 0,
+                            paging: PaginationModesEnum = PaginationModesEnum.OFFSET, cursor: str = None):
+        # payloads are built by the service in the response model shape, they are not revalidated
+        if paging == PaginationModesEnum.CURSOR:
+            return json_response(await post_service.get_posts_page(limit, cursor))
+        return json_response(await post_service.get_all_posts(limit, offset))
 
     @router.get(ApiSpec.POSTS_DETAILS, status_code=HTTPStatus.OK, response_model=PostRespDTO)
     @available_roles(role=Roles.USER)
     async def get_post(self, post_id: str):
-        return await post_service.get_post(post_id)
+        return json_response(await post_service.get_post(post_id))
 
     @router.get(ApiSpec.POSTS_IMAGES, status_code=HTTPStatus.OK)
     @available_roles(role=Roles.USER)
-    async def get_post_image(self, post_id: str):
+    async def get_post_image(self, post_id: str, request: Request):
         image = await post_service.get_post_image(post_id)
-        return Response(content=image, media_type="image/jpeg")
+        if isinstance(image, bytes):
+            return Response(content=image, media_type="image/jpeg")
+        return await make_blob_response(request, blob_storage, image,
+                                        media_type="image/jpeg", max_age=settings.IMAGE_CACHE_MAX_AGE)
 
     @router.patch(ApiSpec.POSTS_DETAILS, status_code=HTTPStatus.OK, response_model=PostRespDTO)
     @available_roles(role=Roles.USER)
     async def update_post(self, post_id: str, text: Annotated[str, Form()] = None, image: UploadFile = None):
-        if image is not None:
-            img = await image.read()
-        else:
-            img = image
-        return await post_service.update_post(self.auth_headers, post_id, text, img)
+        img = image.file if image is not None else None
+        return json_response(await post_service.update_post(self.auth_headers, post_id, text, img))
 
     @router.delete(ApiSpec.POSTS_DETAILS, status_code=HTTPStatus.NO_CONTENT)
     @available_roles(role=Roles.USER)
@@ -56,12 +68,27 @@ class PostsView(AuthMixin):
         await post_service.delete_post(self.auth_headers, post_id)
         return Response(status_code=HTTPStatus.NO_CONTENT)
 
-    @router.get(ApiSpec.POSTS_USERS, status_code=HTTPStatus.OK, response_model=List[PostRespDTO])
+    @router.get(ApiSpec.POSTS_USERS, status_code=HTTPStatus.OK,
+                response_model=Union[PostsPageRespDTO, List[PostRespDTO]])
+    @available_roles(role=Roles.USER)
+    async def get_user_posts(self, user_id: str, limit: str = 100, offset: str = 0,
+                             paging: PaginationModesEnum = PaginationModesEnum.OFFSET, cursor: str = None):
+        if paging == PaginationModesEnum.CURSOR:
+            return json_response(await post_service.get_posts_page(limit, cursor, user_id=user_id))
+        return json_response(await post_service.get_all_posts(limit, offset, user_id=user_id))
+
+    @router.get(ApiSpec.FEED, status_code=HTTPStatus.OK, response_model=PostsPageRespDTO)
     @available_roles(role=Roles.USER)
-    async def get_user_posts(self, user_id: str, limit: str = 100, offset: str = 0):
-        return await post_service.get_all_posts(limit, offset, user_id=user_id)
+    async def get_home_feed(self, limit: str = 100, cursor: str = None):
+        # posts of the followed users and the user's own, newest first
+        return json_response(await post_service.get_home_feed(self.auth_headers, limit, cursor))
 
     @router.post(ApiSpec.POSTS_LIKES, status_code=HTTPStatus.OK, response_model=LikesRespDTO)
     @available_roles(role=Roles.USER)
     async def like_post(self, post_id: str):
         return await post_service.like_post(self.auth_headers, post_id)
+
+    @router.delete(ApiSpec.POSTS_LIKES, status_code=HTTPStatus.OK, response_model=LikesRespDTO)
+    @available_roles(role=Roles.USER)
+    async def unlike_post(self, post_id: str):
+        return await post_service.unlike_post(self.auth_headers, post_id)
@@ -1,21 +1,22 @@
 from http import HTTPStatus
-from fastapi import APIRouter, HTTPException, Response
+from fastapi import APIRouter, HTTPException
 from fastapi_utils.cbv import cbv
 from services.user_service import user_service
-from db.dto import UserCreateDTO
+from db.dto import UserCreateDTO, UserRegistrationRespDTO
 from .api_spec import ApiSpec
+from db.unit_of_work import UnitOfWorkRoute
 
 
-router = APIRouter(tags=["registration"])
+router = APIRouter(tags=["registration"], route_class=UnitOfWorkRoute)
 
 
 @cbv(router)
 class RegistrationView:
-    @router.post(ApiSpec.REGISTRATION, status_code=HTTPStatus.CREATED)
+    @router.post(ApiSpec.REGISTRATION, status_code=HTTPStatus.CREATED, response_model=UserRegistrationRespDTO)
     async def create_user(self, input_data: UserCreateDTO):
         user, profile = await user_service.create_user(input_data)
         if user is None or profile is None:
             raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
                                 detail="INTERNAL_SERVER_ERROR")
-        else:
-            return Response(status_code=HTTPStatus.CREATED)
+        # email_status is 'pending' until the email is verified, see GET /users/{user_id}
+        return user
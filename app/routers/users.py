@@ -5,11 +5,16 @@ from mixins import AuthMixin
 from services.user_service import user_service
 from db.dto import UserRespDTO, UserProfileDTO, UserChangeProfileDTO, UserBlockDTO
 from .api_spec import ApiSpec
+from db.unit_of_work import UnitOfWorkRoute
 from utils.rights_restrictions import available_roles
 from db.enums import UserRolesEnum as Roles
+from utils.serializers import RowSerializer, json_response
 
 
-router = APIRouter(tags=["users"])
+user_serializer = RowSerializer.for_dto(UserRespDTO)
+profile_serializer = RowSerializer.for_dto(UserProfileDTO)
+
+router = APIRouter(tags=["users"], route_class=UnitOfWorkRoute)
 
 
 @cbv(router)
@@ -18,12 +23,12 @@ class UsersView(AuthMixin):
     @router.get(ApiSpec.USERS_DETAILS, status_code=HTTPStatus.OK, response_model=UserRespDTO)
     @available_roles(role=Roles.MODERATOR, self_action=True)
     async def get_user(self, user_id: str):
-        return await user_service.get_user(user_id)
+        return json_response(user_serializer(await user_service.get_user(user_id)))
 
     @router.patch(ApiSpec.USERS_DETAILS, status_code=HTTPStatus.OK, response_model=UserRespDTO)
     @available_roles(role=Roles.MODERATOR)
     async def block_user(self, user_id: str, item: UserBlockDTO):
-        return await user_service.block_user(user_id, item)
+        return json_response(user_serializer(await user_service.block_user(user_id, item)))
 
     @router.delete(ApiSpec.USERS_DETAILS, status_code=HTTPStatus.NO_CONTENT)
     @available_roles(role=Roles.ADMIN, self_action=True)
@@ -34,9 +39,9 @@ class UsersView(AuthMixin):
     @router.get(ApiSpec.USERS_PROFILES, status_code=HTTPStatus.OK, response_model=UserProfileDTO)
     @available_roles(role=Roles.USER)
     async def get_user_profile(self, user_id: str):
-        return await user_service.get_user_profile(user_id)
+        return json_response(await user_service.get_user_profile(user_id))
 
     @router.patch(ApiSpec.USERS_PROFILES, status_code=HTTPStatus.OK, response_model=UserProfileDTO)
     @available_roles(role=Roles.USER, self_action=True)
     async def update_user_profile(self, user_id: str, input_data: UserChangeProfileDTO):
-        return await user_service.update_user_profile(user_id, input_data)
+        return json_response(profile_serializer(await user_service.update_user_profile(user_id, input_data)))
@@ -1,7 +1,9 @@
 from fastapi import HTTPException
 from http import HTTPStatus
 from db.dto import LoginRespDTO, RefreshTokenReqDTO, RefreshTokenRespDTO
+from db.unit_of_work import release_connection
 from utils import auth_utils
+from utils.password_hasher import password_hasher
 from services.user_service import user_service
 from loguru import logger
 
@@ -10,7 +12,7 @@ class AuthService:
 
     async def login_user(self, form_data) -> LoginRespDTO:
         logger.info("AuthService: Login user")
-        logger.trace(f"AuthService: Login user: {form_data.username}")
+        logger.trace("AuthService: Login user: {}", form_data.username)
         user = await user_service.get_by_login(form_data.username)
         if user is None:
             raise HTTPException(status_code=HTTPStatus.BAD_REQUEST,
@@ -21,9 +23,15 @@ class AuthService:
         elif not user.is_active:
             raise HTTPException(status_code=HTTPStatus.BAD_REQUEST,
                                 detail='User does not exist')
-        if not auth_utils.verify_password(form_data.password, user.password):
+        # the request waits for a hashing worker without holding a database connection
+        await release_connection()
+        is_valid, new_hash = await password_hasher.verify_and_update(form_data.password, user.password)
+        if not is_valid:
             raise HTTPException(status_code=HTTPStatus.BAD_REQUEST,
                                 detail='Incorrect login or password')
+        if new_hash is not None:
+            # password was hashed with outdated settings
+            await user_service.update_password_hash(user.id, new_hash)
         access_token = await auth_utils.create_access_token(user.login)
         refresh_token = await auth_utils.create_refresh_token(user.login)
         resp = LoginRespDTO(access_token=access_token,
@@ -37,7 +45,7 @@ class AuthService:
         logger.info("AuthService: Refresh token")
         current_token = await auth_utils.verify_refresh_token(item.refresh_token)
         user = await user_service.get_by_login(current_token.sub)
-        logger.trace(f"AuthService: Refresh token for user: {user.id}")
+        logger.trace("AuthService: Refresh token for user: {}", user.id)
         if not user.is_active:
             raise HTTPException(status_code=HTTPStatus.BAD_REQUEST,
                                 detail="The user does not exist anymore")
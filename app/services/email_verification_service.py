@@ -0,0 +1,110 @@
+import asyncio
+from typing import List, Optional
+from fastapi import HTTPException
+from db.dao import user_dao, UserDAO
+from db.enums import EmailStatusesEnum
+from db.models.UserModel import UserModel
+from db.unit_of_work import unit_of_work
+from settings import Settings
+from utils.ttl_cache import TTLCache
+from .external_api_service import external_api_service, ExternalAPIService
+from loguru import logger
+
+
+class EmailVerificationService:
+    """Verifies emails of registered users in background workers and stores the verdict in
+    the user's email_status; users are created with 'pending' status and never wait for hunter.io.
+    Verdicts that describe the whole domain (disposable and webmail) are cached per domain,
+    so repeated domains skip the external call"""
+
+    DOMAIN_STATUSES = (EmailStatusesEnum.DISPOSABLE, EmailStatusesEnum.WEBMAIL)
+    # advisory lock of the requeue of pending verifications
+    REQUEUE_LOCK_KEY = 0x656d61696c
+
+    def __init__(self, user_dao: UserDAO, external_api: ExternalAPIService):
+        self._user_dao = user_dao
+        self._external_api = external_api
+        self._settings = Settings()
+        self._domains_cache = TTLCache(maxsize=self._settings.EMAIL_DOMAIN_CACHE_SIZE,
+                                       ttl=self._settings.EMAIL_DOMAIN_CACHE_TTL)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def domains_cache(self) -> TTLCache:
+        return self._domains_cache
+
+    def enqueue(self, user_id, email: str):
+        logger.info("EmailVerificationService: Enqueue email verification")
+        logger.trace("EmailVerificationService: Enqueue verification of email of user with id {}", user_id)
+        self._get_queue().put_nowait((user_id, email))
+
+    def _get_queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    async def verify(self, email: str) -> EmailStatusesEnum:
+        domain = email.rsplit("@", 1)[-1].lower()
+        status = self._domains_cache.get(domain)
+        if status is not None:
+            logger.debug("EmailVerificationService: domain verdict is taken from cache: {}", status)
+            return status
+        try:
+            status = await self._external_api.verify_email_hunter(email)
+        except HTTPException as e:
+            logger.warning("EmailVerificationService: email cannot be verified: {}", e.detail)
+            return EmailStatusesEnum.INVALID if "invalid" in e.detail else EmailStatusesEnum.FAILED
+        if status in self.DOMAIN_STATUSES:
+            self._domains_cache.set(domain, status)
+        return status
+
+    async def _run(self):
+        queue = self._get_queue()
+        while True:
+            user_id, email = await queue.get()
+            try:
+                status = await self.verify(email)
+                await self._user_dao.patch({"email_status": status}, user_id)
+                logger.trace("EmailVerificationService: email of user with id {} is verified: {}", user_id, status)
+            except Exception as e:
+                logger.exception(e)
+            finally:
+                queue.task_done()
+
+    async def requeue_pending(self, batch_size: int = 1000):
+        """Enqueues verification of users left in 'pending' status, e.g. by a restart;
+        of the workers started at once only the one holding the advisory lock requeues them"""
+        requeued = 0
+        async with unit_of_work():
+            if not await self._user_dao.try_advisory_lock(self.REQUEUE_LOCK_KEY):
+                logger.info("EmailVerificationService: pending email verifications are requeued by another worker")
+                return
+            after = None
+            while True:
+                users = await self._user_dao.get_page_rows_by((UserModel.id, UserModel.email), batch_size,
+                                                              (UserModel.id,), after,
+                                                              email_status=EmailStatusesEnum.PENDING)
+                for user in users:
+                    self.enqueue(user.id, user.email)
+                requeued += len(users)
+                if len(users) < batch_size:
+                    break
+                after = (users[-1].id,)
+        logger.info("EmailVerificationService: {} pending email verifications are requeued", requeued)
+
+    def start(self):
+        if not self._workers:
+            logger.info("EmailVerificationService: Start email verification workers")
+            self._workers = [asyncio.create_task(self._run())
+                             for _ in range(self._settings.EMAIL_VERIFICATION_WORKERS)]
+
+    async def stop(self):
+        # unfinished verifications stay 'pending' and are requeued on the next start
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+email_verification_service = EmailVerificationService(user_dao, external_api_service)
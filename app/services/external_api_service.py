@@ -3,6 +3,8 @@ from fastapi import HTTPException
 from typing import Union
 import asyncio
 from db.dao.http_request import make_request
+from clients import HTTPClientError
+from utils.singleflight import SingleFlight
 from settings import Settings
 from db.dto import HunterIOReqDTO
 from db.enums import EmailStatusesEnum
@@ -16,12 +18,17 @@ class ExternalAPIService:
 
     def __init__(self):
         self._http_client = make_request
+        self._verify_email_flight = SingleFlight("verify_email_hunter")
 
     async def verify_email_hunter(self, email: str) -> Union[EmailStatusesEnum, str]:
         """Verifies email using hunter.io API;
+        concurrent verifications of the same email share one request;
         returns EmailStatusEnum"""
         logger.info("VerifyEmailHunter: Verify email with hunter IO")
-        logger.trace(f"VerifyEmailHunter: Verify email: {email}")
+        logger.trace("VerifyEmailHunter: Verify email: {}", email)
+        return await self._verify_email_flight.do(email.lower(), self._verify_email_hunter, email)
+
+    async def _verify_email_hunter(self, email: str) -> Union[EmailStatusesEnum, str]:
         url = f"{settings.HUNTER_IO_API_HOST}{settings.HUNTER_IO_API_VERIFIER}"
         method = 'GET'
         query_params = HunterIOReqDTO(email=email, api_key=settings.HUNTER_IO_API_KEY).dict()
@@ -30,21 +37,22 @@ class ExternalAPIService:
         if response is None:
             return EmailStatusesEnum.FAILED
         else:
-            logger.trace(f"VerifyEmailHunter: Response data from hunter io: {response}")
+            logger.trace("VerifyEmailHunter: Response data from hunter io: {}", response)
             verification_status = response["data"]["status"]
-            logger.trace(f"VerifyEmailHunter: Email verification status: {verification_status}")
+            logger.trace("VerifyEmailHunter: Email verification status: {}", verification_status)
             if verification_status in EmailStatusesEnum._member_map_.values():
                 return verification_status
             else:
-                logger.warning(f"External API service: HUNTER IO:\
-                 server verified email with unknown status: {verification_status};\
-                 please update external API service in accordance with new API documentation")
+                logger.warning("External API service: HUNTER IO: server verified email with unknown status: {}; "
+                               "please update external API service in accordance with new API documentation",
+                               verification_status)
                 return EmailStatusesEnum.UNSTATED
 
     async def make_hunt_io_request(self, method: str, url: str, query_params: dict):
         """Makes request to Hunter.io API;
         API documentation: https://hunter.io/api-documentation/v2#email-verifier
-        if request fails due to hunter IO subscription issues,
+        if request fails due to hunter IO subscription issues
+        or hunter IO server is unreachable after retries,
         returns None
         if request succeeds - returns response from Hunter io server
         if request fails due to external servers troubles after retries,
@@ -52,9 +60,15 @@ class ExternalAPIService:
         - raises HttpException
         """
         logger.info("MakeHuntRequest: Make request to hunter io")
+        resp_status = None
         for _ in range(settings.HUNTER_IO_API_RETRY):
-            resp_status, response = await self._http_client(method, url, query_params=query_params)
-            logger.debug(f"MakeHuntRequest: response from hunt io server: {response}")
+            try:
+                resp_status, response = await self._http_client(method, url, query_params=query_params)
+            except HTTPClientError as e:
+                logger.warning("MakeHuntRequest: request to hunter io failed: {}", e)
+                await asyncio.sleep(settings.HUNTER_IO_API_SLEEP)
+                continue
+            logger.debug("MakeHuntRequest: response from hunt io server: {}", response)
             if resp_status in (HTTPStatus.OK, HTTPStatus.UNAVAILABLE_FOR_LEGAL_REASONS):
                 return response
             elif resp_status in (HTTPStatus.ACCEPTED, 222):
@@ -69,7 +83,10 @@ class ExternalAPIService:
             raise HTTPException(status_code=HTTPStatus.BAD_REQUEST,
                                 detail="BAD_REQUEST: provided email is invalid")
         elif resp_status == HTTPStatus.TOO_MANY_REQUESTS:
-            logger.warning(f"HUNTER IO: server response status {resp_status}: response: {response}")
+            logger.warning("HUNTER IO: server response status {}: response: {}", resp_status, response)
+            return None
+        elif resp_status is None:
+            logger.warning("HUNTER IO: server did not respond")
             return None
 
 
@@ -0,0 +1,114 @@
+import asyncio
+from http import HTTPStatus
+from datetime import datetime
+from typing import List, Set
+from fastapi import HTTPException
+import sqlalchemy.exc
+from db.dao import follow_dao, FollowDAO, timeline_dao, TimelineDAO
+from db.dto import AuthHeadersDTO, FollowsRespDTO
+from db.unit_of_work import after_commit, outside_unit_of_work
+from settings import Settings
+from utils.errors_handlers import Error_Handler
+from loguru import logger
+
+
+class FollowService:
+    """Follow graph and fan-out-on-write of new posts to the materialized home timelines of followers;
+    posts of authors with more than FEED_FANOUT_MAX_FOLLOWERS followers at the time of the post
+    are not fanned out, home feeds pull them when read"""
+
+    def __init__(self, follow_dao: FollowDAO, timeline_dao: TimelineDAO):
+        self._follow_dao = follow_dao
+        self._timeline_dao = timeline_dao
+        self._settings = Settings()
+        self._fan_outs: Set[asyncio.Task] = set()
+
+    @property
+    def max_followers(self) -> int:
+        return self._settings.FEED_FANOUT_MAX_FOLLOWERS
+
+    @Error_Handler
+    async def follow(self, auth_headers: AuthHeadersDTO, user_id: str) -> FollowsRespDTO:
+        logger.info("FollowService: Follow a user")
+        logger.trace("FollowService: Follow a user with id: {} by user with id: {}", user_id, auth_headers.user_id)
+        if str(user_id) == str(auth_headers.user_id):
+            err = HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='BAD REQUEST: user cannot follow itself')
+            logger.exception(err)
+            raise err
+        try:
+            followee = await self._follow_dao.follow(auth_headers.user_id, user_id)
+        except sqlalchemy.exc.DBAPIError as e:
+            logger.exception(e)
+            err = HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='BAD REQUEST: no user with provided id')
+            logger.exception(err)
+            raise err
+        if followee is None:
+            # nothing was changed, find out why
+            follow = await self._follow_dao.get_by(follower_id=auth_headers.user_id, followee_id=user_id)
+            detail = 'BAD REQUEST: user is already followed' if follow is not None \
+                else 'BAD REQUEST: no user with provided id'
+            err = HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=detail)
+            logger.exception(err)
+            raise err
+        # posts of the author which are not fanned out are pulled when the feed is read, the rest is backfilled
+        await self._timeline_dao.backfill(auth_headers.user_id, user_id, self._settings.FEED_BACKFILL_SIZE)
+        return FollowsRespDTO(id=followee.id, followers_count=followee.followers_count)
+
+    @Error_Handler
+    async def unfollow(self, auth_headers: AuthHeadersDTO, user_id: str) -> FollowsRespDTO:
+        logger.info("FollowService: Unfollow a user")
+        logger.trace("FollowService: Unfollow a user with id: {} by user with id: {}", user_id, auth_headers.user_id)
+        try:
+            followee = await self._follow_dao.unfollow(auth_headers.user_id, user_id)
+        except sqlalchemy.exc.DBAPIError as e:
+            logger.exception(e)
+            err = HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='BAD REQUEST: no user with provided id')
+            logger.exception(err)
+            raise err
+        if followee is None:
+            err = HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='BAD REQUEST: user is not followed')
+            logger.exception(err)
+            raise err
+        await self._timeline_dao.remove_author(auth_headers.user_id, user_id)
+        return FollowsRespDTO(id=followee.id, followers_count=followee.followers_count)
+
+    @Error_Handler
+    async def get_followers(self, user_id: str, limit: int, offset: int) -> List:
+        logger.info("FollowService: Get followers of a user")
+        logger.trace("FollowService: Get followers of a user with id: {}", user_id)
+        return await self._follow_dao.get_follower_ids(user_id, limit, offset)
+
+    @Error_Handler
+    async def get_followees(self, user_id: str, limit: int, offset: int) -> List:
+        logger.info("FollowService: Get users followed by a user")
+        logger.trace("FollowService: Get users followed by a user with id: {}", user_id)
+        return await self._follow_dao.get_followee_ids(user_id, limit, offset)
+
+    def fan_out(self, post_id, author_id, created_at: datetime):
+        """Adds the post to the home timelines of the author and the author's followers in background,
+        once the post is committed; the post creation does not wait for it"""
+        logger.info("FollowService: Schedule fan-out of a post")
+        logger.trace("FollowService: Schedule fan-out of a post with id: {}", post_id)
+
+        def start():
+            task = asyncio.create_task(self._fan_out(post_id, author_id, created_at))
+            # tasks are referenced until done, so they are not garbage collected and can be awaited on stop
+            self._fan_outs.add(task)
+            task.add_done_callback(self._fan_outs.discard)
+
+        after_commit(start)
+
+    async def _fan_out(self, post_id, author_id, created_at: datetime):
+        try:
+            with outside_unit_of_work():
+                await self._timeline_dao.fan_out(post_id, author_id, created_at, self.max_followers)
+        except Exception as e:
+            logger.exception(e)
+
+    async def stop(self):
+        if self._fan_outs:
+            logger.info("FollowService: Wait for {} fan-outs in progress", len(self._fan_outs))
+            await asyncio.gather(*self._fan_outs, return_exceptions=True)
+
+
+follow_service = FollowService(follow_dao, timeline_dao)
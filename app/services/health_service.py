@@ -0,0 +1,32 @@
+import asyncio
+from sqlalchemy.exc import SQLAlchemyError
+from db.database import ping_db
+from settings import Settings
+from loguru import logger
+
+
+class HealthService:
+    """Liveness and readiness of the worker for orchestrator probes;
+    the worker is ready once startup is finished and while the database answers,
+    and stops being ready as soon as shutdown begins, so traffic is drained first"""
+
+    def __init__(self):
+        self._settings = Settings()
+        self._started = False
+
+    def set_started(self, started: bool):
+        logger.info("HealthService: worker is {}", "started" if started else "stopping")
+        self._started = started
+
+    async def is_ready(self) -> bool:
+        if not self._started:
+            return False
+        try:
+            await asyncio.wait_for(ping_db(), self._settings.HEALTH_DB_TIMEOUT)
+        except (asyncio.TimeoutError, OSError, SQLAlchemyError) as e:
+            logger.warning("HealthService: database is not available: {}", e)
+            return False
+        return True
+
+
+health_service = HealthService()
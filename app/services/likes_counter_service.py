@@ -0,0 +1,108 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+from uuid import UUID
+from db.dao import post_dao, PostDAO
+from db.unit_of_work import outside_unit_of_work
+from settings import Settings
+from loguru import logger
+
+
+class LikesCounterService:
+    """Write-behind aggregator for posts likes counters;
+    buffers likes/unlikes deltas per post in memory and flushes them to the database
+    in batches every LIKES_FLUSH_INTERVAL seconds or when LIKES_FLUSH_THRESHOLD posts are pending,
+    so writers of a hot post don't serialize on its row lock"""
+
+    def __init__(self, post_dao: PostDAO):
+        self._post_dao = post_dao
+        self._settings = Settings()
+        self._pending: Dict[UUID, int] = {}
+        self._flushing: Dict[UUID, int] = {}
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_listeners: List[Callable[[List[UUID]], Awaitable]] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self._settings.LIKES_AGGREGATION_ENABLED
+
+    def add(self, post_id, delta: int):
+        post_id = UUID(str(post_id))
+        self._pending[post_id] = self._pending.get(post_id, 0) + delta
+        if len(self._pending) >= self._settings.LIKES_FLUSH_THRESHOLD and \
+                (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    def pending(self, post_id) -> int:
+        """Returns the likes delta of the post not yet stored in the database"""
+        post_id = UUID(str(post_id))
+        return self._pending.get(post_id, 0) + self._flushing.get(post_id, 0)
+
+    def on_flush(self, listener: Callable[[List[UUID]], Awaitable]):
+        """Registers a coroutine function called with ids of posts which counters are flushed,
+        e.g. to drop copies of the posts made before the flush"""
+        self._flush_listeners.append(listener)
+
+    async def flush(self):
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            # deltas stay visible to readers until they are committed
+            self._flushing, self._pending = self._pending, {}
+            deltas = {post_id: delta for post_id, delta in self._flushing.items() if delta}
+            logger.info("LikesCounterService: Flush likes counters")
+            logger.trace("LikesCounterService: Flush likes counters of {} posts", len(deltas))
+            try:
+                if deltas:
+                    # flush may be started while handling a request, but must not join its transaction
+                    with outside_unit_of_work():
+                        await self._post_dao.update_likes_many(deltas)
+            except BaseException as e:
+                # keep deltas for the next flush
+                for post_id, delta in self._flushing.items():
+                    self._pending[post_id] = self._pending.get(post_id, 0) + delta
+                self._flushing = {}
+                if not isinstance(e, Exception):
+                    raise
+                logger.exception(e)
+                return
+            # committed deltas are read from the database from now on, listeners must not see them twice
+            self._flushing = {}
+            if deltas:
+                with outside_unit_of_work():
+                    await self._notify_flushed(list(deltas))
+
+    async def _notify_flushed(self, post_ids: List[UUID]):
+        for listener in self._flush_listeners:
+            # counters are already stored, a failed listener must not make them flushed again
+            try:
+                await listener(post_ids)
+            except Exception as e:
+                logger.exception(e)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._settings.LIKES_FLUSH_INTERVAL)
+            await self.flush()
+
+    def start(self):
+        if self.enabled and self._task is None:
+            logger.info("LikesCounterService: Start likes counters flushing")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            logger.info("LikesCounterService: Stop likes counters flushing")
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+likes_counter_service = LikesCounterService(post_dao)
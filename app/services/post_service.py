@@ -1,143 +1,260 @@
 from http import HTTPStatus
 from fastapi import HTTPException
 import sqlalchemy.exc
-from typing import NoReturn, List
+from sqlalchemy.orm import undefer, selectinload
+from typing import NoReturn, List, Optional, Union, BinaryIO, Sequence
+from uuid import UUID
+from sqlalchemy.engine import Row
 from db.models.PostModel import PostModel
-from db.dao import post_dao, PostDAO, like_dao, LikeDAO
-from db.dto import AuthHeadersDTO, PostRespDTO,\
-    PostDTO, LikesPostReqDTO, LikesReqDTO, LikesRespDTO
+from db.dao import post_dao, PostDAO, like_dao, LikeDAO, timeline_dao, TimelineDAO
+from db.dto import AuthHeadersDTO, PostRespDTO, LikesRespDTO
+from db.unit_of_work import release_connection
 from settings import Settings
 from routers.api_spec import ApiSpec
 from utils.errors_handlers import Error_Handler
+from utils.ids import parse_id
+from utils.pagination import encode_cursor, decode_cursor
+from utils.serializers import RowSerializer
+from storage import blob_storage, BlobStorage
+from cache import cache_backend, CacheBackend, ReadThroughCache
+from .likes_counter_service import likes_counter_service, LikesCounterService
+from .follow_service import follow_service, FollowService
 from loguru import logger
 
 
 class PostService:
 
-    def __init__(self, post_dao: PostDAO, like_dao: LikeDAO):
+    def __init__(self, post_dao: PostDAO, like_dao: LikeDAO, likes_counter: LikesCounterService,
+                 blob_storage: BlobStorage, timeline_dao: TimelineDAO, follow_service: FollowService,
+                 cache_backend: CacheBackend):
         self._post_dao = post_dao
         self._like_dao = like_dao
+        self._likes_counter = likes_counter
+        self._blob_storage = blob_storage
+        self._timeline_dao = timeline_dao
+        self._follow_service = follow_service
         self._settings = Settings()
-        self._image_basic_url = f"{self._settings.HOST}:{self._settings.PORT}{ApiSpec.POSTS_IMAGES}"
+        # image url is the prefix, the post id and the suffix, concatenated without formatting
+        self._image_url_prefix, self._image_url_suffix = \
+            f"{self._settings.HOST}:{self._settings.PORT}{ApiSpec.POSTS_IMAGES.value}".split("{post_id}")
+        self._post_serializer = RowSerializer.for_dto(PostRespDTO, exclude=("liked_by", "image"))
+        # posts feeds are ordered by (created_at, id), newest first
+        self._feed_keyset = (PostModel.created_at, PostModel.id)
+        self._feed_order = tuple(column.desc() for column in self._feed_keyset)
+        # relationships are not loaded unless requested
+        self._liked_by_loader = selectinload(PostModel.liked_by)
+        # payloads of single posts with likers, as stored in the database, without pending likes
+        self._posts_cache = ReadThroughCache("posts", cache_backend, self._settings.POSTS_CACHE_TTL,
+                                             self._settings.CACHE_NEGATIVE_TTL, self._settings.CACHE_TTL_JITTER)
+        self._likes_counter.on_flush(lambda post_ids: self._posts_cache.invalidate(*post_ids))
 
-    async def create_post(self, auth_headers: AuthHeadersDTO, text: str = None, image: bytes = None) -> PostModel:
+    @property
+    def posts_cache(self) -> ReadThroughCache:
+        return self._posts_cache
+
+    async def create_post(self, auth_headers: AuthHeadersDTO, text: str = None,
+                          image: BinaryIO = None) -> dict:
         logger.info("PostService: Create post")
-        logger.trace(f"PostService: Create post from user with id: {auth_headers.user_id}")
-        # pydantic has issues with bytes objects encoding, so here Pydantic model isn't used as DTO
-        # the python dictionary is used instead
+        logger.trace("PostService: Create post from user with id: {}", auth_headers.user_id)
+        # image content goes to the blob storage, post keeps only the blob key
+        image_key = None
+        if image is not None:
+            # the principal lookup is the only statement so far, its connection is not held during the upload
+            await release_connection()
+            image_key = await self._blob_storage.save(image)
         post_db = await self._post_dao.create({"user_id": auth_headers.user_id,
                                                 "text": text,
-                                                "image": image})
+                                                "image_key": image_key})
+        self._follow_service.fan_out(post_db.id, post_db.user_id, post_db.created_at)
         # post is returned without an image, image can be requested separately
-        post = PostDTO(**post_db.dict())
-        post = PostRespDTO(**post.dict())
-        post.image = self._image_basic_url.format(post_id=post.id)
-        post.liked_by = post_db.liked_by
+        return self._serialize(post_db, [])
+
+    def _serialize(self, post_db: Union[PostModel, Row], liked_by: List) -> dict:
+        """Payload of PostRespDTO shape built in one pass, sent without revalidation"""
+        return self._with_pending_likes(self._payload(post_db, liked_by))
+
+    def _payload(self, post_db: Union[PostModel, Row], liked_by: List) -> dict:
+        post = self._post_serializer(post_db)
+        post["image"] = f"{self._image_url_prefix}{post['id']}{self._image_url_suffix}"
+        post["liked_by"] = liked_by
+        return post
+
+    def _with_pending_likes(self, post: dict) -> dict:
+        # pending likes are kept by this worker only, so they are never cached
+        post["likes"] += self._likes_counter.pending(post["id"])
         return post
 
     @Error_Handler
-    async def get_all_posts(self, *args, **kwargs) -> List[PostModel]:
+    async def get_all_posts(self, *args, **kwargs) -> List[dict]:
         logger.info("PostService: Get all posts with limit and offset")
-        posts = await self._post_dao.get_all_by(*args, **kwargs)
-        response = []
-        if posts:
-            for post_db in posts:
-                post = PostDTO(**post_db.dict())
-                post = PostRespDTO(**post.dict())
-                post.image = self._image_basic_url.format(post_id=post.id)
-                post.liked_by = post_db.liked_by
-                response.append(post)
-        return response
+        # the same order as in cursor pagination, so offset pages are stable too
+        posts = await self._post_dao.get_feed_rows(*args, order_by=self._feed_order, **kwargs)
+        return self._make_feed(posts)
 
     @Error_Handler
-    async def get_post(self, post_id: str) -> PostRespDTO:
+    async def get_posts_page(self, limit: int, cursor: Optional[str] = None, **kwargs) -> dict:
+        logger.info("PostService: Get page of posts with limit and cursor")
+        logger.trace("PostService: Get page of posts with limit: {}, cursor: {}", limit, cursor)
+        after = decode_cursor(cursor) if cursor else None
+        posts = await self._post_dao.get_feed_page_rows(int(limit), self._feed_keyset, after, **kwargs)
+        next_cursor = None
+        if posts and len(posts) == int(limit):
+            next_cursor = encode_cursor(posts[-1].created_at, posts[-1].id)
+        # PostsPageRespDTO shape
+        return {"items": self._make_feed(posts), "next_cursor": next_cursor}
+
+    @Error_Handler
+    async def get_home_feed(self, auth_headers: AuthHeadersDTO, limit: int, cursor: Optional[str] = None) -> dict:
+        """Page of the user's home feed: the materialized timeline merged with posts of followed authors
+        which are not fanned out, both read by the same keyset"""
+        logger.info("PostService: Get page of home feed with limit and cursor")
+        logger.trace("PostService: Get page of home feed of user with id: {}, limit: {}, cursor: {}",
+                     auth_headers.user_id, limit, cursor)
+        limit = int(limit)
+        after = decode_cursor(cursor) if cursor else None
+        pushed = await self._timeline_dao.get_timeline_rows(self._post_dao.feed_columns, auth_headers.user_id,
+                                                            limit, after)
+        # most users follow no author above the fan-out threshold, their feed is the timeline alone
+        authors = await self._timeline_dao.get_pulled_authors(auth_headers.user_id)
+        pulled = []
+        if authors:
+            pulled = await self._timeline_dao.get_pulled_rows(self._post_dao.feed_columns, authors, limit, after)
+        # pulled posts are never fanned out, both parts are disjoint
+        posts = sorted((*pushed, *pulled), key=lambda post: (post.created_at, post.id), reverse=True)[:limit]
+        next_cursor = None
+        if posts and len(posts) == limit:
+            next_cursor = encode_cursor(posts[-1].created_at, posts[-1].id)
+        # PostsPageRespDTO shape
+        return {"items": self._make_feed(posts), "next_cursor": next_cursor}
+
+    def _make_feed(self, posts: List[Row]) -> List[dict]:
+        return [self._serialize(post_db, post_db.liked_by or []) for post_db in posts]
+
+    @Error_Handler
+    async def get_post(self, post_id: str) -> dict:
         logger.info("PostService: Get post by post_id")
-        logger.trace(f"PostService: Get post by post_id: {post_id}")
-        try:
-            post_db = await self._post_dao.get_by_id(post_id)
-        except sqlalchemy.exc.DBAPIError as e:
-            logger.exception(e)
+        logger.trace("PostService: Get post by post_id: {}", post_id)
+        post_id = parse_id(post_id, 'BAD REQUEST: no post with provided id')
+        # read through the cache, concurrent misses of the same post share one database query
+        post = await self._posts_cache.get_or_load(post_id, lambda: self._load_post(post_id))
+        if post is None:
             err = HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='BAD REQUEST: no post with provided id')
             logger.exception(err)
             raise err
-        post = PostDTO(**post_db.dict())
-        post = PostRespDTO(**post.dict())
-        post.image = self._image_basic_url.format(post_id=post.id)
-        post.liked_by = [like.user_id for like in post_db.liked_by]
-        return post
+        return self._with_pending_likes(post)
+
+    async def _load_post(self, post_id: UUID) -> Optional[dict]:
+        # loaded on the connection of the request's unit of work, which has written nothing on this path,
+        # a second connection per request could wait forever for a pool saturated by such requests
+        post_db = await self._post_dao.get_by_id(post_id, options=(self._liked_by_loader,))
+        if post_db is None:
+            return None
+        return self._payload(post_db, [like.user_id for like in post_db.liked_by])
 
     @Error_Handler
-    async def get_post_image(self, post_id: str) -> bytes:
+    async def get_post_image(self, post_id: str) -> Union[str, bytes]:
+        """Returns blob storage key of the post image,
+        or the image content itself for posts which images are not moved to the blob storage yet"""
         logger.info("PostService: Get post image by post_id")
-        logger.trace(f"PostService: Get post image by post_id: {post_id}")
-        post = await self._post_dao.get_by_id(post_id)
-        return post.image
+        logger.trace("PostService: Get post image by post_id: {}", post_id)
+        # the only place where image column is loaded
+        post = await self._get_post_db(post_id, options=(undefer(PostModel.image),))
+        if post.image_key is not None:
+            return post.image_key
+        if post.image is not None:
+            return post.image
+        err = HTTPException(status_code=HTTPStatus.NOT_FOUND, detail='NOT FOUND: post has no image')
+        logger.exception(err)
+        raise err
 
     @Error_Handler
     async def update_post(self, auth_headers: AuthHeadersDTO, post_id: str,
-                          text: str = None, image: bytes = None) -> PostRespDTO:
+                          text: str = None, image: BinaryIO = None) -> dict:
         logger.info("PostService: Update post")
-        logger.trace(f"PostService: Update post with post_id: {post_id}")
+        logger.trace("PostService: Update post with post_id: {}", post_id)
         # check if requesting ia authorized to update post
         await self.check_owner_rights(post_id, auth_headers.user_id)
-        # we cannot use exclude_unset in base_dao as we don't use Pydantic model here
-        # (bc Pydantic has issues with bytes object of image)
-        # so we make a special method in post_dao and need to exclude unset vars manually
-        if text is None and image is None:
-            item = {}
-        elif text is None:
-            item = {"image": image}
-        elif image is None:
-            item = {"text": text}
-        else:
-            item = {"text": text,
-                    "image": image}
+        # unset vars are excluded manually
+        item = {}
+        if text is not None:
+            item["text"] = text
+        if image is not None:
+            # the owner check is a read, its connection is not held during the upload
+            await release_connection()
+            item["image_key"] = await self._blob_storage.save(image)
+            item["image"] = None
         post_db = await self._post_dao.patch(item, post_id)
-        post = PostDTO(**post_db.dict())
-        post = PostRespDTO(**post.dict())
-        post.image = self._image_basic_url.format(post_id=post.id)
-        post.liked_by = [like.user_id for like in post_db.liked_by]
-        return post
+        if post_db is None:
+            err = HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='BAD REQUEST: no post with provided id')
+            logger.exception(err)
+            raise err
+        await self._posts_cache.invalidate(UUID(str(post_id)))
+        return self._serialize(post_db, await self._like_dao.get_likers(post_id))
 
     @Error_Handler
     async def delete_post(self, auth_headers: AuthHeadersDTO, post_id: str) -> NoReturn:
         logger.info("PostService: Delete post")
-        logger.trace(f"PostService: Delete post with post_id: {post_id}")
+        logger.trace("PostService: Delete post with post_id: {}", post_id)
         # check if requesting user is authorized to delete post
         await self.check_owner_rights(post_id, auth_headers.user_id)
         await self._post_dao.delete(post_id)
+        await self._posts_cache.invalidate(UUID(str(post_id)))
 
     @Error_Handler
     async def like_post(self, auth_headers: AuthHeadersDTO, post_id: str) -> LikesRespDTO:
         logger.info("PostService: Like a post")
-        logger.trace(f"PostService: Like a post with id: {post_id} by user with id: {auth_headers.user_id}")
-        # check if user is authorized to like a post (can like only other users' posts, not its own)
-        await self.check_owner_rights(post_id, auth_headers.user_id, False)
-        post_is_liked = await self._like_dao.get_by(user_id=auth_headers.user_id, post_id=post_id)
-        if post_is_liked is not None:
+        logger.trace("PostService: Like a post with id: {} by user with id: {}", post_id, auth_headers.user_id)
+        # like is added and likes counter is incremented in one transaction,
+        # user can like only other users' posts, not its own
+        aggregate = self._likes_counter.enabled
+        try:
+            liked_post = await self._like_dao.like(auth_headers.user_id, post_id, update_counter=not aggregate)
+        except sqlalchemy.exc.DBAPIError as e:
+            logger.exception(e)
+            err = HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='BAD REQUEST: no post with provided id')
+            logger.exception(err)
+            raise err
+        if liked_post is None:
+            # nothing was changed, find out why
+            await self.check_owner_rights(post_id, auth_headers.user_id, False)
             err = HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='BAD REQUEST: post is already liked by user')
             logger.exception(err)
             raise err
-        # TODO: change to using Redis instead
-        post = await self.get_post(post_id)
-
-        item = LikesPostReqDTO(likes=post.likes + 1)
-        like_post = await self._post_dao.patch(item, post_id)
-        logger.trace(f"PostService: Like a post: post with id: {post_id} - likes counter is updated")
-
-        item = LikesReqDTO(
-            user_id=auth_headers.user_id,
-            post_id=post_id
-        )
-        await self._like_dao.create(item)
-        logger.trace(f"PostService: Like a post: post with id: {post_id} - like is added")
-        # TODO: roll back changes to posts table
-
-        resp = LikesRespDTO(**like_post.dict())
-        liked_post = await self._post_dao.get_by_id(post_id)
-        likes = [like.user_id for like in liked_post.liked_by]
-        resp.liked_by = likes
-        return resp
+        logger.trace("PostService: Like a post: post with id: {} - like is added", post_id)
+        await self._posts_cache.invalidate(UUID(str(post_id)))
+        if aggregate:
+            self._likes_counter.add(liked_post.id, 1)
+        likes = liked_post.likes + self._likes_counter.pending(liked_post.id)
+        # the like change of this request is seen by the likers query of its unit of work
+        liked_by = await self._like_dao.get_likers(liked_post.id)
+        return LikesRespDTO(id=liked_post.id, likes=likes, liked_by=liked_by)
+
+    @Error_Handler
+    async def unlike_post(self, auth_headers: AuthHeadersDTO, post_id: str) -> LikesRespDTO:
+        logger.info("PostService: Unlike a post")
+        logger.trace("PostService: Unlike a post with id: {} by user with id: {}", post_id, auth_headers.user_id)
+        aggregate = self._likes_counter.enabled
+        try:
+            unliked_post = await self._like_dao.unlike(auth_headers.user_id, post_id, update_counter=not aggregate)
+        except sqlalchemy.exc.DBAPIError as e:
+            logger.exception(e)
+            err = HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='BAD REQUEST: no post with provided id')
+            logger.exception(err)
+            raise err
+        if unliked_post is None:
+            # raises if there is no such post
+            await self._get_post_db(post_id)
+            err = HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='BAD REQUEST: post is not liked by user')
+            logger.exception(err)
+            raise err
+        logger.trace("PostService: Unlike a post: post with id: {} - like is removed", post_id)
+        await self._posts_cache.invalidate(UUID(str(post_id)))
+        if aggregate:
+            self._likes_counter.add(unliked_post.id, -1)
+        likes = unliked_post.likes + self._likes_counter.pending(unliked_post.id)
+        # the like change of this request is seen by the likers query of its unit of work
+        liked_by = await self._like_dao.get_likers(unliked_post.id)
+        return LikesRespDTO(id=unliked_post.id, likes=likes, liked_by=liked_by)
 
     async def check_owner_rights(self, post_id: str, user_id: str, flag: bool = True) -> bool:
         """Checks if the user_id of the post owner is equal/not equal requesting user id;
@@ -145,8 +262,8 @@ class PostService:
         asserts for inequality if 'flag' argument is set to 'False'"""
         logger.info("PostService: Check if post owner is requesting to perform an action")
         logger.trace(
-            f"PostService: Check if user_id {user_id} is authorized to perform an action on post: {post_id}")
-        post = await self.get_post(post_id)
+            "PostService: Check if user_id {} is authorized to perform an action on post: {}", user_id, post_id)
+        post = await self._get_post_db(post_id)
         try:
             if flag:
                 assert(post.user_id == user_id)
@@ -159,5 +276,18 @@ class PostService:
             logger.exception(err)
             raise err
 
+    async def _get_post_db(self, post_id: str, options: Sequence = ()) -> PostModel:
+        try:
+            post_db = await self._post_dao.get_by_id(post_id, options=options)
+        except sqlalchemy.exc.DBAPIError as e:
+            logger.exception(e)
+            post_db = None
+        if post_db is None:
+            err = HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='BAD REQUEST: no post with provided id')
+            logger.exception(err)
+            raise err
+        return post_db
+
 
-post_service = PostService(post_dao, like_dao)
+post_service = PostService(post_dao, like_dao, likes_counter_service, blob_storage, timeline_dao, follow_service,
+                           cache_backend)
@@ -2,8 +2,9 @@ from http import HTTPStatus
 
 import asyncpg.exceptions
 from fastapi import HTTPException
-from typing import Union, NoReturn
+from typing import Union, NoReturn, Optional
 from datetime import datetime
+from uuid import UUID
 import sqlalchemy
 import sqlalchemy.exc
 from db.models.UserModel import UserModel
@@ -12,21 +13,41 @@ from db.dto import UserCreateDTO, UserCreateLineDTO, UserProfileDTO, \
     UserDeleteDTO, UserBlockDTO, UserChangeProfileDTO
 from db.dao import user_dao, UserDAO, profile_dao, ProfileDAO
 from db.enums import EmailStatusesEnum
-from utils.auth_utils import hash_password
-from .external_api_service import external_api_service
+from db.unit_of_work import unit_of_work, after_commit, release_connection
+from utils.password_hasher import password_hasher
+from utils.ids import parse_id
+from utils.principals_cache import principals_cache
+from utils.serializers import RowSerializer
+from settings import Settings
+from cache import cache_backend, CacheBackend, ReadThroughCache
+from .email_verification_service import email_verification_service
 from loguru import logger
 
 
 class UserService:
 
-    def __init__(self, user_dao: UserDAO, profile_dao: ProfileDAO):
+    def __init__(self, user_dao: UserDAO, profile_dao: ProfileDAO, cache_backend: CacheBackend):
         self._user_dao = user_dao
         self._profile_dao = profile_dao
-        self._external_api = external_api_service
+        self._email_verification = email_verification_service
+        self._settings = Settings()
+        self._profile_serializer = RowSerializer.for_dto(UserProfileDTO)
+        # payloads of UserProfileDTO shape
+        self._profiles_cache = ReadThroughCache("profiles", cache_backend, self._settings.PROFILES_CACHE_TTL,
+                                                self._settings.CACHE_NEGATIVE_TTL, self._settings.CACHE_TTL_JITTER)
+
+    @property
+    def profiles_cache(self) -> ReadThroughCache:
+        return self._profiles_cache
 
     async def create_user(self, item: UserCreateDTO) -> tuple:
         logger.info("UserService: Create user")
-        logger.trace(f"UserService: Create user with following passed data: {item}")
+        logger.trace("UserService: Create user with login: {}", item.login)
+        # checks, user and profile creation are committed together or not at all
+        async with unit_of_work():
+            return await self._create_user(item)
+
+    async def _create_user(self, item: UserCreateDTO) -> tuple:
         # check if user with provided login or email already exists
         login_ex = await self._user_dao.get_by(login=item.login)
         if login_ex is not None:
@@ -36,18 +57,15 @@ class UserService:
         if email_ex is not None and email_ex.is_active:
             raise HTTPException(status_code=HTTPStatus.BAD_REQUEST,
                                 detail="User with this email already exists.")
-        # check if provided email is a valid email address
-        email_status = await external_api_service.verify_email_hunter(item.email)
-        if email_status == EmailStatusesEnum.INVALID:
-            raise HTTPException(status_code=HTTPStatus.BAD_REQUEST,
-                                detail="Cannot register user with provided email: email is invalid.")
         # change entered birthday format to db format
         item.birth_date = datetime.strptime(item.birth_date, '%d-%m-%Y')
-        # hash password
-        item.password = hash_password(item.password)
+        # hash password, the checks are only reads, so the connection is not held while waiting for a hashing worker
+        await release_connection()
+        item.password = await password_hasher.hash(item.password)
         # create object for user creation
         obj = UserCreateLineDTO(**item.dict())
-        obj.email_status = email_status
+        # email is verified in background, the status can be polled with the user details
+        obj.email_status = EmailStatusesEnum.PENDING
         # create user
         try:
             user = await self._user_dao.create(obj)
@@ -72,11 +90,13 @@ class UserService:
                 err = HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail='INTERNAL SERVER ERROR')
             logger.exception(err)
             raise err
+        # the worker must see the committed user
+        after_commit(lambda: self._email_verification.enqueue(user.id, user.email))
         return user, user_profile
 
     async def get_user(self, user_id: str) -> UserModel:
         logger.info("UserService: Get user by user_id")
-        logger.trace(f"UserService: Get user by user_id {user_id}")
+        logger.trace("UserService: Get user by user_id {}", user_id)
         try:
             user = await self._user_dao.get_by_id(user_id)
         except sqlalchemy.exc.DBAPIError as e:
@@ -91,10 +111,10 @@ class UserService:
 
     async def block_user(self, user_id: str, item: UserBlockDTO) -> UserModel:
         logger.info("UserService: Block user")
-        logger.trace(f"UserService: Set blocked field to {item} for user with id {user_id}")
+        logger.trace("UserService: Set blocked field to {} for user with id {}", item, user_id)
         patch_data = UserBlockDTO(blocked=item.blocked)
         try:
-            return await self._user_dao.patch(patch_data, user_id)
+            user = await self._user_dao.patch(patch_data, user_id)
         except sqlalchemy.exc.DBAPIError as e:
             logger.exception(e)
             if "invalid input for query argument" in str(e.orig):
@@ -103,13 +123,19 @@ class UserService:
                 err = HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail='INTERNAL SERVER ERROR')
             logger.exception(err)
             raise err
+        if user is None:
+            err = HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='BAD REQUEST: no user with provided id')
+            logger.exception(err)
+            raise err
+        self.invalidate_principal(user)
+        return user
 
     async def delete_user(self, user_id: str) -> NoReturn:
         logger.info("UserService: Delete user")
-        logger.trace(f"UserService: Set is_active field to False for user with id {user_id}")
+        logger.trace("UserService: Set is_active field to False for user with id {}", user_id)
         patch_data = UserDeleteDTO(is_active=False, deleted_at=datetime.utcnow())
         try:
-            await self._user_dao.patch(patch_data, user_id)
+            user = await self._user_dao.patch(patch_data, user_id)
         except sqlalchemy.exc.DBAPIError as e:
             logger.exception(e)
             if "invalid input for query argument" in str(e.orig):
@@ -118,10 +144,25 @@ class UserService:
                 err = HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail='INTERNAL SERVER ERROR')
             logger.exception(err)
             raise err
+        if user is None:
+            err = HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='BAD REQUEST: no user with provided id')
+            logger.exception(err)
+            raise err
+        self.invalidate_principal(user)
 
-    async def get_user_profile(self, user_id: str) -> ProfileModel:
+    async def get_user_profile(self, user_id: str) -> Optional[dict]:
+        """Returns the profile payload of UserProfileDTO shape, or None if there is no such profile"""
         logger.info("UserService: Get user profile by user_id")
-        logger.trace(f"UserService: Get user profile by user_id {user_id}")
+        logger.trace("UserService: Get user profile by user_id {}", user_id)
+        user_id = parse_id(user_id, 'BAD REQUEST (incorrect data provided)')
+        # read through the cache, concurrent misses of the same profile share one database query
+        return await self._profiles_cache.get_or_load(user_id, lambda: self._load_user_profile(user_id))
+
+    async def _load_user_profile(self, user_id: UUID) -> Optional[dict]:
+        # loaded on the connection of the request's unit of work, see PostService._load_post
+        return self._profile_serializer(await self._load_user_profile_db(user_id))
+
+    async def _load_user_profile_db(self, user_id: str) -> ProfileModel:
         try:
             profile = await self._profile_dao.get_by_id(user_id)
         except sqlalchemy.exc.DBAPIError as e:
@@ -136,7 +177,8 @@ class UserService:
 
     async def update_user_profile(self, user_id, item: UserChangeProfileDTO) -> ProfileModel:
         logger.info("UserService: Update user profile")
-        logger.trace(f"UserService: Update profile of user with user_id {user_id} with data: {item}")
+        logger.trace("UserService: Update profile of user with user_id {}, fields: {}",
+                     user_id, sorted(item.dict(exclude_unset=True)))
         try:
             if item.birth_date is not None:
                 item.birth_date = datetime.strptime(item.birth_date, '%d-%m-%Y')
@@ -149,11 +191,16 @@ class UserService:
                 err = HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail='INTERNAL SERVER ERROR')
             logger.exception(err)
             raise err
+        if profile is None:
+            err = HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='BAD REQUEST: no user with provided id')
+            logger.exception(err)
+            raise err
+        await self._profiles_cache.invalidate(UUID(str(user_id)))
         return profile
 
     async def get_by_login(self, login: str) -> Union[UserModel, None]:
         logger.info("UserService: Get user by login")
-        logger.trace(f"UserService: Get user by login {login}")
+        logger.trace("UserService: Get user by login {}", login)
         try:
             user = await self._user_dao.get_by(login=login)
         except sqlalchemy.exc.DBAPIError as e:
@@ -163,5 +210,33 @@ class UserService:
             raise err
         return user
 
+    async def get_principal(self, login: str) -> Union[tuple, None]:
+        logger.info("UserService: Get principal by login")
+        logger.trace("UserService: Get principal by login {}", login)
+        try:
+            principal = await self._user_dao.get_principal(login)
+        except sqlalchemy.exc.DBAPIError as e:
+            logger.exception(e)
+            err = HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='BAD REQUEST')
+            logger.exception(err)
+            raise err
+        return principal
+
+    async def update_password_hash(self, user_id, hashed_password: str) -> NoReturn:
+        logger.info("UserService: Update password hash")
+        logger.trace("UserService: Update password hash of user with id {}", user_id)
+        await self._user_dao.patch({"password": hashed_password}, user_id)
+
+    def invalidate_principal(self, user: UserModel):
+        """Drops cached principal of the user, must be called on every change of
+        user's blocked, is_active or role fields, so the change takes effect immediately"""
+        if user is not None:
+            logger.info("UserService: Invalidate cached principal")
+            logger.trace("UserService: Invalidate cached principal of user with login {}", user.login)
+            login = user.login
+            principals_cache.invalidate(login)
+            # once more after commit, in case the principal was cached again before the change was committed
+            after_commit(lambda: principals_cache.invalidate(login))
+
 
-user_service = UserService(user_dao, profile_dao)
+user_service = UserService(user_dao, profile_dao, cache_backend)
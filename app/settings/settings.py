@@ -5,6 +5,8 @@ from datetime import timedelta
 
 class Settings(BaseSettings):
 
+    DEBUG: bool = Field(False, env="DEBUG")
+
     HOST: str = Field(..., env="HOST")
     PORT: str = Field(..., env="PORT")
 
@@ -12,6 +14,22 @@ class Settings(BaseSettings):
     DB_USER: str = Field(..., env="DB_USER")
     DB_PASSWORD: str = Field(..., env="DB_PASSWORD")
     DB_HOST: str = Field(..., env="DB_HOST")
+    DB_POOL_SIZE: int = Field(5, env="DB_POOL_SIZE")
+    DB_MAX_OVERFLOW: int = Field(10, env="DB_MAX_OVERFLOW")
+    DB_POOL_TIMEOUT: float = Field(30, env="DB_POOL_TIMEOUT")
+    DB_POOL_RECYCLE: int = Field(1800, env="DB_POOL_RECYCLE")
+    DB_POOL_PRE_PING: bool = Field(False, env="DB_POOL_PRE_PING")
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = Field(100, env="DB_PREPARED_STATEMENT_CACHE_SIZE")
+    DB_POOL_SATURATION_LOG_INTERVAL: float = Field(10, env="DB_POOL_SATURATION_LOG_INTERVAL")
+    DB_CONNECT_RETRIES: int = Field(10, env="DB_CONNECT_RETRIES")
+    DB_CONNECT_BACKOFF: float = Field(0.1, env="DB_CONNECT_BACKOFF")
+    DB_CONNECT_MAX_BACKOFF: float = Field(5, env="DB_CONNECT_MAX_BACKOFF")
+    DB_POOL_WARM_UP_SIZE: int = Field(5, env="DB_POOL_WARM_UP_SIZE")
+    HEALTH_DB_TIMEOUT: float = Field(1, env="HEALTH_DB_TIMEOUT")
+
+    QUERY_BUDGET_STATEMENTS: int = Field(20, env="QUERY_BUDGET_STATEMENTS")
+    QUERY_BUDGET_ROWS: int = Field(1000, env="QUERY_BUDGET_ROWS")
+    QUERY_BUDGET_REPEATS: int = Field(5, env="QUERY_BUDGET_REPEATS")
 
     ACCESS_TOKEN_EXPIRE_MINUTES: timedelta = Field(timedelta(minutes=5), env="ACCESS_TOKEN_EXPIRE_MINUTES")
     REFRESH_TOKEN_EXPIRE_MINUTES: timedelta = Field(timedelta(days=1), env="REFRESH_TOKEN_EXPIRE_MINUTES")
@@ -19,15 +37,66 @@ class Settings(BaseSettings):
     JWT_KEY: str = Field(..., env="JWT_KEY")
     JWT_REFRESH_KEY: str = Field(..., env="JWT_REFRESH_KEY")
 
+    PASSWORD_HASH_ROUNDS: int = Field(12, env="PASSWORD_HASH_ROUNDS")
+    PASSWORD_HASH_WORKERS: int = Field(4, env="PASSWORD_HASH_WORKERS")
+    PASSWORD_HASH_QUEUE_SIZE: int = Field(64, env="PASSWORD_HASH_QUEUE_SIZE")
+    PASSWORD_HASH_EXECUTOR: str = Field("thread", env="PASSWORD_HASH_EXECUTOR")
+
+    PRINCIPALS_CACHE_SIZE: int = Field(10000, env="PRINCIPALS_CACHE_SIZE")
+    PRINCIPALS_CACHE_TTL: float = Field(30, env="PRINCIPALS_CACHE_TTL")
+
+    HTTP_CLIENT_POOL_SIZE: int = Field(100, env="HTTP_CLIENT_POOL_SIZE")
+    HTTP_CLIENT_POOL_SIZE_PER_HOST: int = Field(10, env="HTTP_CLIENT_POOL_SIZE_PER_HOST")
+    HTTP_CLIENT_CONNECT_TIMEOUT: float = Field(5, env="HTTP_CLIENT_CONNECT_TIMEOUT")
+    HTTP_CLIENT_READ_TIMEOUT: float = Field(10, env="HTTP_CLIENT_READ_TIMEOUT")
+    HTTP_CLIENT_DNS_CACHE_TTL: int = Field(300, env="HTTP_CLIENT_DNS_CACHE_TTL")
+
     HUNTER_IO_API_KEY: str = Field(..., env="HUNTER_IO_API_KEY")
     HUNTER_IO_API_HOST: str = Field(..., env="HUNTER_IO_API_HOST")
     HUNTER_IO_API_VERIFIER: str = Field(..., env="HUNTER_IO_API_VERIFIER")
     HUNTER_IO_API_RETRY: int = Field(3, env="HUNTER_IO_API_RETRY")
     HUNTER_IO_API_SLEEP: int = Field(5, env="")
 
+    EMAIL_VERIFICATION_WORKERS: int = Field(2, env="EMAIL_VERIFICATION_WORKERS")
+    EMAIL_DOMAIN_CACHE_SIZE: int = Field(10000, env="EMAIL_DOMAIN_CACHE_SIZE")
+    EMAIL_DOMAIN_CACHE_TTL: float = Field(86400, env="EMAIL_DOMAIN_CACHE_TTL")
+
+    LIKES_AGGREGATION_ENABLED: bool = Field(False, env="LIKES_AGGREGATION_ENABLED")
+    LIKES_FLUSH_INTERVAL: float = Field(1.0, env="LIKES_FLUSH_INTERVAL")
+    LIKES_FLUSH_THRESHOLD: int = Field(1000, env="LIKES_FLUSH_THRESHOLD")
+
+    FEED_FANOUT_MAX_FOLLOWERS: int = Field(10000, env="FEED_FANOUT_MAX_FOLLOWERS")
+    FEED_BACKFILL_SIZE: int = Field(50, env="FEED_BACKFILL_SIZE")
+
+    CACHE_BACKEND: str = Field("memory", env="CACHE_BACKEND")
+    CACHE_MEMORY_SIZE: int = Field(100000, env="CACHE_MEMORY_SIZE")
+    CACHE_REDIS_URL: str = Field("redis://localhost:6379/0", env="CACHE_REDIS_URL")
+    CACHE_REDIS_POOL_SIZE: int = Field(20, env="CACHE_REDIS_POOL_SIZE")
+    CACHE_REDIS_TIMEOUT: float = Field(0.5, env="CACHE_REDIS_TIMEOUT")
+    CACHE_NEGATIVE_TTL: float = Field(5, env="CACHE_NEGATIVE_TTL")
+    CACHE_TTL_JITTER: float = Field(0.1, env="CACHE_TTL_JITTER")
+    POSTS_CACHE_TTL: float = Field(60, env="POSTS_CACHE_TTL")
+    PROFILES_CACHE_TTL: float = Field(300, env="PROFILES_CACHE_TTL")
+
+    BLOB_STORAGE_BACKEND: str = Field("local", env="BLOB_STORAGE_BACKEND")
+    BLOB_STORAGE_PATH: str = Field("blobs", env="BLOB_STORAGE_PATH")
+    S3_ENDPOINT_URL: str = Field(None, env="S3_ENDPOINT_URL")
+    S3_REGION: str = Field(None, env="S3_REGION")
+    S3_BUCKET: str = Field(None, env="S3_BUCKET")
+    S3_ACCESS_KEY: str = Field(None, env="S3_ACCESS_KEY")
+    S3_SECRET_KEY: str = Field(None, env="S3_SECRET_KEY")
+    IMAGE_CACHE_MAX_AGE: int = Field(86400, env="IMAGE_CACHE_MAX_AGE")
+
     LOG_FILEPATH: str = Field("logs/app_log.log", env="LOG_FILEPATH")
     LOG_ROTATION: int = Field(1, env="LOG_ROTATION")
     LOG_RETENTION: int = Field(30, env="LOG_RETENTION")
+    LOG_LEVEL: str = Field("INFO", env="LOG_LEVEL")
+    LOG_FILE_LEVEL: str = Field("INFO", env="LOG_FILE_LEVEL")
+    LOG_MODULE_LEVELS: str = Field("", env="LOG_MODULE_LEVELS")
+    LOG_SAMPLED_MODULES: str = Field("db.dao,services,mixins", env="LOG_SAMPLED_MODULES")
+    LOG_INFO_SAMPLE_RATE: float = Field(1.0, env="LOG_INFO_SAMPLE_RATE")
+    LOG_JSON: bool = Field(False, env="LOG_JSON")
+    LOG_ENQUEUE: bool = Field(True, env="LOG_ENQUEUE")
 
     class Config:
         env_file = Path(__file__).parents[1].joinpath(".env")
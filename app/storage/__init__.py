@@ -0,0 +1,4 @@
+from .base_storage import BlobStorage
+from .local_storage import LocalBlobStorage
+from .s3_storage import S3BlobStorage
+from .blob_storage import blob_storage, make_blob_storage
@@ -0,0 +1,35 @@
+from abc import ABC, abstractmethod
+from io import BytesIO
+from typing import AsyncIterator, BinaryIO, Optional
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+class BlobStorage(ABC):
+    """Content-addressed blob storage: blobs are stored under the sha256 hex digest of their content,
+    so identical uploads are stored once and a blob key never changes its content"""
+
+    @abstractmethod
+    async def save(self, stream: BinaryIO) -> str:
+        """Reads the stream by chunks and stores its content; returns the blob key"""
+
+    async def save_bytes(self, data: bytes) -> str:
+        return await self.save(BytesIO(data))
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def size(self, key: str) -> int:
+        """Returns blob size in bytes; raises FileNotFoundError if there is no such blob"""
+
+    @abstractmethod
+    def stream(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Yields blob content by chunks from 'start' to 'end' byte inclusive"""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Returns a filesystem path of the blob if the backend keeps blobs locally,
+        so the file can be sent with sendfile; returns None otherwise"""
+        return None
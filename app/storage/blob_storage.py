@@ -0,0 +1,20 @@
+from settings import Settings
+from .base_storage import BlobStorage
+from .local_storage import LocalBlobStorage
+from .s3_storage import S3BlobStorage
+
+
+settings = Settings()
+
+
+def make_blob_storage(settings: Settings) -> BlobStorage:
+    if settings.BLOB_STORAGE_BACKEND == 's3':
+        return S3BlobStorage(bucket=settings.S3_BUCKET,
+                             endpoint_url=settings.S3_ENDPOINT_URL,
+                             region=settings.S3_REGION,
+                             access_key=settings.S3_ACCESS_KEY,
+                             secret_key=settings.S3_SECRET_KEY)
+    return LocalBlobStorage(settings.BLOB_STORAGE_PATH)
+
+
+blob_storage = make_blob_storage(settings)
@@ -0,0 +1,70 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from typing import AsyncIterator, BinaryIO, Optional
+from loguru import logger
+from .base_storage import BlobStorage, CHUNK_SIZE
+
+
+class LocalBlobStorage(BlobStorage):
+    """Keeps blobs on the local filesystem as <root>/<key[:2]>/<key[2:4]>/<key>"""
+
+    def __init__(self, root: str):
+        self._root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._root, key[:2], key[2:4], key)
+
+    async def save(self, stream: BinaryIO) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._save, stream)
+
+    def _save(self, stream: BinaryIO) -> str:
+        os.makedirs(self._root, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self._root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            key = digest.hexdigest()
+            path = self._path(key)
+            if os.path.exists(path):
+                logger.debug("LocalBlobStorage: blob {} already exists", key)
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+                logger.debug("LocalBlobStorage: blob {} is saved", key)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return key
+
+    async def exists(self, key: str) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, os.path.exists, self._path(key))
+
+    async def size(self, key: str) -> int:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, os.path.getsize, self._path(key))
+
+    async def stream(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        with open(self._path(key), 'rb') as file:
+            await loop.run_in_executor(None, file.seek, start)
+            left = None if end is None else end - start + 1
+            while left is None or left > 0:
+                size = CHUNK_SIZE if left is None else min(CHUNK_SIZE, left)
+                chunk = await loop.run_in_executor(None, file.read, size)
+                if not chunk:
+                    break
+                if left is not None:
+                    left -= len(chunk)
+                yield chunk
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
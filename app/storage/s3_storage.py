@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+import tempfile
+from typing import AsyncIterator, BinaryIO, Optional
+from loguru import logger
+from .base_storage import BlobStorage, CHUNK_SIZE
+
+try:
+    from aiobotocore.session import get_session
+    from botocore.exceptions import ClientError
+except ImportError:
+    get_session = None
+    ClientError = None
+
+
+class S3BlobStorage(BlobStorage):
+    """Keeps blobs in a bucket of an S3-compatible object storage;
+    requires aiobotocore package to be installed"""
+
+    def __init__(self, bucket: str, endpoint_url: str = None, region: str = None,
+                 access_key: str = None, secret_key: str = None):
+        if get_session is None:
+            raise RuntimeError("S3BlobStorage requires aiobotocore package to be installed")
+        self._bucket = bucket
+        self._session = get_session()
+        self._client_params = {"endpoint_url": endpoint_url,
+                               "region_name": region,
+                               "aws_access_key_id": access_key,
+                               "aws_secret_access_key": secret_key}
+
+    def _client(self):
+        return self._session.create_client('s3', **self._client_params)
+
+    async def save(self, stream: BinaryIO) -> str:
+        loop = asyncio.get_running_loop()
+        # the key is known only when the whole content is read,
+        # so the content is spooled to a local temporary file first
+        with tempfile.TemporaryFile() as tmp:
+            key = await loop.run_in_executor(None, self._spool, stream, tmp)
+            if await self.exists(key):
+                logger.debug("S3BlobStorage: blob {} already exists", key)
+                return key
+            await loop.run_in_executor(None, tmp.seek, 0)
+            async with self._client() as client:
+                await client.put_object(Bucket=self._bucket, Key=key, Body=tmp)
+            logger.debug("S3BlobStorage: blob {} is saved", key)
+        return key
+
+    @staticmethod
+    def _spool(stream: BinaryIO, tmp: BinaryIO) -> str:
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            tmp.write(chunk)
+        return digest.hexdigest()
+
+    async def exists(self, key: str) -> bool:
+        async with self._client() as client:
+            try:
+                await client.head_object(Bucket=self._bucket, Key=key)
+            except ClientError as e:
+                if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                    return False
+                raise
+        return True
+
+    async def size(self, key: str) -> int:
+        async with self._client() as client:
+            try:
+                resp = await client.head_object(Bucket=self._bucket, Key=key)
+            except ClientError as e:
+                if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                    raise FileNotFoundError(key) from e
+                raise
+        return resp["ContentLength"]
+
+    async def stream(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        async with self._client() as client:
+            resp = await client.get_object(Bucket=self._bucket, Key=key, Range=byte_range)
+            async with resp["Body"] as body:
+                while True:
+                    chunk = await body.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
@@ -0,0 +1,110 @@
+"""Fixtures of the API tests: the app is called in process through httpx against the database
+named by TEST_DB_NAME (social_network_test by default), which tables are recreated for every test session;
+the other settings are read from the environment or the .env file as by the app; usage (from the app directory):
+    TEST_DB_NAME=social_network_test python -m pytest"""
+import os
+import tempfile
+
+# settings are read when the app modules are imported, so the tests never touch the database of DB_NAME
+os.environ["DB_NAME"] = os.environ.get("TEST_DB_NAME", "social_network_test")
+# hashing with the production cost would make every registration and login of the tests slow
+os.environ.setdefault("PASSWORD_HASH_ROUNDS", "4")
+os.environ.setdefault("BLOB_STORAGE_PATH", tempfile.mkdtemp(prefix="blobs_"))
+
+import sys
+from contextlib import contextmanager
+from http import HTTPStatus
+from types import SimpleNamespace
+from typing import Callable, Iterator
+from uuid import uuid4
+import httpx
+import pytest
+from loguru import logger
+from sqlalchemy.exc import SQLAlchemyError
+from db.database import engine, ping_db
+from db.models import BaseModel
+from db.query_stats import QueryStats, query_stats
+from main import app
+from routers.api_spec import ApiSpec
+from services.external_api_service import external_api_service
+
+
+logger.remove()
+logger.add(sys.stderr, level="WARNING")
+
+
+@pytest.fixture(scope="session", autouse=True)
+async def database():
+    try:
+        await ping_db()
+    except (OSError, SQLAlchemyError) as e:
+        pytest.skip(f"test database {os.environ['DB_NAME']} is unreachable: {e}")
+    async with engine.begin() as connection:
+        await connection.run_sync(BaseModel.metadata.drop_all)
+        await connection.run_sync(BaseModel.metadata.create_all)
+    yield
+    await engine.dispose()
+
+
+@pytest.fixture(scope="session")
+async def client() -> httpx.AsyncClient:
+    # startup and shutdown handlers are not run: background workers are started by the tests which need them
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def make_user(client: httpx.AsyncClient) -> Callable:
+    """Registers and logs in a new user; returns its id, login and authorization headers;
+    the user's principal is cached by a first authenticated request, so query counts of the tests exclude it"""
+
+    async def make(role: str = "user") -> SimpleNamespace:
+        login = f"test_{uuid4().hex[:12]}"
+        password = "password"
+        resp = await client.post(ApiSpec.REGISTRATION,
+                                 json={"login": login, "email": f"{login}@example.com", "password": password,
+                                       "role": role, "first_name": "Test", "last_name": "User",
+                                       "birth_date": "01-01-1990"})
+        assert resp.status_code == HTTPStatus.CREATED, resp.text
+        user_id = resp.json()["id"]
+        resp = await client.post(ApiSpec.AUTH, data={"username": login, "password": password})
+        assert resp.status_code == HTTPStatus.OK, resp.text
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        resp = await client.get(ApiSpec.USERS_DETAILS.format(user_id=user_id), headers=headers)
+        assert resp.status_code == HTTPStatus.OK, resp.text
+        return SimpleNamespace(id=user_id, login=login, headers=headers)
+    return make
+
+
+@pytest.fixture
+async def user(make_user: Callable) -> SimpleNamespace:
+    return await make_user()
+
+
+@pytest.fixture
+def hunter(monkeypatch) -> SimpleNamespace:
+    """Stubs requests to hunter.io: every email is verified with 'status' unless a test changes it;
+    verified emails are recorded in 'emails'"""
+    stub = SimpleNamespace(status="valid", emails=[])
+
+    async def make_hunt_io_request(method: str, url: str, query_params: dict):
+        stub.emails.append(query_params["email"])
+        return {"data": {"status": stub.status}}
+    monkeypatch.setattr(external_api_service, "make_hunt_io_request", make_hunt_io_request)
+    return stub
+
+
+@pytest.fixture
+def assert_queries() -> Callable:
+    """Fails the test if the block executes other number of SQL statements than expected, e.g.
+        with assert_queries(2):
+            await client.get(ApiSpec.POSTS, headers=user.headers)"""
+
+    @contextmanager
+    def check(expected: int) -> Iterator[QueryStats]:
+        with query_stats() as stats:
+            yield stats
+        executed = "\n".join(f"{count} x {statement}" for statement, count in stats.executions.items())
+        assert stats.statements == expected, \
+            f"{stats.statements} statements are executed instead of {expected}:\n{executed}"
+    return check
@@ -0,0 +1,47 @@
+from uuid import UUID, uuid4
+from db.dao import post_dao
+from db.models.PostModel import PostModel
+from db.unit_of_work import unit_of_work
+
+
+async def _create_posts(user, count: int) -> list:
+    return await post_dao.create_many([{"user_id": UUID(user.id), "text": f"post {i}"} for i in range(count)],
+                                      columns=(PostModel.id, PostModel.text), chunk_size=2)
+
+
+async def test_create_many_and_get_many_by_ids(user, assert_queries):
+    posts = await _create_posts(user, 5)
+    # entries are returned in the input order, filled with the requested columns only
+    assert [post.text for post in posts] == [f"post {i}" for i in range(5)]
+    assert all(post.likes is None for post in posts)
+
+    missing = uuid4()
+    ids = [posts[3].id, missing, posts[0].id, posts[4].id]
+    with assert_queries(2):
+        found = await post_dao.get_many_by_ids(ids, chunk_size=2)
+    assert [post.id if post is not None else None for post in found] == [posts[3].id, None, posts[0].id, posts[4].id]
+
+
+async def test_patch_many(user, assert_queries):
+    posts = await _create_posts(user, 4)
+    patch_data = {posts[0].id: {"text": "first"},
+                  posts[1].id: {"text": "second", "likes": 2},
+                  posts[2].id: {"text": "third"},
+                  posts[3].id: {}}
+    # one statement per set of fields, executed in batches of 'chunk_size' entries
+    with assert_queries(3):
+        await post_dao.patch_many(patch_data, chunk_size=1)
+    found = await post_dao.get_many_by_ids([post.id for post in posts])
+    assert [(post.text, post.likes) for post in found] == [("first", 0), ("second", 2), ("third", 0), ("post 3", 0)]
+
+    # in a unit of work the updates run on its connection and are committed with it
+    async with unit_of_work():
+        await post_dao.patch_many({posts[3].id: {"likes": 5}})
+    assert (await post_dao.get_by_id(posts[3].id)).likes == 5
+
+
+async def test_delete_many(user):
+    posts = await _create_posts(user, 3)
+    assert await post_dao.delete_many([posts[0].id, posts[2].id, uuid4()], chunk_size=2) == 2
+    found = await post_dao.get_many_by_ids([post.id for post in posts])
+    assert [post is not None for post in found] == [False, True, False]
@@ -0,0 +1,76 @@
+from http import HTTPStatus
+from uuid import uuid4
+from sqlalchemy import func, literal, select, BigInteger
+from db.dao import user_dao
+from db.database import engine
+from db.enums import EmailStatusesEnum, UserRolesSignupEnum
+from db.models.UserModel import UserModel
+from routers.api_spec import ApiSpec
+from services.email_verification_service import email_verification_service
+
+
+async def _register(client, domain: str) -> str:
+    login = f"test_{uuid4().hex[:12]}"
+    resp = await client.post(ApiSpec.REGISTRATION,
+                             json={"login": login, "email": f"{login}@{domain}", "password": "password",
+                                   "role": "user", "first_name": "Test", "last_name": "User",
+                                   "birth_date": "01-01-1990"})
+    assert resp.status_code == HTTPStatus.CREATED
+    assert resp.json()["email_status"] == EmailStatusesEnum.PENDING
+    return resp.json()["id"]
+
+
+async def _email_status(user_id) -> str:
+    async with engine.connect() as connection:
+        return (await connection.execute(select(UserModel.email_status).where(UserModel.id == user_id))).scalar()
+
+
+async def _verify_queued():
+    email_verification_service.start()
+    try:
+        await email_verification_service._get_queue().join()
+    finally:
+        await email_verification_service.stop()
+
+
+async def test_registration_does_not_wait_for_verification(client, hunter):
+    user_id = await _register(client, f"{uuid4().hex[:8]}.example.com")
+    assert await _email_status(user_id) == EmailStatusesEnum.PENDING
+    await _verify_queued()
+    assert await _email_status(user_id) == EmailStatusesEnum.VALID
+
+
+async def test_domain_verdicts_are_cached(client, hunter):
+    domain = f"{uuid4().hex[:8]}.example.com"
+    hunter.status = EmailStatusesEnum.WEBMAIL.value
+    user_ids = []
+    for _ in range(3):
+        user_ids.append(await _register(client, domain))
+        await _verify_queued()
+    assert [await _email_status(user_id) for user_id in user_ids] == [EmailStatusesEnum.WEBMAIL] * 3
+    assert len([email for email in hunter.emails if email.endswith(domain)]) == 1
+
+
+async def test_pending_verifications_are_requeued_by_one_worker(monkeypatch):
+    logins = [f"pending_{uuid4().hex[:12]}" for _ in range(5)]
+    users = await user_dao.create_many([{"login": login, "email": f"{login}@example.com", "password": "-",
+                                         "role": UserRolesSignupEnum.USER,
+                                         "email_status": EmailStatusesEnum.PENDING.value}
+                                        for login in logins], columns=(UserModel.id,))
+    enqueued = []
+    monkeypatch.setattr(email_verification_service, "enqueue", lambda user_id, email: enqueued.append(user_id))
+    async with engine.connect() as connection:
+        pending = (await connection.execute(select(func.count()).
+                                            where(UserModel.email_status == EmailStatusesEnum.PENDING))).scalar()
+    # pages by id, smaller than the number of pending users
+    await email_verification_service.requeue_pending(batch_size=2)
+    assert len(enqueued) == len(set(enqueued)) == pending
+    assert {user.id for user in users} <= set(enqueued)
+
+    # another worker holds the lock while it requeues them
+    async with engine.begin() as connection:
+        await connection.execute(select(func.pg_advisory_xact_lock(literal(email_verification_service.REQUEUE_LOCK_KEY,
+                                                                           BigInteger))))
+        enqueued.clear()
+        await email_verification_service.requeue_pending()
+        assert enqueued == []
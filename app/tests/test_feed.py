@@ -0,0 +1,58 @@
+import asyncio
+from http import HTTPStatus
+from routers.api_spec import ApiSpec
+from services.follow_service import follow_service
+
+
+async def _post(client, author, text: str) -> str:
+    post = (await client.post(ApiSpec.POSTS, data={"text": text}, headers=author.headers)).json()
+    # fan-out runs in background once the post is committed
+    await asyncio.gather(*follow_service._fan_outs)
+    return post["id"]
+
+
+async def _feed(client, reader, limit: int = 20) -> list:
+    ids, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get(ApiSpec.FEED, params=params, headers=reader.headers)).json()
+        ids.extend(post["id"] for post in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+async def test_feed_keeps_posts_when_author_crosses_threshold(client, make_user, monkeypatch, assert_queries):
+    monkeypatch.setattr(follow_service._settings, "FEED_FANOUT_MAX_FOLLOWERS", 1)
+    author, reader, other = await make_user(), await make_user(), await make_user()
+    for follower in (reader, other):
+        resp = await client.post(ApiSpec.USERS_FOLLOWERS.format(user_id=author.id), headers=follower.headers)
+        assert resp.status_code == HTTPStatus.OK
+    # above the threshold: pulled by the feeds
+    pulled = await _post(client, author, "pulled")
+    assert await _feed(client, reader) == [pulled]
+    with assert_queries(3):
+        await client.get(ApiSpec.FEED, headers=reader.headers)
+
+    await client.delete(ApiSpec.USERS_FOLLOWERS.format(user_id=author.id), headers=other.headers)
+    # below the threshold again: fanned out, posts pulled before are still in the feed
+    pushed = await _post(client, author, "pushed")
+    assert await _feed(client, reader) == [pushed, pulled]
+    assert await _feed(client, reader, limit=1) == [pushed, pulled]
+    assert await _feed(client, author) == [pushed, pulled]
+
+    # a new follower gets the fanned out posts by backfill and pulls the rest
+    await client.post(ApiSpec.USERS_FOLLOWERS.format(user_id=author.id), headers=other.headers)
+    assert await _feed(client, other) == [pushed, pulled]
+
+
+async def test_feed_without_pulled_authors_skips_pull_query(client, make_user, assert_queries):
+    author, reader = await make_user(), await make_user()
+    await client.post(ApiSpec.USERS_FOLLOWERS.format(user_id=author.id), headers=reader.headers)
+    post = await _post(client, author, "text")
+    with assert_queries(2):
+        resp = await client.get(ApiSpec.FEED, headers=reader.headers)
+    assert [item["id"] for item in resp.json()["items"]] == [post]
+
+    await client.delete(ApiSpec.USERS_FOLLOWERS.format(user_id=author.id), headers=reader.headers)
+    assert await _feed(client, reader) == []
@@ -0,0 +1,71 @@
+import asyncio
+import socket
+from types import SimpleNamespace
+import pytest
+from aiohttp import test_utils, web
+from clients.http_client import HTTPClient, HTTPClientConnectionError, HTTPClientTimeoutError
+
+
+@pytest.fixture
+async def stub_server() -> SimpleNamespace:
+    """Local stand-in of an external API; records the client port of every request"""
+    peers = []
+
+    async def verify(request: web.Request) -> web.Response:
+        peers.append(request.transport.get_extra_info("peername")[1])
+        payload = await request.json() if request.can_read_body else None
+        return web.json_response({"data": {"status": "valid", "email": request.query.get("email"),
+                                           "payload": payload}})
+
+    async def slow(request: web.Request) -> web.Response:
+        await asyncio.sleep(1)
+        return web.json_response({})
+
+    async def text(request: web.Request) -> web.Response:
+        return web.Response(text="not json")
+
+    app = web.Application()
+    app.router.add_route("*", "/verify", verify)
+    app.router.add_get("/slow", slow)
+    app.router.add_get("/text", text)
+    server = test_utils.TestServer(app)
+    await server.start_server()
+    yield SimpleNamespace(url=lambda path: str(server.make_url(path)), peers=peers)
+    await server.close()
+
+
+@pytest.fixture
+async def http_client() -> HTTPClient:
+    client = HTTPClient(pool_size=10, pool_size_per_host=5, connect_timeout=1, read_timeout=0.2, dns_cache_ttl=10)
+    await client.start()
+    yield client
+    await client.close()
+
+
+async def test_requests_reuse_connection(stub_server, http_client):
+    for i in range(5):
+        status, body = await http_client.request("GET", stub_server.url(f"/verify?email=user{i}@example.com"))
+        assert status == 200
+        assert body["data"]["email"] == f"user{i}@example.com"
+    # keep-alive: all requests are sent over one connection
+    assert len(set(stub_server.peers)) == 1
+
+    status, body = await http_client.request("POST", stub_server.url("/verify"), payload={"key": "value"})
+    assert (status, body["data"]["payload"]) == (200, {"key": "value"})
+
+
+async def test_timeout_is_mapped(stub_server, http_client):
+    with pytest.raises(HTTPClientTimeoutError):
+        await http_client.request("GET", stub_server.url("/slow"))
+
+
+async def test_errors_are_mapped(stub_server, http_client):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    # nothing listens on the port any more
+    with pytest.raises(HTTPClientConnectionError):
+        await http_client.request("GET", f"http://127.0.0.1:{port}/verify")
+    # a response which is not JSON is a failed request too
+    with pytest.raises(HTTPClientConnectionError):
+        await http_client.request("GET", stub_server.url("/text"))
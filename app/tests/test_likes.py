@@ -0,0 +1,86 @@
+import asyncio
+from http import HTTPStatus
+from uuid import uuid4
+from sqlalchemy import func, select, text
+from cli.migrate import migrate
+from db.dao import user_dao
+from db.database import engine
+from db.enums import EmailStatusesEnum, UserRolesSignupEnum
+from db.models.LikeModel import LikeModel
+from db.models.PostModel import PostModel
+from db.models.UserModel import UserModel
+from routers.api_spec import ApiSpec
+from utils.auth_utils import create_access_token
+
+
+async def _likers(count: int) -> list:
+    logins = [f"liker_{uuid4().hex[:12]}" for _ in range(count)]
+    await user_dao.create_many([{"login": login, "email": f"{login}@example.com", "password": "-",
+                                 "role": UserRolesSignupEnum.USER, "email_status": EmailStatusesEnum.VALID.value}
+                                for login in logins], columns=(UserModel.id,))
+    return [{"Authorization": f"Bearer {await create_access_token(login)}"} for login in logins]
+
+
+async def _counts(post_id) -> tuple:
+    async with engine.connect() as connection:
+        likes = (await connection.execute(select(PostModel.likes).where(PostModel.id == post_id))).scalar_one()
+        rows = (await connection.execute(select(func.count()).where(LikeModel.post_id == post_id))).scalar_one()
+    return likes, rows
+
+
+async def test_concurrent_likes(client, user):
+    post = (await client.post(ApiSpec.POSTS, data={"text": "popular"}, headers=user.headers)).json()
+    url = ApiSpec.POSTS_LIKES.format(post_id=post["id"])
+    likers = await _likers(200)
+    # every user likes the post twice at once: no increment is lost and no duplicate is added
+    responses = await asyncio.gather(*(client.post(url, headers=headers) for headers in likers for _ in range(2)))
+    statuses = [resp.status_code for resp in responses]
+    assert statuses.count(HTTPStatus.OK) == len(likers)
+    assert statuses.count(HTTPStatus.BAD_REQUEST) == len(likers)
+    assert await _counts(post["id"]) == (len(likers), len(likers))
+
+    responses = await asyncio.gather(*(client.delete(url, headers=headers) for headers in likers[:100]))
+    assert all(resp.status_code == HTTPStatus.OK for resp in responses)
+    assert await _counts(post["id"]) == (len(likers) - 100, len(likers) - 100)
+
+
+async def test_own_post_cannot_be_liked(client, user):
+    post = (await client.post(ApiSpec.POSTS, data={"text": "own"}, headers=user.headers)).json()
+    resp = await client.post(ApiSpec.POSTS_LIKES.format(post_id=post["id"]), headers=user.headers)
+    assert resp.status_code == HTTPStatus.FORBIDDEN
+    assert await _counts(post["id"]) == (0, 0)
+
+
+async def test_migration_removes_duplicate_likes(client, user, make_user):
+    post = (await client.post(ApiSpec.POSTS, data={"text": "duplicated"}, headers=user.headers)).json()
+    likers = [await make_user() for _ in range(2)]
+    for liker in likers:
+        await client.post(ApiSpec.POSTS_LIKES.format(post_id=post["id"]), headers=liker.headers)
+    async with engine.begin() as connection:
+        await connection.execute(text("ALTER TABLE tbl_likes DROP CONSTRAINT uq_likes_user_id_post_id"))
+        # duplicates of a database created before the constraint, counted by the lost counter updates
+        for _ in range(3):
+            await connection.execute(text("INSERT INTO tbl_likes (id, user_id, post_id, created_at) "
+                                          "VALUES (:id, :user_id, :post_id, now())"),
+                                     {"id": uuid4(), "user_id": likers[0].id, "post_id": post["id"]})
+        await connection.execute(text("UPDATE tbl_posts SET likes = 4 WHERE id = :id"), {"id": post["id"]})
+
+    await migrate()
+    await migrate()
+
+    assert await _counts(post["id"]) == (2, 2)
+    resp = await client.post(ApiSpec.POSTS_LIKES.format(post_id=post["id"]), headers=likers[0].headers)
+    assert resp.status_code == HTTPStatus.BAD_REQUEST
+
+
+async def test_like_responses_list_likers(client, user, make_user):
+    post = (await client.post(ApiSpec.POSTS, data={"text": "liked"}, headers=user.headers)).json()
+    url = ApiSpec.POSTS_LIKES.format(post_id=post["id"])
+    first, second = await make_user(), await make_user()
+    resp = await client.post(url, headers=first.headers)
+    assert resp.json()["liked_by"] == [first.id]
+    resp = await client.post(url, headers=second.headers)
+    assert resp.json()["likes"] == 2
+    assert sorted(resp.json()["liked_by"]) == sorted([first.id, second.id])
+    resp = await client.delete(url, headers=first.headers)
+    assert resp.json() == {"id": post["id"], "likes": 1, "liked_by": [second.id]}
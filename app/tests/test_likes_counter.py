@@ -0,0 +1,69 @@
+import asyncio
+from typing import Dict
+from uuid import uuid4
+from services.likes_counter_service import LikesCounterService
+
+
+class SlowPostDAO:
+    """Stores likes counters in memory; every write waits until 'write' is set, fails if 'error' is given"""
+
+    def __init__(self):
+        self.likes: Dict = {}
+        self.writing = asyncio.Event()
+        self.write = asyncio.Event()
+        self.error = None
+
+    async def update_likes_many(self, deltas: Dict) -> int:
+        self.writing.set()
+        await self.write.wait()
+        if self.error is not None:
+            raise self.error
+        for post_id, delta in deltas.items():
+            self.likes[post_id] = self.likes.get(post_id, 0) + delta
+        return len(deltas)
+
+
+async def test_likes_are_counted_once_during_slow_flush():
+    dao = SlowPostDAO()
+    service = LikesCounterService(dao)
+    notified, release = asyncio.Event(), asyncio.Event()
+
+    async def listener(post_ids):
+        notified.set()
+        await release.wait()
+    service.on_flush(listener)
+    post_id = uuid4()
+
+    def read() -> int:
+        return dao.likes.get(post_id, 0) + service.pending(post_id)
+
+    service.add(post_id, 3)
+    flush = asyncio.create_task(service.flush())
+    await dao.writing.wait()
+    # not committed yet: the delta is read from memory
+    counts = [read()]
+    dao.write.set()
+    await notified.wait()
+    # committed, listeners are still running: the delta is read from the database only
+    counts.append(read())
+    service.add(post_id, 1)
+    counts.append(read())
+    release.set()
+    await flush
+    counts.append(read())
+    assert counts == [3, 3, 4, 4]
+
+
+async def test_failed_flush_keeps_deltas():
+    dao = SlowPostDAO()
+    service = LikesCounterService(dao)
+    post_id = uuid4()
+    service.add(post_id, 2)
+    dao.error = ConnectionResetError("connection is lost")
+    dao.write.set()
+    await service.flush()
+    assert service.pending(post_id) == 2 and dao.likes == {}
+
+    dao.error = None
+    await service.flush()
+    assert service.pending(post_id) == 0 and dao.likes == {post_id: 2}
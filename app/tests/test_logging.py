@@ -0,0 +1,23 @@
+from http import HTTPStatus
+from uuid import uuid4
+from loguru import logger
+from routers.api_spec import ApiSpec
+
+
+async def test_trace_logs_never_contain_passwords(client):
+    records = []
+    sink_id = logger.add(records.append, level="TRACE", format="{message}")
+    login, password = f"test_{uuid4().hex[:12]}", f"secret_{uuid4().hex}"
+    try:
+        resp = await client.post(ApiSpec.REGISTRATION,
+                                 json={"login": login, "email": f"{login}@example.com", "password": password,
+                                       "role": "user", "first_name": "Test", "last_name": "User",
+                                       "birth_date": "01-01-1990"})
+        assert resp.status_code == HTTPStatus.CREATED
+        resp = await client.post(ApiSpec.AUTH, data={"username": login, "password": password})
+        assert resp.status_code == HTTPStatus.OK
+    finally:
+        logger.remove(sink_id)
+    # creation is traced by fields, without values
+    assert any("Fields passed for creation" in record and "'password'" in record for record in records)
+    assert not [record for record in records if password in record or "$2b$" in record]
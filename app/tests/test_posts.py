@@ -0,0 +1,74 @@
+import hashlib
+import os
+import re
+from http import HTTPStatus
+from uuid import uuid4
+from db.query_stats import query_stats
+from routers.api_spec import ApiSpec
+from storage import blob_storage
+
+IMAGE = b"\xff\xd8\xff\xe0" + b"image" * 1000
+# matches the image column itself, not image_key
+IMAGE_COLUMN = re.compile(r"\bimage\b")
+
+
+async def test_metadata_paths_never_select_image(client, user, make_user):
+    resp = await client.post(ApiSpec.POSTS, data={"text": "text"}, files={"image": ("image.jpg", IMAGE)},
+                             headers=user.headers)
+    assert resp.status_code == HTTPStatus.OK
+    post = resp.json()
+    assert post["image"].endswith(ApiSpec.POSTS_IMAGES.value.format(post_id=post["id"]))
+    details = ApiSpec.POSTS_DETAILS.format(post_id=post["id"])
+    likes = ApiSpec.POSTS_LIKES.format(post_id=post["id"])
+    liker = await make_user()
+    calls = [
+        client.get(ApiSpec.POSTS, headers=user.headers),
+        client.get(ApiSpec.POSTS, params={"paging": "cursor"}, headers=user.headers),
+        client.get(ApiSpec.POSTS_USERS.format(user_id=user.id), headers=user.headers),
+        client.get(ApiSpec.POSTS_USERS.format(user_id=user.id), params={"paging": "cursor"}, headers=user.headers),
+        client.get(ApiSpec.FEED, headers=user.headers),
+        client.get(details, headers=user.headers),
+        client.patch(details, data={"text": "changed"}, headers=user.headers),
+        client.post(likes, headers=liker.headers),
+        client.delete(likes, headers=liker.headers),
+    ]
+    for call in calls:
+        with query_stats() as stats:
+            resp = await call
+        assert resp.status_code == HTTPStatus.OK, resp.text
+        for statement in stats.executions:
+            assert not IMAGE_COLUMN.search(statement), f"{resp.request.method} {resp.request.url}: {statement}"
+    resp = await client.get(ApiSpec.POSTS_IMAGES.format(post_id=post["id"]), headers=user.headers)
+    assert resp.status_code == HTTPStatus.OK
+    assert resp.content == IMAGE
+
+
+async def test_missing_image_blob_is_not_found(client, user):
+    image = IMAGE + uuid4().bytes
+    post = (await client.post(ApiSpec.POSTS, data={"text": "text"}, files={"image": ("image.jpg", image)},
+                              headers=user.headers)).json()
+    url = ApiSpec.POSTS_IMAGES.format(post_id=post["id"])
+    resp = await client.get(url, headers={**user.headers, "Range": "bytes=0-3"})
+    assert resp.status_code == HTTPStatus.PARTIAL_CONTENT
+    assert resp.content == image[:4]
+
+    os.remove(blob_storage.local_path(hashlib.sha256(image).hexdigest()))
+    resp = await client.get(url, headers=user.headers)
+    assert resp.status_code == HTTPStatus.NOT_FOUND
+
+
+async def test_malformed_ids_are_rejected_before_cache(client, user, assert_queries):
+    for url, detail in ((ApiSpec.POSTS_DETAILS.format(post_id="not-a-uuid"), "BAD REQUEST: no post with provided id"),
+                        (ApiSpec.USERS_PROFILES.format(user_id="not-a-uuid"), "BAD REQUEST (incorrect data provided)")):
+        with assert_queries(0):
+            resp = await client.get(url, headers=user.headers)
+        assert resp.status_code == HTTPStatus.BAD_REQUEST
+        assert resp.json()["detail"] == detail
+
+    # ids are cached by their canonical form, so invalidation by any spelling reaches the entry
+    post = (await client.post(ApiSpec.POSTS, data={"text": "text"}, headers=user.headers)).json()
+    await client.get(ApiSpec.POSTS_DETAILS.format(post_id=post["id"].upper()), headers=user.headers)
+    await client.patch(ApiSpec.POSTS_DETAILS.format(post_id=post["id"]), data={"text": "changed"},
+                       headers=user.headers)
+    resp = await client.get(ApiSpec.POSTS_DETAILS.format(post_id=post["id"].upper()), headers=user.headers)
+    assert resp.json()["text"] == "changed"
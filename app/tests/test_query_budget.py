@@ -0,0 +1,74 @@
+import asyncio
+import re
+from http import HTTPStatus
+from routers.api_spec import ApiSpec
+from services.follow_service import follow_service
+from utils.principals_cache import principals_cache
+
+
+async def test_user_details_query_count(client, user, assert_queries):
+    with assert_queries(1):
+        resp = await client.get(ApiSpec.USERS_DETAILS.format(user_id=user.id), headers=user.headers)
+    assert resp.status_code == HTTPStatus.OK
+    assert resp.json()["id"] == user.id
+
+
+async def test_post_creation_query_count(client, user, assert_queries):
+    # the post is inserted and returned by a single INSERT ... RETURNING
+    with assert_queries(1):
+        resp = await client.post(ApiSpec.POSTS, data={"text": "text"}, headers=user.headers)
+    assert resp.status_code == HTTPStatus.OK
+    assert resp.json()["text"] == "text"
+
+
+async def test_cached_profile_query_count(client, user, assert_queries):
+    url = ApiSpec.USERS_PROFILES.format(user_id=user.id)
+    with assert_queries(1):
+        resp = await client.get(url, headers=user.headers)
+    assert resp.status_code == HTTPStatus.OK
+    with assert_queries(0):
+        cached = await client.get(url, headers=user.headers)
+    assert cached.json() == resp.json()
+
+
+async def test_assert_queries_reports_statements(client, user, assert_queries):
+    try:
+        with assert_queries(0):
+            await client.get(ApiSpec.USERS_DETAILS.format(user_id=user.id), headers=user.headers)
+    except AssertionError as e:
+        assert "1 statements are executed instead of 0" in str(e)
+        assert "FROM tbl_users" in str(e)
+    else:
+        raise AssertionError("the query count is not checked")
+
+
+async def test_principal_lookup_selects_only_principal_columns(client, user, assert_queries):
+    principals_cache.clear()
+    with assert_queries(2) as stats:
+        resp = await client.get(ApiSpec.USERS_DETAILS.format(user_id=user.id), headers=user.headers)
+    assert resp.status_code == HTTPStatus.OK
+    principal = next(statement for statement in stats.executions if "WHERE tbl_users.login" in statement)
+    columns = re.match(r"SELECT (.*?)\s+FROM", principal, re.S).group(1).split(", ")
+    assert columns == ["tbl_users.id", "tbl_users.login", "tbl_users.role", "tbl_users.blocked",
+                       "tbl_users.is_active"]
+
+
+async def test_posts_pages_query_count_does_not_depend_on_posts(client, make_user, assert_queries):
+    author, reader = await make_user(), await make_user()
+    await client.post(ApiSpec.USERS_FOLLOWERS.format(user_id=author.id), headers=reader.headers)
+    pages = [(1, ApiSpec.POSTS_USERS.format(user_id=author.id), {}),
+             (1, ApiSpec.POSTS_USERS.format(user_id=author.id), {"paging": "cursor"}),
+             (1, ApiSpec.POSTS, {"paging": "cursor"}),
+             (2, ApiSpec.FEED, {})]
+    for posts in (1, 30):
+        while len((await client.get(ApiSpec.POSTS_USERS.format(user_id=author.id), headers=author.headers)).json()) \
+                < posts:
+            post = (await client.post(ApiSpec.POSTS, data={"text": "text"}, headers=author.headers)).json()
+            await client.post(ApiSpec.POSTS_LIKES.format(post_id=post["id"]), headers=reader.headers)
+        # fan-out of the posts to the reader's timeline runs in background
+        await asyncio.gather(*follow_service._fan_outs)
+        for statements, url, params in pages:
+            with assert_queries(statements):
+                resp = await client.get(url, params={"limit": 20, **params}, headers=reader.headers)
+            assert resp.status_code == HTTPStatus.OK
+        assert len(resp.json()["items"]) == min(posts, 20)
@@ -0,0 +1,115 @@
+import asyncio
+from typing import Dict, Optional, Tuple
+from uuid import uuid4
+from cache import ReadThroughCache, RedisCacheBackend
+from db.unit_of_work import unit_of_work
+
+
+class FakeRedis:
+    """In-memory stand-in of the redis.asyncio.Redis commands used by RedisCacheBackend;
+    time is moved by the tests, every command fails with 'error' if it is set"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.entries: Dict[str, Tuple[bytes, float]] = {}
+        self.error: Optional[Exception] = None
+        self.closed = False
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+
+    async def get(self, key: str) -> Optional[bytes]:
+        self._check()
+        value, expires_at = self.entries.get(key, (None, 0.0))
+        return value if expires_at > self.now else None
+
+    async def set(self, key: str, value: bytes, px: int):
+        self._check()
+        self.entries[key] = (value, self.now + px / 1000)
+
+    async def delete(self, *keys: str):
+        self._check()
+        for key in keys:
+            self.entries.pop(key, None)
+
+    async def close(self):
+        self.closed = True
+
+
+async def test_backend_commands():
+    redis = FakeRedis()
+    backend = RedisCacheBackend(client=redis)
+    assert await backend.get("posts:1") is None
+    await backend.set("posts:1", b"{}", ttl=2)
+    await backend.set("posts:2", b"[]", ttl=0.0001)
+    assert await backend.get("posts:1") == b"{}"
+    # times to live are set in milliseconds, at least one
+    assert redis.entries["posts:2"][1] == 0.001
+
+    redis.now = 1.9
+    assert await backend.get("posts:1") == b"{}"
+    redis.now = 2
+    assert await backend.get("posts:1") is None
+
+    await backend.set("posts:1", b"{}", ttl=60)
+    await backend.delete("posts:1", "posts:2")
+    await backend.delete()
+    assert redis.entries == {}
+    await backend.close()
+    assert redis.closed
+
+
+async def test_read_through_cache_on_redis():
+    redis = FakeRedis()
+    cache = ReadThroughCache("redis_posts", RedisCacheBackend(client=redis), ttl=10, negative_ttl=1, jitter=0)
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return {"text": f"version {len(loads)}"}
+
+    key = uuid4()
+    assert await cache.get_or_load(key, load) == {"text": "version 1"}
+    assert await cache.get_or_load(key, load) == {"text": "version 1"}
+    assert len(loads) == 1
+
+    # expired entries are loaded again
+    redis.now = 10
+    assert await cache.get_or_load(key, load) == {"text": "version 2"}
+
+    # invalidation in a unit of work removes the entry right away and once more after the commit
+    async with unit_of_work():
+        await cache.invalidate(key)
+        # a load made before the commit caches the data the transaction changes
+        assert await cache.get_or_load(key, load) == {"text": "version 3"}
+    await asyncio.gather(*cache._deletes)
+    assert await cache.get_or_load(key, load) == {"text": "version 4"}
+
+    # missing entries are cached for 'negative_ttl'
+    missing = uuid4()
+
+    async def load_missing():
+        loads.append(1)
+    assert await cache.get_or_load(missing, load_missing) is None
+    assert await cache.get_or_load(missing, load_missing) is None
+    assert len(loads) == 5 and cache.negative_hits == 1
+
+
+async def test_read_through_cache_bypasses_failing_redis():
+    redis = FakeRedis()
+    cache = ReadThroughCache("redis_failing", RedisCacheBackend(client=redis), ttl=10, negative_ttl=1)
+    redis.error = ConnectionError("redis is unreachable")
+
+    async def load():
+        return {"text": "loaded"}
+
+    key = uuid4()
+    # get and set fail: the payload is loaded and returned, the errors are counted
+    assert await cache.get_or_load(key, load) == {"text": "loaded"}
+    await cache.invalidate(key)
+    assert cache.errors == 3 and redis.entries == {}
+
+    redis.error = None
+    assert await cache.get_or_load(key, load) == {"text": "loaded"}
+    assert await redis.get(f"redis_failing:{key}") == b'{"text":"loaded"}'
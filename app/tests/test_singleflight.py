@@ -0,0 +1,45 @@
+import asyncio
+from http import HTTPStatus
+from uuid import uuid4
+from prometheus_client import REGISTRY
+from cache import MemoryCacheBackend, ReadThroughCache
+from routers.api_spec import ApiSpec
+from services.follow_service import follow_service
+from services.post_service import post_service
+
+READERS = 50
+
+
+def _coalesced(name: str) -> float:
+    return REGISTRY.get_sample_value("singleflight_coalesced_total", {"name": name}) or 0
+
+
+async def test_concurrent_misses_share_one_load():
+    cache = ReadThroughCache("coalesced", MemoryCacheBackend(maxsize=100), ttl=10, negative_ttl=1)
+    loads = []
+
+    async def load():
+        loads.append(1)
+        # slow enough for all readers to miss while it runs
+        await asyncio.sleep(0.01)
+        return {"text": "cold"}
+
+    key = uuid4()
+    results = await asyncio.gather(*(cache.get_or_load(key, load) for _ in range(READERS)))
+    assert results == [{"text": "cold"}] * READERS
+    assert len(loads) == 1
+    assert cache.stats()["misses"] == READERS
+    assert _coalesced("coalesced_cache") == READERS - 1
+
+
+async def test_concurrent_reads_of_cold_post_load_it_once(client, user, assert_queries):
+    post = (await client.post(ApiSpec.POSTS, data={"text": "cold"}, headers=user.headers)).json()
+    await asyncio.gather(*follow_service._fan_outs)
+    await post_service.posts_cache.invalidate(post["id"])
+    coalesced = _coalesced("posts_cache")
+    url = ApiSpec.POSTS_DETAILS.format(post_id=post["id"])
+    # the post and its likers are selected once for all readers, not once per reader
+    with assert_queries(2):
+        responses = await asyncio.gather(*(client.get(url, headers=user.headers) for _ in range(READERS)))
+    assert all(resp.status_code == HTTPStatus.OK for resp in responses)
+    assert _coalesced("posts_cache") - coalesced == READERS - 1
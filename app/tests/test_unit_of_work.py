@@ -0,0 +1,80 @@
+import asyncio
+from http import HTTPStatus
+import httpx
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.dao import post_dao
+from db.database import engine
+from db.unit_of_work import release_connection, unit_of_work
+from main import app
+from routers.api_spec import ApiSpec
+from services.follow_service import follow_service
+from services.post_service import post_service
+from services.user_service import user_service
+from utils.password_hasher import password_hasher
+from utils.principals_cache import principals_cache
+
+
+async def test_failed_commit_is_not_answered_with_success(user, monkeypatch):
+    async def commit(self):
+        raise ConnectionResetError("connection is lost on commit")
+    monkeypatch.setattr(AsyncSession, "commit", commit)
+    # the server error is answered instead of being raised to the test
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.post(ApiSpec.POSTS, data={"text": "lost"}, headers=user.headers)
+    assert resp.status_code == HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+async def test_cache_misses_use_request_connection(client, user):
+    post = (await client.post(ApiSpec.POSTS, data={"text": "text"}, headers=user.headers)).json()
+    await asyncio.gather(*follow_service._fan_outs)
+    await post_service.posts_cache.invalidate(post["id"])
+    await user_service.profiles_cache.invalidate(user.id)
+    checkouts = []
+
+    def on_checkout(*args):
+        checkouts.append(args)
+    event.listen(engine.sync_engine.pool, "checkout", on_checkout)
+    try:
+        for url in (ApiSpec.POSTS_DETAILS.format(post_id=post["id"]), ApiSpec.USERS_PROFILES.format(user_id=user.id)):
+            checkouts.clear()
+            # the principal lookup checks out the connection of the request first
+            principals_cache.clear()
+            resp = await client.get(url, headers=user.headers)
+            assert resp.status_code == HTTPStatus.OK
+            assert len(checkouts) == 1, url
+    finally:
+        event.remove(engine.sync_engine.pool, "checkout", on_checkout)
+
+
+async def test_slow_work_holds_no_connection(client, make_user, monkeypatch):
+    """Password hashing and blob uploads wait for workers, the connection of the request is released before them"""
+    pool = engine.sync_engine.pool
+    held = {}
+
+    def recording(name, func):
+        async def wrapper(*args, **kwargs):
+            held[name] = pool.checkedout()
+            return await func(*args, **kwargs)
+        return wrapper
+    monkeypatch.setattr(password_hasher, "hash", recording("hash", password_hasher.hash))
+    monkeypatch.setattr(password_hasher, "verify_and_update",
+                        recording("verify", password_hasher.verify_and_update))
+    blob_storage = post_service._blob_storage
+    monkeypatch.setattr(blob_storage, "save", recording("save", blob_storage.save))
+
+    # registration and login
+    user = await make_user()
+    principals_cache.clear()
+    resp = await client.post(ApiSpec.POSTS, data={"text": "text"}, files={"image": ("image.jpg", b"image")},
+                             headers=user.headers)
+    assert resp.status_code == HTTPStatus.OK
+    assert held == {"hash": 0, "verify": 0, "save": 0}
+
+    # writes are not committed early
+    async with unit_of_work():
+        await post_dao.patch({"text": "changed"}, resp.json()["id"])
+        with pytest.raises(RuntimeError):
+            await release_connection()
@@ -2,7 +2,7 @@ from http import HTTPStatus
 from fastapi import HTTPException
 from passlib.context import CryptContext
 from settings import Settings
-from typing import Union, Any
+from typing import Union, Any, Tuple, Optional
 from datetime import datetime, timedelta
 from jose import jwt
 from db.dto import TokenPayload
@@ -12,9 +12,14 @@ from loguru import logger
 settings = Settings()
 
 
-password_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+# hashes made with a different cost factor are flagged for update
+password_context = CryptContext(schemes=['bcrypt'], deprecated='auto',
+                                bcrypt__default_rounds=settings.PASSWORD_HASH_ROUNDS,
+                                bcrypt__min_rounds=settings.PASSWORD_HASH_ROUNDS,
+                                bcrypt__max_rounds=settings.PASSWORD_HASH_ROUNDS)
 
 
+# blocking functions, use utils.password_hasher to call them from async code
 def hash_password(password: str) -> str:
     return password_context.hash(password)
 
@@ -23,6 +28,10 @@ def verify_password(password: str, hashed_password: str) -> bool:
     return password_context.verify(password, hashed_password)
 
 
+def verify_and_update_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return password_context.verify_and_update(password, hashed_password)
+
+
 async def get_exp_time(expiration_delta: timedelta, expire_minutes: timedelta) -> datetime:
     if expiration_delta is not None:
         expiration_delta = datetime.utcnow() + expiration_delta
@@ -50,7 +59,6 @@ async def decode_token(token: str, key: str = settings.JWT_KEY) -> TokenPayload:
     try:
         payload = jwt.decode(token, key, algorithms=[settings.TOKEN_ALGO])
         token_data = TokenPayload(**payload)
-        print(f"Token data from decode token: {token_data}")
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED,
                             detail="Unauthorized")
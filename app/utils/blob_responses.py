@@ -0,0 +1,71 @@
+import re
+from http import HTTPStatus
+from typing import Optional, Tuple
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from storage import BlobStorage
+from loguru import logger
+
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parses single 'bytes=start-end', 'bytes=start-' or 'bytes=-suffix' range;
+    returns (start, end) inclusive, or None if the range is not satisfiable;
+    raises ValueError if the header is malformed or asks for multiple ranges"""
+    match = RANGE_PATTERN.match(range_header.strip())
+    if match is None:
+        raise ValueError(f"Unsupported range: {range_header}")
+    start, end = match.groups()
+    if not start and not end:
+        raise ValueError(f"Unsupported range: {range_header}")
+    if not start:
+        suffix = int(end)
+        if suffix == 0:
+            return None
+        return max(size - suffix, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end:
+        return None
+    return start, end
+
+
+async def make_blob_response(request: Request, storage: BlobStorage, key: str,
+                             media_type: str, max_age: int) -> Response:
+    """Makes a response for a content-addressed blob: the blob key is used as a strong ETag
+    and the content is cached as immutable; supports conditional and single range requests;
+    raises 404 HTTPException if the blob is missing in the storage"""
+    etag = f'"{key}"'
+    headers = {"ETag": etag,
+               "Cache-Control": f"private, max-age={max_age}, immutable",
+               "Accept-Ranges": "bytes"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+    try:
+        size = await storage.size(key)
+    except FileNotFoundError:
+        logger.error("BlobResponse: blob {} is referenced but missing in the storage", key)
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail='NOT FOUND: no blob with provided key')
+    range_header = request.headers.get("range")
+    if range_header is not None and request.headers.get("if-range", etag) == etag:
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            byte_range = (0, size - 1)
+        if byte_range is None:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, headers=headers)
+        start, end = byte_range
+        if (start, end) != (0, size - 1):
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(storage.stream(key, start, end), status_code=HTTPStatus.PARTIAL_CONTENT,
+                                     media_type=media_type, headers=headers)
+    path = storage.local_path(key)
+    if path is not None:
+        # sent with sendfile by the server if supported
+        return FileResponse(path, media_type=media_type, headers=headers)
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(storage.stream(key), media_type=media_type, headers=headers)
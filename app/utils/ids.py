@@ -0,0 +1,16 @@
+from http import HTTPStatus
+from typing import Any
+from uuid import UUID
+from fastapi import HTTPException
+from loguru import logger
+
+
+def parse_id(value: Any, detail: str) -> UUID:
+    """Parses an id given by the client; raises 400 HTTPException with 'detail' if it is not a UUID,
+    so malformed ids never reach the caches or the database; parsed ids are canonical cache keys"""
+    try:
+        return value if isinstance(value, UUID) else UUID(str(value))
+    except ValueError:
+        err = HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=detail)
+        logger.exception(err)
+        raise err
@@ -1,8 +1,50 @@
 import os
+import random
 import sys
 from datetime import timedelta
+from typing import Callable, Dict
 from loguru import logger
-from loguru._defaults import LOGURU_TRACE_NO
+
+
+def parse_module_levels(module_levels: str) -> Dict[str, int]:
+    """Parses 'module=LEVEL,other.module=LEVEL' into {module: level number}"""
+    levels = {}
+    for item in filter(None, (item.strip() for item in module_levels.split(","))):
+        module, level = item.split("=")
+        levels[module.strip()] = logger.level(level.strip().upper()).no
+    return levels
+
+
+def make_filter(level: str, module_levels: Dict[str, int], sampled_modules: str, sample_rate: float) -> Callable:
+    """Makes a sink filter passing records at or above the level of their module
+    (the longest matching module prefix, the sink level otherwise);
+    INFO records of sampled modules are passed with 'sample_rate' probability"""
+    default_level = logger.level(level.upper()).no
+    info_level = logger.level("INFO").no
+    prefixes = sorted(module_levels, key=len, reverse=True)
+    sampled = tuple(filter(None, (module.strip() for module in sampled_modules.split(","))))
+    # resolved per module name, modules are few
+    resolved: Dict[str, tuple] = {}
+
+    def matches(name: str, module: str) -> bool:
+        return name == module or name.startswith(module + ".")
+
+    def resolve(name: str) -> tuple:
+        module_level = next((module_levels[module] for module in prefixes if matches(name, module)), default_level)
+        is_sampled = sample_rate < 1 and any(matches(name, module) for module in sampled)
+        resolved[name] = (module_level, is_sampled)
+        return resolved[name]
+
+    def log_filter(record) -> bool:
+        name = record["name"] or ""
+        module_level, is_sampled = resolved.get(name) or resolve(name)
+        if record["level"].no < module_level:
+            return False
+        if is_sampled and record["level"].no == info_level:
+            return random.random() < sample_rate
+        return True
+
+    return log_filter
 
 
 def setup_logger(settings):
@@ -15,16 +57,29 @@ def setup_logger(settings):
 
     logger.remove()
     log_format = "[{time:YYYY-MM-DD HH:mm:ss ZZ}] [{process}] [{level}] [{name}] {message}"
+    module_levels = parse_module_levels(settings.LOG_MODULE_LEVELS)
+
+    def sink_level(level: str) -> int:
+        # sink must not drop records of modules logged more verbosely, the filter decides
+        return min([logger.level(level.upper()).no, *module_levels.values()])
 
     logger.add(
         sink=sys.stdout,
-        level=LOGURU_TRACE_NO,
-        format=log_format
+        level=sink_level(settings.LOG_LEVEL),
+        format=log_format,
+        filter=make_filter(settings.LOG_LEVEL, module_levels, settings.LOG_SAMPLED_MODULES,
+                           settings.LOG_INFO_SAMPLE_RATE),
+        serialize=settings.LOG_JSON,
+        enqueue=settings.LOG_ENQUEUE
     )
     logger.add(
         sink=settings.LOG_FILEPATH,
-        level=LOGURU_TRACE_NO,
+        level=sink_level(settings.LOG_FILE_LEVEL),
         format=log_format,
+        filter=make_filter(settings.LOG_FILE_LEVEL, module_levels, settings.LOG_SAMPLED_MODULES,
+                           settings.LOG_INFO_SAMPLE_RATE),
+        serialize=settings.LOG_JSON,
+        enqueue=settings.LOG_ENQUEUE,
         rotation=timedelta(days=settings.LOG_ROTATION),
         retention=timedelta(days=settings.LOG_RETENTION)
     )
@@ -0,0 +1,170 @@
+import functools
+import inspect
+import time
+from typing import Any, Callable, Dict, Iterable
+from fastapi import HTTPException
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from utils.singleflight import singleflights
+
+
+HTTP_REQUEST_DURATION = Histogram("http_request_duration_seconds", "HTTP requests latency",
+                                  ["method", "route"])
+HTTP_RESPONSES = Counter("http_responses_total", "HTTP responses by status code",
+                         ["method", "route", "status"])
+DB_POOL_CHECKOUT_DURATION = Histogram("db_pool_checkout_duration_seconds",
+                                      "Time spent waiting for a database connection from the pool")
+DB_POOL_SATURATIONS = Counter("db_pool_saturations_total",
+                              "Checkouts which found no idle connection and no overflow left, so had to wait")
+DB_POOL_TIMEOUTS = Counter("db_pool_timeouts_total",
+                           "Checkouts which waited for a connection longer than the pool timeout")
+DAO_METHOD_DURATION = Histogram("dao_method_duration_seconds", "DAO methods latency",
+                                ["dao", "method"])
+HUNTER_IO_REQUEST_DURATION = Histogram("hunter_io_request_duration_seconds", "hunter.io requests latency",
+                                       ["outcome"])
+
+# requests which path does not match any route are not labeled by path to keep labels bounded
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware observing latency and response status of every HTTP request;
+    requests are labeled with the route template (ApiSpec value), not the actual path"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = [500]
+
+        async def send_with_status(message: Message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = self._route(scope)
+            HTTP_REQUEST_DURATION.labels(scope["method"], route).observe(time.perf_counter() - start)
+            HTTP_RESPONSES.labels(scope["method"], route, status[0]).inc()
+
+    @staticmethod
+    def _route(scope: Scope) -> str:
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return UNMATCHED_ROUTE
+
+
+def _timed(func: Callable, observe: Callable[[float, Any, BaseException], None]) -> Callable:
+    """Wraps coroutine function, passing its duration and result or error to 'observe'"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException as e:
+            observe(time.perf_counter() - start, None, e)
+            raise
+        observe(time.perf_counter() - start, result, None)
+        return result
+    return wrapper
+
+
+def instrument_daos(daos: Iterable):
+    """Observes latency of every public coroutine method of the DAO instances"""
+    for dao in daos:
+        dao_name = type(dao).__name__
+        for name, method in inspect.getmembers(dao, inspect.iscoroutinefunction):
+            if name.startswith("_"):
+                continue
+            histogram = DAO_METHOD_DURATION.labels(dao_name, name)
+            setattr(dao, name, _timed(method, lambda duration, result, error, h=histogram: h.observe(duration)))
+
+
+def _hunter_io_outcome(result: Any, error: BaseException) -> str:
+    if error is None:
+        return "ok" if result is not None else "no_response"
+    return "rejected" if isinstance(error, HTTPException) else "error"
+
+
+def instrument_hunter_io(external_api_service):
+    """Observes latency and outcome of hunter.io requests:
+    ok, no_response (failed or throttled after retries), rejected (email can not be verified) or error"""
+    external_api_service.make_hunt_io_request = _timed(
+        external_api_service.make_hunt_io_request,
+        lambda duration, result, error:
+            HUNTER_IO_REQUEST_DURATION.labels(_hunter_io_outcome(result, error)).observe(duration))
+
+
+class PoolCollector:
+    """Collects SQLAlchemy connection pool usage on every scrape"""
+
+    def __init__(self, pool):
+        self._pool = pool
+
+    def collect(self):
+        for name, documentation, value in (
+                ("db_pool_size", "Configured pool size", self._pool.size()),
+                ("db_pool_checked_out", "Connections checked out from the pool", self._pool.checkedout()),
+                ("db_pool_checked_in", "Idle connections in the pool", self._pool.checkedin()),
+                ("db_pool_overflow", "Connections open above the pool size", self._pool.overflow())):
+            yield GaugeMetricFamily(name, documentation, value=value)
+
+
+class CachesCollector:
+    """Collects hits, misses and hit ratio of caches and calls coalescing of singleflights;
+    a metric of a cache is reported if its stats have it, e.g. shared cache backends have no size"""
+
+    def __init__(self, caches: Dict[str, Any]):
+        self._caches = caches
+
+    def collect(self):
+        families = {
+            "hits": CounterMetricFamily("cache_hits", "Cache hits", labels=["cache"]),
+            "misses": CounterMetricFamily("cache_misses", "Cache misses", labels=["cache"]),
+            "negative_hits": CounterMetricFamily("cache_negative_hits", "Cache hits of missing entries",
+                                                 labels=["cache"]),
+            "errors": CounterMetricFamily("cache_errors", "Failed cache backend calls", labels=["cache"]),
+            "evictions": CounterMetricFamily("cache_evictions", "Cache evictions", labels=["cache"]),
+            "size": GaugeMetricFamily("cache_size", "Cache entries", labels=["cache"]),
+        }
+        ratio = GaugeMetricFamily("cache_hit_ratio", "Cache hits to all lookups ratio", labels=["cache"])
+        for name, cache in self._caches.items():
+            stats = cache.stats()
+            for key, family in families.items():
+                if key in stats:
+                    family.add_metric([name], stats[key])
+            if "hits" in stats:
+                lookups = stats["hits"] + stats["misses"]
+                ratio.add_metric([name], stats["hits"] / lookups if lookups else 0)
+        yield from families.values()
+        yield ratio
+
+        calls = CounterMetricFamily("singleflight_calls", "Calls made by singleflights", labels=["name"])
+        coalesced = CounterMetricFamily("singleflight_coalesced", "Calls joined to a call in flight",
+                                        labels=["name"])
+        in_flight = GaugeMetricFamily("singleflight_in_flight", "Calls in flight", labels=["name"])
+        for flight in singleflights:
+            stats = flight.stats()
+            calls.add_metric([flight.name], stats["calls"])
+            coalesced.add_metric([flight.name], stats["coalesced"])
+            in_flight.add_metric([flight.name], stats["in_flight"])
+        yield from (calls, coalesced, in_flight)
+
+
+def setup_metrics(app, pool, caches: Dict[str, Any], daos: Iterable, external_api_service):
+    """Attaches the instrumentation; services and DAOs code is left as it is"""
+    app.add_middleware(MetricsMiddleware)
+    REGISTRY.register(PoolCollector(pool))
+    REGISTRY.register(CachesCollector(caches))
+    instrument_daos(daos)
+    instrument_hunter_io(external_api_service)
@@ -0,0 +1,26 @@
+import json
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from binascii import Error as BinasciiError
+from datetime import datetime
+from http import HTTPStatus
+from typing import Tuple
+from uuid import UUID
+from fastapi import HTTPException
+from loguru import logger
+
+
+def encode_cursor(created_at: datetime, item_id: UUID) -> str:
+    """Makes an opaque pagination token out of the (created_at, id) keyset of the last entry on a page"""
+    raw = json.dumps([created_at.isoformat(), str(item_id)])
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        created_at, item_id = json.loads(urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), UUID(item_id)
+    except (BinasciiError, ValueError, TypeError) as e:
+        logger.exception(e)
+        err = HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='BAD REQUEST: invalid cursor')
+        logger.exception(err)
+        raise err
@@ -0,0 +1,62 @@
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from http import HTTPStatus
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from settings import Settings
+from utils import auth_utils
+from loguru import logger
+
+
+settings = Settings()
+
+
+class PasswordHasher:
+    """Runs bcrypt hashing and verification in a bounded pool, off the event loop;
+    at most 'workers' passwords are hashed at once and at most 'queue_size' more wait for a worker,
+    further requests are rejected with 503 instead of piling up"""
+
+    def __init__(self, workers: int, queue_size: int, executor_type: str = 'thread'):
+        self._workers = workers
+        self._queue_size = queue_size
+        self._executor_type = executor_type
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self._executor_type == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self._workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='password_hasher')
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self._pending >= self._workers + self._queue_size:
+            logger.warning("PasswordHasher: pool is saturated: {} pending requests", self._pending)
+            raise HTTPException(status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                                detail="SERVICE UNAVAILABLE: please try again later")
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(auth_utils.hash_password, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Returns (is_valid, new_hash); new_hash is not None if the password is valid
+        but was hashed with outdated settings (e.g. cost factor) and has to be stored again"""
+        return await self._run(auth_utils.verify_and_update_password, password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(workers=settings.PASSWORD_HASH_WORKERS,
+                                 queue_size=settings.PASSWORD_HASH_QUEUE_SIZE,
+                                 executor_type=settings.PASSWORD_HASH_EXECUTOR)
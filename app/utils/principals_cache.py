@@ -0,0 +1,8 @@
+from settings import Settings
+from utils.ttl_cache import TTLCache
+
+
+settings = Settings()
+
+# authenticated principals (AuthHeadersDTO) by user login
+principals_cache = TTLCache(maxsize=settings.PRINCIPALS_CACHE_SIZE, ttl=settings.PRINCIPALS_CACHE_TTL)
@@ -0,0 +1,46 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from db.query_stats import query_stats
+from settings import Settings
+from loguru import logger
+
+
+class QueryBudgetMiddleware:
+    """ASGI middleware counting SQL statements, database time and rows of every HTTP request;
+    warns when a request exceeds the configured budgets or executes the same statement repeatedly
+    (likely N+1 queries); in debug mode the counts are sent in the Server-Timing header"""
+
+    def __init__(self, app: ASGIApp, settings: Settings):
+        self.app = app
+        self._settings = settings
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with query_stats() as stats:
+
+            async def send_with_timing(message: Message):
+                if message["type"] == "http.response.start" and self._settings.DEBUG:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", f'db;dur={stats.duration * 1000:.2f};'
+                                                    f'desc="{stats.statements} queries, {stats.rows} rows"')
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+        self._check_budget(scope, stats)
+
+    def _check_budget(self, scope: Scope, stats):
+        request = f"{scope['method']} {scope['path']}"
+        if stats.statements > self._settings.QUERY_BUDGET_STATEMENTS:
+            logger.warning("QueryBudget: {}: {} queries exceed the budget of {}",
+                           request, stats.statements, self._settings.QUERY_BUDGET_STATEMENTS)
+        if stats.rows > self._settings.QUERY_BUDGET_ROWS:
+            logger.warning("QueryBudget: {}: {} rows exceed the budget of {}",
+                           request, stats.rows, self._settings.QUERY_BUDGET_ROWS)
+        if stats.max_repeats > self._settings.QUERY_BUDGET_REPEATS:
+            statement = max(stats.executions, key=stats.executions.get)
+            logger.warning("QueryBudget: {}: possible N+1 queries, statement executed {} times: {}",
+                           request, stats.max_repeats, statement)
+        logger.debug("QueryBudget: {}: {} queries, {:.2f}ms, {} rows",
+                     request, stats.statements, stats.duration * 1000, stats.rows)
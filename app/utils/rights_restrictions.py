@@ -21,8 +21,7 @@ def available_roles(role, self_action=False):
             user_role = kwargs.get('self').auth_headers.role.value
             requesting_user = kwargs.get('self').auth_headers.user_id
             user_id = kwargs.get("user_id")
-            logger.trace(f"RightsRestrictions: min role to perform action: {role},\
-            user role: {user_role}")
+            logger.trace("RightsRestrictions: min role to perform action: {}, user role: {}", role, user_role)
             if self_action:
                 if role > Roles.get(user_role):
                     self_actions(requesting_user, user_id)
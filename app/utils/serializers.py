@@ -0,0 +1,52 @@
+from operator import attrgetter
+from typing import Any, Iterable, Optional, Type, Union
+from uuid import UUID
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+def _default(value: Any) -> Any:
+    # asyncpg returns ids as its own UUID subclass, which orjson encodes only through the default hook
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(payload: Any) -> bytes:
+    return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class _JSONResponse(ORJSONResponse):
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RowSerializer:
+    """Serializes ORM model instances or Core rows to plain dicts of the given fields in a single pass;
+    field values are read with one precomputed getter, dicts are ready for orjson
+    (datetime, date and enum values are encoded by orjson itself, UUID of any type by dumps)"""
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = tuple(fields)
+        getter = attrgetter(*self.fields)
+        # attrgetter of a single field returns the value, not a tuple
+        self._get = getter if len(self.fields) > 1 else lambda obj: (getter(obj),)
+
+    @classmethod
+    def for_dto(cls, dto: Type[BaseModel], exclude: Iterable[str] = ()) -> "RowSerializer":
+        return cls(field for field in dto.__fields__ if field not in exclude)
+
+    def __call__(self, obj: Any) -> Optional[dict]:
+        if obj is None:
+            return None
+        return dict(zip(self.fields, self._get(obj)))
+
+
+def json_response(payload: Union[dict, list, None], status_code: int = 200) -> Optional[ORJSONResponse]:
+    """Sends the already serialized payload with orjson, skipping FastAPI response_model validation;
+    None is passed through to FastAPI as before"""
+    if payload is None:
+        return None
+    return _JSONResponse(payload, status_code=status_code)
@@ -0,0 +1,39 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+
+# all created coalescers, to report their stats
+singleflights: List["SingleFlight"] = []
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls: while a call for a key is in flight,
+    other callers of the same key await its result instead of making their own call"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+        singleflights.append(self)
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable], *args, **kwargs) -> Any:
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shielded, so a cancelled follower does not cancel the call for the others
+            return await asyncio.shield(future)
+        self.calls += 1
+        future = asyncio.ensure_future(func(*args, **kwargs))
+        self._calls[key] = future
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._calls),
+                "calls": self.calls,
+                "coalesced": self.coalesced}